@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import DailyLedgerRollup
 
-# Register your models here.
+
+@admin.register(DailyLedgerRollup)
+class DailyLedgerRollupAdmin(admin.ModelAdmin):
+    list_display = ['rollup_id', 'relationship', 'day', 'positive_sum', 'negative_sum', 'transaction_count']
+    list_filter = ['day']
+    search_fields = ['relationship__customer__user__email', 'relationship__business__business_name']
+    ordering = ['-day']
@@ -0,0 +1,48 @@
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def rebuild_daily_rollups(transaction_model, rollup_model, relationship_id=None, batch_size=1000):
+    """
+    Replace the daily rollups with a fresh aggregate of the raw ledger.
+    Takes the model classes so migrations can pass their historical models.
+    Returns (rows deleted, rows created). Run inside a transaction.
+    """
+    from .models import DailyLedgerRollup
+    
+    transactions = transaction_model.objects.all()
+    rollups = rollup_model.objects.all()
+    if relationship_id:
+        transactions = transactions.filter(relationship_id=relationship_id)
+        rollups = rollups.filter(relationship_id=relationship_id)
+    
+    type_counts = {
+        field: Count('transaction_id', filter=Q(transaction_type=transaction_type))
+        for transaction_type, field in DailyLedgerRollup.TYPE_COUNT_FIELDS.items()
+    }
+    
+    # One grouped scan of the ledger: (relationship, day) -> totals
+    daily_totals = transactions.annotate(
+        day=TruncDate('transaction_date')
+    ).values('relationship_id', 'day').annotate(
+        positive_sum=Sum('amount', filter=Q(amount__gt=0), default=0),
+        negative_sum=Sum('amount', filter=Q(amount__lt=0), default=0),
+        transaction_count=Count('transaction_id'),
+        **type_counts
+    ).order_by()
+    
+    deleted_count, _ = rollups.delete()
+    created_count = 0
+    
+    batch = []
+    for row in daily_totals.iterator():
+        batch.append(rollup_model(**row))
+        if len(batch) >= batch_size:
+            rollup_model.objects.bulk_create(batch)
+            created_count += len(batch)
+            batch = []
+    if batch:
+        rollup_model.objects.bulk_create(batch)
+        created_count += len(batch)
+    
+    return deleted_count, created_count
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from analytics.backfill import rebuild_daily_rollups
+from analytics.models import DailyLedgerRollup
+from transaction.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily ledger rollup table from the raw transaction table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--relationship-id',
+            type=int,
+            help='Only rebuild rollups for a single relationship'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows written per bulk_create'
+        )
+
+    def handle(self, *args, **options):
+        with db_transaction.atomic():
+            deleted_count, created_count = rebuild_daily_rollups(
+                Transaction,
+                DailyLedgerRollup,
+                relationship_id=options['relationship_id'],
+                batch_size=options['batch_size']
+            )
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nBackfill complete! Removed: {deleted_count}, Created: {created_count}'
+            )
+        )
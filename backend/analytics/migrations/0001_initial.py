@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('customer_dashboard', '0008_customerbusinessrelationship_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLedgerRollup',
+            fields=[
+                ('rollup_id', models.AutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('positive_sum', models.DecimalField(decimal_places=2, default=0, help_text='Sum of positive amounts (customer owes more)', max_digits=14)),
+                ('negative_sum', models.DecimalField(decimal_places=2, default=0, help_text='Sum of negative amounts (payments/refunds), stored as negative', max_digits=14)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('purchase_count', models.PositiveIntegerField(default=0)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('credit_count', models.PositiveIntegerField(default=0)),
+                ('refund_count', models.PositiveIntegerField(default=0)),
+                ('adjustment_count', models.PositiveIntegerField(default=0)),
+                ('relationship', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='customer_dashboard.customerbusinessrelationship')),
+            ],
+            options={
+                'verbose_name': 'Daily Ledger Rollup',
+                'verbose_name_plural': 'Daily Ledger Rollups',
+                'db_table': 'daily_ledger_rollup',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='daily_ledge_day_8b73e5_idx')],
+                'unique_together': {('relationship', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Fill the rollups from existing transactions so dashboards aren't empty after deploy"""
+    from analytics.backfill import rebuild_daily_rollups
+    rebuild_daily_rollups(
+        apps.get_model('transaction', 'Transaction'),
+        apps.get_model('analytics', 'DailyLedgerRollup')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('transaction', '0003_alter_transaction_transaction_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,145 @@
+from collections import defaultdict
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum
+from django.utils import timezone
+from customer_dashboard.models import CustomerBusinessRelationship
+
+
+class DailyLedgerRollupManager(models.Manager):
+    """Custom manager for DailyLedgerRollup model"""
+    
+    def totals_for_user(self, user):
+        """
+        Ledger totals across all of a user's relationships in a single query,
+        joined straight on relationship__business / relationship__customer.
+        Returns None if the user is neither a business nor a customer.
+        """
+        if hasattr(user, 'business_profile'):
+            user_type = 'business'
+            rollups = self.filter(relationship__business=user.business_profile)
+        elif hasattr(user, 'customer_profile'):
+            user_type = 'customer'
+            rollups = self.filter(relationship__customer=user.customer_profile)
+        else:
+            return None
+        
+        totals = rollups.aggregate(
+            positive_sum=Sum('positive_sum', default=0),
+            negative_sum=Sum('negative_sum', default=0),
+            transaction_count=Sum('transaction_count', default=0),
+        )
+        totals['user_type'] = user_type
+        return totals
+
+
+class DailyLedgerRollup(models.Model):
+    """
+    Pre-aggregated transaction totals per relationship per day.
+    Maintained by Transaction writes so analytics never scan the raw ledger.
+    """
+    # Transaction type -> count column on this model
+    TYPE_COUNT_FIELDS = {
+        'purchase': 'purchase_count',
+        'payment': 'payment_count',
+        'credit': 'credit_count',
+        'refund': 'refund_count',
+        'adjustment': 'adjustment_count',
+    }
+
+    rollup_id = models.AutoField(primary_key=True)
+    relationship = models.ForeignKey(
+        CustomerBusinessRelationship,
+        on_delete=models.CASCADE,
+        related_name='daily_rollups'
+    )
+    day = models.DateField()
+    positive_sum = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of positive amounts (customer owes more)"
+    )
+    negative_sum = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of negative amounts (payments/refunds), stored as negative"
+    )
+    transaction_count = models.PositiveIntegerField(default=0)
+    purchase_count = models.PositiveIntegerField(default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+    credit_count = models.PositiveIntegerField(default=0)
+    refund_count = models.PositiveIntegerField(default=0)
+    adjustment_count = models.PositiveIntegerField(default=0)
+
+    objects = DailyLedgerRollupManager()
+
+    class Meta:
+        db_table = 'daily_ledger_rollup'
+        verbose_name = 'Daily Ledger Rollup'
+        verbose_name_plural = 'Daily Ledger Rollups'
+        unique_together = ('relationship', 'day')
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.relationship_id} @ {self.day}: +{self.positive_sum} / {self.negative_sum}"
+
+    @staticmethod
+    def day_for(transaction_date):
+        """Bucket a transaction timestamp into its rollup day"""
+        if timezone.is_aware(transaction_date):
+            transaction_date = timezone.localtime(transaction_date)
+        return transaction_date.date()
+
+    @classmethod
+    def apply(cls, relationship_id, transaction_date, amount, transaction_type, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) one transaction's contribution.
+        Increments are F() expressions so concurrent writers don't lose updates.
+        """
+        rollup, _ = cls.objects.get_or_create(
+            relationship_id=relationship_id,
+            day=cls.day_for(transaction_date)
+        )
+
+        updates = {'transaction_count': F('transaction_count') + sign}
+        if amount > 0:
+            updates['positive_sum'] = F('positive_sum') + sign * amount
+        elif amount < 0:
+            updates['negative_sum'] = F('negative_sum') + sign * amount
+
+        count_field = cls.TYPE_COUNT_FIELDS.get(transaction_type)
+        if count_field:
+            updates[count_field] = F(count_field) + sign
+
+        cls.objects.filter(rollup_id=rollup.rollup_id).update(**updates)
+
+    @classmethod
+    def apply_transactions(cls, transactions):
+        """
+        Add a batch of new transactions, issuing one update per (relationship, day)
+        instead of one per transaction.
+        """
+        buckets = defaultdict(lambda: defaultdict(Decimal))
+        for txn in transactions:
+            bucket = buckets[(txn.relationship_id, cls.day_for(txn.transaction_date))]
+            bucket['transaction_count'] += 1
+            if txn.amount > 0:
+                bucket['positive_sum'] += txn.amount
+            elif txn.amount < 0:
+                bucket['negative_sum'] += txn.amount
+            count_field = cls.TYPE_COUNT_FIELDS.get(txn.transaction_type)
+            if count_field:
+                bucket[count_field] += 1
 
-# Create your models here.
+        for (relationship_id, day), totals in buckets.items():
+            rollup, _ = cls.objects.get_or_create(relationship_id=relationship_id, day=day)
+            cls.objects.filter(rollup_id=rollup.rollup_id).update(**{
+                field: F(field) + (int(value) if field.endswith('_count') else value)
+                for field, value in totals.items()
+            })
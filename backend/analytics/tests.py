@@ -0,0 +1,124 @@
+import datetime
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from transaction.models import Transaction
+from transaction.tests import create_relationship
+from .backfill import rebuild_daily_rollups
+from .models import DailyLedgerRollup
+
+
+COUNTED_FIELDS = (
+    'positive_sum', 'negative_sum', 'transaction_count',
+    *DailyLedgerRollup.TYPE_COUNT_FIELDS.values(),
+)
+
+
+class DailyLedgerRollupTest(TestCase):
+    """Rollups maintained by Transaction writes must match a rebuild from the raw ledger"""
+
+    def setUp(self):
+        self.relationship = create_relationship('first')
+        self.other_relationship = create_relationship('second')
+        self.today = timezone.now()
+        self.last_week = self.today - datetime.timedelta(days=7)
+
+    def _create(self, amount, transaction_type='purchase', relationship=None, transaction_date=None):
+        return Transaction.objects.create(
+            relationship=relationship or self.relationship,
+            amount=Decimal(amount),
+            transaction_type=transaction_type,
+            transaction_date=transaction_date or self.today
+        )
+
+    def _snapshot(self):
+        """(relationship, day) -> counted fields, ignoring buckets emptied by deletes"""
+        return {
+            (row['relationship_id'], row['day']): tuple(row[field] for field in COUNTED_FIELDS)
+            for row in DailyLedgerRollup.objects.filter(
+                transaction_count__gt=0
+            ).values('relationship_id', 'day', *COUNTED_FIELDS)
+        }
+
+    def assertMatchesLedger(self):
+        maintained = self._snapshot()
+        rebuild_daily_rollups(Transaction, DailyLedgerRollup)
+        self.assertEqual(maintained, self._snapshot())
+
+    def test_create(self):
+        self._create('100.00')
+        self._create('-40.00', transaction_type='payment')
+        self._create('15.00', transaction_type='credit', transaction_date=self.last_week)
+        self._create('5.00', relationship=self.other_relationship)
+
+        self.assertMatchesLedger()
+
+    def test_edit_amount_type_and_day(self):
+        txn = self._create('100.00')
+        txn.amount = Decimal('-60.00')
+        txn.transaction_type = 'refund'
+        txn.save()
+
+        moved = self._create('20.00')
+        moved.transaction_date = self.last_week
+        moved.save()
+
+        self.assertMatchesLedger()
+
+    def test_edit_relationship(self):
+        txn = self._create('100.00')
+        txn.relationship = self.other_relationship
+        txn.save()
+
+        self.assertMatchesLedger()
+
+    def test_delete(self):
+        self._create('100.00')
+        self._create('-30.00', transaction_type='payment').delete()
+        self._create('7.00', transaction_date=self.last_week).delete()
+
+        self.assertMatchesLedger()
+
+    def test_bulk_create_ledger(self):
+        Transaction.objects.bulk_create_ledger([
+            Transaction(relationship=self.relationship, amount=Decimal('10.00'), transaction_date=self.today),
+            Transaction(relationship=self.relationship, amount=Decimal('-4.00'),
+                        transaction_type='payment', transaction_date=self.today),
+            Transaction(relationship=self.other_relationship, amount=Decimal('3.00'),
+                        transaction_date=self.last_week),
+        ])
+
+        self.assertMatchesLedger()
+
+    def test_totals_match_direct_aggregate(self):
+        self._create('100.00')
+        self._create('-40.00', transaction_type='payment', transaction_date=self.last_week)
+        self._create('25.00', transaction_type='credit')
+        self._create('999.00', relationship=self.other_relationship)
+
+        user = self.relationship.customer.user
+        totals = DailyLedgerRollup.objects.totals_for_user(user)
+        direct = Transaction.objects.filter(relationship__customer__user=user).aggregate(
+            positive_sum=Sum('amount', filter=Q(amount__gt=0), default=0),
+            negative_sum=Sum('amount', filter=Q(amount__lt=0), default=0),
+        )
+
+        self.assertEqual(totals['positive_sum'], direct['positive_sum'])
+        self.assertEqual(totals['negative_sum'], direct['negative_sum'])
+        self.assertEqual(totals['transaction_count'], 3)
+        self.assertEqual(totals['user_type'], 'customer')
+
+    def test_rebuild_fills_empty_table(self):
+        self._create('100.00')
+        self._create('-40.00', transaction_type='payment', transaction_date=self.last_week)
+        maintained = self._snapshot()
+        # State right after the table was first created on an existing ledger
+        DailyLedgerRollup.objects.all().delete()
+
+        _, created = rebuild_daily_rollups(Transaction, DailyLedgerRollup)
+
+        self.assertEqual(created, 2)
+        self.assertEqual(self._snapshot(), maintained)
@@ -3,9 +3,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count
-from transaction.models import Transaction
-from customer_dashboard.models import CustomerBusinessRelationship, Customer
+from django.db.models import Sum, F
+from customer_dashboard.models import Customer
+from .models import DailyLedgerRollup
+from core.user_cache import cache_user_response
 from business_dashboard.models import Business
 from django.db.models.functions import TruncMonth
 from django.utils import timezone
@@ -17,6 +18,7 @@ class PaidVsToPayView(APIView):
     """API view for paid vs to pay analytics data"""
     permission_classes = [IsAuthenticated]
     
+    @cache_user_response('analytics:paid_vs_to_pay')
     def get(self, request):
         """
         Returns data for paid vs to pay bar graph.
@@ -27,55 +29,14 @@ class PaidVsToPayView(APIView):
             - Paid: total amount paid to all businesses
             - To Pay: total amount owed to all businesses
         """
-        user = request.user
-        
-        # Check if user is a business
-        try:
-            business = user.business_profile
-            # Get all relationships for this business
-            relationships = CustomerBusinessRelationship.objects.filter(business=business)
-            
-            # Calculate total to pay (positive amounts - customers owe business)
-            total_to_pay = Transaction.objects.filter(
-                relationship__in=relationships, 
-                amount__gt=0
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Calculate total paid (absolute value of negative amounts - payments received)
-            total_paid_negative = Transaction.objects.filter(
-                relationship__in=relationships, 
-                amount__lt=0
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            total_paid = abs(total_paid_negative)
-            
-        except AttributeError:
-            # User is not a business, check if customer
-            try:
-                customer = user.customer_profile
-                # Get all relationships for this customer
-                relationships = CustomerBusinessRelationship.objects.filter(customer=customer)
-                
-                # Calculate total to pay (positive amounts - customer owes businesses)
-                total_to_pay = Transaction.objects.filter(
-                    relationship__in=relationships, 
-                    amount__gt=0
-                ).aggregate(total=Sum('amount'))['total'] or 0
-                
-                # Calculate total paid (absolute value of negative amounts - payments made)
-                total_paid_negative = Transaction.objects.filter(
-                    relationship__in=relationships, 
-                    amount__lt=0
-                ).aggregate(total=Sum('amount'))['total'] or 0
-                
-                total_paid = abs(total_paid_negative)
-                
-            except AttributeError:
-                return Response({'error': 'User must be either a business or customer'}, status=status.HTTP_403_FORBIDDEN)
+        totals = DailyLedgerRollup.objects.totals_for_user(request.user)
+        if totals is None:
+            return Response({'error': 'User must be either a business or customer'}, status=status.HTTP_403_FORBIDDEN)
         
+        # To pay: positive amounts, Paid: absolute value of negative amounts
         data = {
-            'paid': float(total_paid),
-            'to_pay': float(total_to_pay)
+            'paid': float(abs(totals['negative_sum'])),
+            'to_pay': float(totals['positive_sum'])
         }
         
         return Response(data)
@@ -85,6 +46,7 @@ class MonthlyTransactionTrendView(APIView):
     """API view for user's monthly transaction trend data"""
     permission_classes = [IsAuthenticated]
     
+    @cache_user_response('analytics:monthly_transaction_trend')
     def get(self, request):
         """
         Returns monthly transaction trend data for the authenticated user.
@@ -95,24 +57,21 @@ class MonthlyTransactionTrendView(APIView):
             # Get customer profile
             customer = request.user.customer_profile
             
-            # Get all relationships for this customer
-            relationships = CustomerBusinessRelationship.objects.filter(customer=customer)
-            
             # Calculate date range (last 12 months)
             end_date = timezone.now()
             start_date = end_date - relativedelta(months=11)
             start_date = start_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             
-            # Get monthly transaction data
-            monthly_data = Transaction.objects.filter(
-                relationship__in=relationships,
-                transaction_date__gte=start_date,
-                transaction_date__lte=end_date
+            # Get monthly transaction data from the daily rollups
+            monthly_data = DailyLedgerRollup.objects.filter(
+                relationship__customer=customer,
+                day__gte=start_date.date(),
+                day__lte=timezone.localdate(end_date)
             ).annotate(
-                month=TruncMonth('transaction_date')
+                month=TruncMonth('day')
             ).values('month').annotate(
-                total_amount=Sum('amount'),
-                transaction_count=Count('transaction_id')
+                total_amount=Sum(F('positive_sum') + F('negative_sum')),
+                transaction_count=Sum('transaction_count')
             ).order_by('month')
             
             # Format data for chart
@@ -172,56 +131,29 @@ class TotalTransactionsView(APIView):
     """API view for total transaction count analytics"""
     permission_classes = [IsAuthenticated]
 
+    @cache_user_response('analytics:total_transactions')
     def get(self, request):
         """
         Returns the total count of all transactions for the authenticated user.
         For businesses: count of all transactions with their customers
         For customers: count of all transactions with their businesses
         """
-        user = request.user
-
-        # Check if user is a business
-        try:
-            business = user.business_profile
-            # Get all relationships for this business
-            relationships = CustomerBusinessRelationship.objects.filter(business=business)
-
-            # Count all transactions for this business
-            total_transactions = Transaction.objects.filter(
-                relationship__in=relationships
-            ).count()
-
-            user_type = 'business'
-            message = f'You have {total_transactions} transactions total'
-
-        except AttributeError:
-            # User is not a business, check if customer
-            try:
-                customer = user.customer_profile
-                # Get all relationships for this customer
-                relationships = CustomerBusinessRelationship.objects.filter(customer=customer)
-
-                # Count all transactions for this customer
-                total_transactions = Transaction.objects.filter(
-                    relationship__in=relationships
-                ).count()
-
-                user_type = 'customer'
-                message = f'You have {total_transactions} transactions total'
+        totals = DailyLedgerRollup.objects.totals_for_user(request.user)
+        if totals is None:
+            return Response({
+                'status': 403,
+                'message': 'User must be either a business or customer',
+                'data': None
+            }, status=status.HTTP_403_FORBIDDEN)
 
-            except AttributeError:
-                return Response({
-                    'status': 403,
-                    'message': 'User must be either a business or customer',
-                    'data': None
-                }, status=status.HTTP_403_FORBIDDEN)
+        total_transactions = totals['transaction_count']
 
         return Response({
             'status': 200,
-            'message': message,
+            'message': f'You have {total_transactions} transactions total',
             'data': {
                 'total_transactions': total_transactions,
-                'user_type': user_type
+                'user_type': totals['user_type']
             }
         }, status=status.HTTP_200_OK)
 
@@ -230,62 +162,36 @@ class TotalAmountView(APIView):
     """API view for total transaction amount analytics"""
     permission_classes = [IsAuthenticated]
 
+    @cache_user_response('analytics:total_amount')
     def get(self, request):
         """
         Returns the total sum of transaction amounts for the authenticated user.
         For businesses: Total revenue (sum of amounts received)
         For customers: Total spent (absolute value of amounts paid)
         """
-        user = request.user
-
-        # Check if user is a business
-        try:
-            business = user.business_profile
-            # Get all relationships for this business
-            relationships = CustomerBusinessRelationship.objects.filter(business=business)
-
-            # Calculate total revenue (sum of all positive amounts received)
-            total_revenue = Transaction.objects.filter(
-                relationship__in=relationships,
-                amount__gt=0
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            user_type = 'business'
-            message = f'Total revenue: Rs. {total_revenue:.2f}'
-            total_amount = float(total_revenue)
-
-        except AttributeError:
-            # User is not a business, check if customer
-            try:
-                customer = user.customer_profile
-                # Get all relationships for this customer
-                relationships = CustomerBusinessRelationship.objects.filter(customer=customer)
-
-                # Calculate total spent (absolute value of negative amounts paid)
-                total_spent_negative = Transaction.objects.filter(
-                    relationship__in=relationships,
-                    amount__lt=0
-                ).aggregate(total=Sum('amount'))['total'] or 0
-
-                total_spent = abs(total_spent_negative)
-
-                user_type = 'customer'
-                message = f'Total spent: Rs. {total_spent:.2f}'
-                total_amount = float(total_spent)
+        totals = DailyLedgerRollup.objects.totals_for_user(request.user)
+        if totals is None:
+            return Response({
+                'status': 403,
+                'message': 'User must be either a business or customer',
+                'data': None
+            }, status=status.HTTP_403_FORBIDDEN)
 
-            except AttributeError:
-                return Response({
-                    'status': 403,
-                    'message': 'User must be either a business or customer',
-                    'data': None
-                }, status=status.HTTP_403_FORBIDDEN)
+        if totals['user_type'] == 'business':
+            # Total revenue (sum of all positive amounts)
+            total_amount = float(totals['positive_sum'])
+            message = f'Total revenue: Rs. {total_amount:.2f}'
+        else:
+            # Total spent (absolute value of negative amounts paid)
+            total_amount = float(abs(totals['negative_sum']))
+            message = f'Total spent: Rs. {total_amount:.2f}'
 
         return Response({
             'status': 200,
             'message': message,
             'data': {
                 'total_amount': total_amount,
-                'user_type': user_type
+                'user_type': totals['user_type']
             }
         }, status=status.HTTP_200_OK)
 
@@ -294,6 +200,7 @@ class MonthlySpendingLimitView(APIView):
     """API view for customer's monthly spending vs limit analytics"""
     permission_classes = [IsAuthenticated]
 
+    @cache_user_response('analytics:monthly_spending_limit')
     def get(self, request):
         """
         Returns customer's monthly spending data compared to their set limit.
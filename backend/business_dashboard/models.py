@@ -1,5 +1,6 @@
 from django.db import models
 from hisabauth.models import User
+from core.user_cache import UserCacheService
 
 
 class Business(models.Model):
@@ -21,4 +22,8 @@ class Business(models.Model):
         verbose_name_plural = 'Businesses'
     
     def __str__(self):
-        return f"Business: {self.business_name}"
\ No newline at end of file
+        return f"Business: {self.business_name}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        UserCacheService.bump(self.user_id)
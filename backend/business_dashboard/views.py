@@ -7,12 +7,14 @@ from .models import Business
 from .serializers import BusinessDashboardSerializer, BusinessProfileSerializer, RecentCustomerSerializer
 from customer_dashboard.models import CustomerBusinessRelationship
 from request.models import BusinessCustomerRequest
+from core.user_cache import cache_user_response
 
 
 class BusinessDashboardView(APIView):
     """Business home dashboard overview"""
     permission_classes = [IsAuthenticated]
     
+    @cache_user_response('business:dashboard')
     def get(self, request):
         try:
             # Get business profile
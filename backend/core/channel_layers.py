@@ -0,0 +1,339 @@
+"""
+Channel layer for several ASGI worker processes on one host, backed by a
+shared SQLite database in WAL mode. No broker process is needed.
+
+Each layer instance (one per worker process) gets a client prefix, and its
+reply channels are named "<prefix>.<client_prefix>!<suffix>". group_send
+encodes the message once and inserts one row per remote member in a single
+transaction. Members owned by the sending process are delivered straight to
+their in-memory queues. A poller task per process moves its own rows into
+local queues and polls adaptively: poll_interval while traffic flows,
+backing off to max_poll_interval when idle.
+
+Usage:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'core.channel_layers.SQLiteChannelLayer',
+            'CONFIG': {'path': '/var/lib/hisab/channels.sqlite3'},
+        }
+    }
+
+Workers must also share the Django cache (CACHE_LOCATION): per-user cache
+invalidation, including the chat participant cache, is a version bump that a
+per-process LocMemCache would keep to the worker that made it.
+
+Benchmark against the in-memory layer with `manage.py benchmark_channel_layer`.
+"""
+import asyncio
+import base64
+import copy
+import json
+import random
+import sqlite3
+import string
+import threading
+import time
+import uuid
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    process TEXT,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_message_process_idx ON channel_message (process, id);
+CREATE INDEX IF NOT EXISTS channel_message_channel_idx ON channel_message (channel, id);
+CREATE TABLE IF NOT EXISTS channel_group (
+    group_name TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (group_name, channel)
+);
+"""
+
+
+def _default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'{type(value).__name__} is not serializable by the channel layer')
+
+
+def _object_hook(value):
+    if len(value) == 1 and '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+def encode_message(message):
+    return json.dumps(message, default=_default, separators=(',', ':'))
+
+
+def decode_message(payload):
+    return json.loads(payload, object_hook=_object_hook)
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """Cross-process channel layer on a shared SQLite/WAL file"""
+
+    extensions = ['groups', 'flush']
+
+    # Expired rows and group memberships are swept every this many polls
+    SWEEP_EVERY = 1000
+
+    def __init__(
+        self,
+        path,
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.001,
+        max_poll_interval=0.05,
+        batch_size=500,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.batch_size = batch_size
+        self.client_prefix = uuid.uuid4().hex[:12]
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._queues = {}
+        self._poller = None
+
+    # Storage helpers (run on executor threads, one connection per thread)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    @staticmethod
+    def _process_of(channel):
+        """Client prefix owning a specific channel, None for normal channels"""
+        if '!' not in channel:
+            return None
+        return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+
+    def _insert(self, channel, payload, check_capacity):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if check_capacity:
+                queued = conn.execute(
+                    'SELECT COUNT(*) FROM channel_message WHERE channel = ? AND expires >= ?',
+                    (channel, now)
+                ).fetchone()[0]
+                if queued >= self.get_capacity(channel):
+                    raise ChannelFull(channel)
+            conn.execute(
+                'INSERT INTO channel_message (process, channel, payload, expires) VALUES (?, ?, ?, ?)',
+                (self._process_of(channel), channel, payload, now + self.expiry)
+            )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _claim(self, channel):
+        """Take the oldest live message of a normal channel (competing consumers)"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, payload FROM channel_message WHERE channel = ? AND expires >= ? ORDER BY id LIMIT 1',
+                (channel, time.time())
+            ).fetchone()
+            if row:
+                conn.execute('DELETE FROM channel_message WHERE id = ?', (row[0],))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return row[1] if row else None
+
+    def _fetch_own(self):
+        """Take this process's queued rows. Only this process deletes them, so no lock is needed to read."""
+        conn = self._connection()
+        rows = conn.execute(
+            'SELECT id, channel, payload, expires FROM channel_message WHERE process = ? ORDER BY id LIMIT ?',
+            (self.client_prefix, self.batch_size)
+        ).fetchall()
+        if rows:
+            conn.execute(
+                'DELETE FROM channel_message WHERE process = ? AND id <= ?',
+                (self.client_prefix, rows[-1][0])
+            )
+        return rows
+
+    def _sweep(self):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('DELETE FROM channel_message WHERE expires < ?', (now,))
+        conn.execute('DELETE FROM channel_group WHERE expires < ?', (now,))
+
+    def _group_fan_out(self, group, payload):
+        """Insert one row per remote member; returns the members owned by this process"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            channels = [row[0] for row in conn.execute(
+                'SELECT channel FROM channel_group WHERE group_name = ? AND expires >= ?',
+                (group, now)
+            )]
+            local = [channel for channel in channels if self._process_of(channel) == self.client_prefix]
+            conn.executemany(
+                'INSERT INTO channel_message (process, channel, payload, expires) VALUES (?, ?, ?, ?)',
+                [
+                    (self._process_of(channel), channel, payload, now + self.expiry)
+                    for channel in channels
+                    if self._process_of(channel) != self.client_prefix
+                ]
+            )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return local
+
+    def _execute(self, sql, params=()):
+        self._connection().execute(sql, params)
+
+    # Local delivery
+
+    def _check_name(self, name, group=False):
+        regex = self.group_name_regex if group else self.channel_name_regex
+        if not isinstance(name, str) or len(name) >= self.MAX_NAME_LENGTH or not regex.match(name):
+            raise TypeError(f'{name!r} is not a valid {"group" if group else "channel"} name')
+
+    def _is_local(self, channel):
+        return self._process_of(channel) == self.client_prefix
+
+    def _put_local(self, channel, message, raise_full):
+        queue = self._queues.get(channel)
+        if queue is None:
+            if not raise_full:
+                # Receiver already went away (new_channel registers live ones)
+                return
+            queue = self._queues[channel] = asyncio.Queue()
+        if queue.qsize() >= self.get_capacity(channel):
+            if raise_full:
+                raise ChannelFull(channel)
+            # group_send drops messages for full channels, like the other layers
+            return
+        queue.put_nowait((time.time() + self.expiry, message))
+
+    async def _poll(self):
+        delay = self.poll_interval
+        polls = 0
+        while self._queues:
+            rows = await self._run(self._fetch_own)
+            now = time.time()
+            for _, channel, payload, expires in rows:
+                if expires >= now:
+                    self._put_local(channel, decode_message(payload), raise_full=False)
+            if rows:
+                delay = self.poll_interval
+            else:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+            polls += 1
+            if polls % self.SWEEP_EVERY == 0:
+                await self._run(self._sweep)
+
+    def _ensure_poller(self):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll())
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self._check_name(channel)
+        if self._is_local(channel):
+            self._put_local(channel, copy.deepcopy(message), raise_full=True)
+            return
+        await self._run(self._insert, channel, encode_message(message), True)
+
+    async def receive(self, channel):
+        self._check_name(channel)
+        if '!' not in channel:
+            delay = self.poll_interval
+            while True:
+                payload = await self._run(self._claim, channel)
+                if payload is not None:
+                    return decode_message(payload)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+
+        assert self._is_local(channel), 'Specific channels can only be received by the layer that created them'
+        queue = self._queues.setdefault(channel, asyncio.Queue())
+        self._ensure_poller()
+        try:
+            while True:
+                expires, message = await queue.get()
+                if expires >= time.time():
+                    return message
+        except asyncio.CancelledError:
+            # The consumer is gone - forget its queue so it doesn't leak
+            if queue.empty():
+                self._queues.pop(channel, None)
+            raise
+
+    async def new_channel(self, prefix='specific'):
+        suffix = ''.join(random.choices(string.ascii_letters, k=12))
+        channel = f'{prefix}.{self.client_prefix}!{suffix}'
+        self._queues[channel] = asyncio.Queue()
+        return channel
+
+    async def group_add(self, group, channel):
+        self._check_name(group, group=True)
+        self._check_name(channel)
+        await self._run(
+            self._execute,
+            'INSERT OR REPLACE INTO channel_group (group_name, channel, expires) VALUES (?, ?, ?)',
+            (group, channel, time.time() + self.group_expiry)
+        )
+
+    async def group_discard(self, group, channel):
+        self._check_name(group, group=True)
+        self._check_name(channel)
+        await self._run(
+            self._execute,
+            'DELETE FROM channel_group WHERE group_name = ? AND channel = ?',
+            (group, channel)
+        )
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self._check_name(group, group=True)
+        # Serialized once however many members the group has
+        local = await self._run(self._group_fan_out, group, encode_message(message))
+        for channel in local:
+            self._put_local(channel, copy.deepcopy(message), raise_full=False)
+
+    async def flush(self):
+        await self._run(self._execute, 'DELETE FROM channel_message')
+        await self._run(self._execute, 'DELETE FROM channel_group')
+        self._queues.clear()
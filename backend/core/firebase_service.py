@@ -13,6 +13,12 @@ class FirebaseService:
     
     _app = None
     
+    # Most tokens send_each_for_multicast accepts per call
+    MULTICAST_LIMIT = 500
+    
+    # Per-token errors meaning the token will never work again
+    INVALID_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+    
     @classmethod
     def initialize_firebase(cls):
         """Initialize Firebase Admin SDK if not already initialized"""
@@ -54,41 +60,7 @@ class FirebaseService:
             return False
         
         try:
-            # Ensure all data values are strings (Firebase requirement)
-            clean_data = {str(k): str(v) for k, v in (data or {}).items()}
-            
-            # Create message
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body,
-                ),
-                data=clean_data,
-                token=fcm_token,
-                android=messaging.AndroidConfig(
-                    priority='high',
-                    notification=messaging.AndroidNotification(
-                        color="#2196F3",
-                        sound="default",
-                        channel_id="hisab_khata_notifications",
-                        default_sound=True,
-                        notification_count=1,
-                    )
-                ),
-                apns=messaging.APNSConfig(
-                    headers={'apns-priority': '10'},
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            alert=messaging.ApsAlert(
-                                title=title,
-                                body=body
-                            ),
-                            badge=1,
-                            sound="default"
-                        )
-                    )
-                )
-            )
+            message = messaging.Message(token=fcm_token, **cls._message_fields(title, body, data))
             
             # Send message
             response = messaging.send(message)
@@ -108,7 +80,8 @@ class FirebaseService:
     @classmethod
     def send_push_notification_to_multiple(cls, fcm_tokens, title, body, data=None):
         """
-        Send push notification to multiple devices
+        Send push notification to multiple devices with send_each_for_multicast
+        (MULTICAST_LIMIT tokens per call)
         
         Args:
             fcm_tokens (list): List of FCM tokens
@@ -117,148 +90,294 @@ class FirebaseService:
             data (dict): Optional additional data
         
         Returns:
-            dict: Results containing success and failure counts
+            dict: Success and failure counts plus the tokens that did not get
+            the notification: 'invalid_tokens' (unregistered, safe to delete),
+            'failed_tokens' (FCM rejected the send to that device) and
+            'unsent_tokens' (never reached FCM, with the reason in 'error')
         """
-        if not cls.initialize_firebase():
-            return {"success_count": 0, "failure_count": len(fcm_tokens)}
-        
+        fcm_tokens = list(fcm_tokens)
+        result = {
+            "success_count": 0,
+            "failure_count": 0,
+            "invalid_tokens": [],
+            "failed_tokens": [],
+            "unsent_tokens": [],
+        }
         if not fcm_tokens:
             logger.warning("No FCM tokens provided")
-            return {"success_count": 0, "failure_count": 0}
+            return result
         
-        try:
-            # Ensure all data values are strings (Firebase requirement)
-            clean_data = {str(k): str(v) for k, v in (data or {}).items()}
+        if not cls.initialize_firebase():
+            result["failure_count"] = len(fcm_tokens)
+            result["unsent_tokens"] = fcm_tokens
+            result["error"] = "Firebase is not initialized"
+            return result
+        
+        for start in range(0, len(fcm_tokens), cls.MULTICAST_LIMIT):
+            chunk = fcm_tokens[start:start + cls.MULTICAST_LIMIT]
+            try:
+                response = messaging.send_each_for_multicast(
+                    messaging.MulticastMessage(tokens=chunk, **cls._message_fields(title, body, data))
+                )
+            except Exception as e:
+                logger.error(f"Failed to send multicast push notification: {str(e)}")
+                result["failure_count"] += len(chunk)
+                result["unsent_tokens"].extend(chunk)
+                result["error"] = str(e)
+                continue
             
-            # Create multicast message
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body,
-                ),
-                data=clean_data,
-                tokens=fcm_tokens,
-                android=messaging.AndroidConfig(
-                    priority='high',
-                    notification=messaging.AndroidNotification(
-                        color="#2196F3",
-                        sound="default",
-                        channel_id="hisab_khata_notifications",
-                        default_sound=True,
-                        notification_count=1,
-                    )
-                ),
-                apns=messaging.APNSConfig(
-                    headers={'apns-priority': '10'},
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            alert=messaging.ApsAlert(
-                                title=title,
-                                body=body
-                            ),
-                            badge=1,
-                            sound="default"
-                        )
+            result["success_count"] += response.success_count
+            result["failure_count"] += response.failure_count
+            for token, send_response in zip(chunk, response.responses):
+                if send_response.success:
+                    continue
+                if isinstance(send_response.exception, cls.INVALID_TOKEN_ERRORS):
+                    result["invalid_tokens"].append(token)
+                else:
+                    result["failed_tokens"].append(token)
+        
+        logger.info(
+            f"Multicast notification sent: {result['success_count']} succeeded, "
+            f"{result['failure_count']} failed ({len(result['invalid_tokens'])} unregistered)"
+        )
+        return result
+    
+    @classmethod
+    def send_batch(cls, notifications):
+        """
+        Send many different notifications in as few round-trips as possible:
+        one message per device token, sent with send_each in chunks of
+        MULTICAST_LIMIT
+        
+        Args:
+            notifications (list): (fcm_tokens, title, body, data) tuples
+        
+        Returns:
+            list: One result per notification, in order, shaped like the
+            result of send_push_notification_to_multiple
+        """
+        results = [
+            {
+                "success_count": 0,
+                "failure_count": 0,
+                "invalid_tokens": [],
+                "failed_tokens": [],
+                "unsent_tokens": [],
+            }
+            for _ in notifications
+        ]
+        # (notification index, token, message) for every device
+        messages = [
+            (index, token, messaging.Message(token=token, **cls._message_fields(title, body, data)))
+            for index, (fcm_tokens, title, body, data) in enumerate(notifications)
+            for token in fcm_tokens
+        ]
+        if not messages:
+            return results
+        
+        if not cls.initialize_firebase():
+            for index, token, _ in messages:
+                results[index]["failure_count"] += 1
+                results[index]["unsent_tokens"].append(token)
+                results[index]["error"] = "Firebase is not initialized"
+            return results
+        
+        for start in range(0, len(messages), cls.MULTICAST_LIMIT):
+            chunk = messages[start:start + cls.MULTICAST_LIMIT]
+            try:
+                response = messaging.send_each([message for _, _, message in chunk])
+            except Exception as e:
+                logger.error(f"Failed to send push notification batch: {str(e)}")
+                for index, token, _ in chunk:
+                    results[index]["failure_count"] += 1
+                    results[index]["unsent_tokens"].append(token)
+                    results[index]["error"] = str(e)
+                continue
+            
+            for (index, token, _), send_response in zip(chunk, response.responses):
+                result = results[index]
+                if send_response.success:
+                    result["success_count"] += 1
+                    continue
+                result["failure_count"] += 1
+                if isinstance(send_response.exception, cls.INVALID_TOKEN_ERRORS):
+                    result["invalid_tokens"].append(token)
+                else:
+                    result["failed_tokens"].append(token)
+        
+        logger.info(
+            f"Push notification batch sent: {len(notifications)} notification(s) to "
+            f"{len(messages)} device(s) in {-(-len(messages) // cls.MULTICAST_LIMIT)} request(s)"
+        )
+        return results
+    
+    @staticmethod
+    def _message_fields(title, body, data=None):
+        """Message fields shared by single, multicast and batch sends"""
+        # Ensure all data values are strings (Firebase requirement)
+        clean_data = {str(k): str(v) for k, v in (data or {}).items()}
+        
+        return dict(
+            notification=messaging.Notification(
+                title=title,
+                body=body,
+            ),
+            data=clean_data,
+            android=messaging.AndroidConfig(
+                priority='high',
+                notification=messaging.AndroidNotification(
+                    color="#2196F3",
+                    sound="default",
+                    channel_id="hisab_khata_notifications",
+                    default_sound=True,
+                    notification_count=1,
+                )
+            ),
+            apns=messaging.APNSConfig(
+                headers={'apns-priority': '10'},
+                payload=messaging.APNSPayload(
+                    aps=messaging.Aps(
+                        alert=messaging.ApsAlert(
+                            title=title,
+                            body=body
+                        ),
+                        badge=1,
+                        sound="default"
                     )
                 )
             )
-            
-            # Send message
-            response = messaging.send_multicast(message)
-            logger.info(f"Multicast notification sent: {response.success_count} succeeded, {response.failure_count} failed")
-            
-            return {
-                "success_count": response.success_count,
-                "failure_count": response.failure_count,
-                "responses": response.responses
+        )
+    
+    @classmethod
+    def queue_push_notification(cls, user, title, body, data=None):
+        """
+        Queue a push notification to all of a user's devices in the outbox
+        instead of sending inline, so the calling request doesn't wait on FCM
+        (see notification/outbox.py)
+        
+        Args:
+            user (User): Receiver of the notification
+            title (str): Notification title
+            body (str): Notification body
+            data (dict): Optional additional data
+        
+        Returns:
+            bool: True if queued for delivery, False if the user has no devices
+        """
+        from notification.outbox import enqueue_push
+        return enqueue_push(user, title, body, data) is not None
+    
+    @classmethod
+    def queue_push_notifications(cls, notifications):
+        """
+        Queue many push notifications at once (bulk endpoints). The outbox
+        rows are inserted together and the dispatcher sends the whole batch
+        with send_each, MULTICAST_LIMIT messages per round-trip.
+        
+        Args:
+            notifications (list): (user, title, body, data) tuples, e.g.
+                (receiver, *FirebaseService.connection_request_message(...))
+        
+        Returns:
+            int: Number of notifications queued (users without devices are skipped)
+        """
+        from notification.outbox import enqueue_pushes
+        return len(enqueue_pushes(notifications))
+    
+    @staticmethod
+    def connection_request_message(sender_name, sender_email):
+        """(title, body, data) of a connection request notification"""
+        return (
+            "New Connection Request",
+            f"{sender_name} sent you a connection request",
+            {
+                "type": "connection_request",
+                "sender_name": sender_name,
+                "sender_email": sender_email,
+                "action": "view_requests"
             }
-            
-        except Exception as e:
-            logger.error(f"Failed to send multicast push notification: {str(e)}")
-            return {"success_count": 0, "failure_count": len(fcm_tokens)}
+        )
+    
+    @staticmethod
+    def request_accepted_message(accepter_name):
+        """(title, body, data) of a request accepted notification"""
+        return (
+            "Connection Request Accepted",
+            f"{accepter_name} accepted your connection request",
+            {
+                "type": "request_accepted",
+                "accepter_name": accepter_name,
+                "action": "view_connections"
+            }
+        )
+    
+    @staticmethod
+    def request_rejected_message(rejecter_name):
+        """(title, body, data) of a request rejected notification"""
+        return (
+            "Connection Request Rejected",
+            f"{rejecter_name} rejected your connection request",
+            {
+                "type": "request_rejected",
+                "rejecter_name": rejecter_name,
+                "action": "view_requests"
+            }
+        )
     
     @classmethod
-    def send_connection_request_notification(cls, receiver_fcm_token, sender_name, sender_email):
+    def send_connection_request_notification(cls, receiver, sender_name, sender_email):
         """
         Send connection request push notification
         
         Args:
-            receiver_fcm_token (str): FCM token of the receiver
+            receiver (User): Receiver of the request
             sender_name (str): Name of the person sending the request
             sender_email (str): Email of the person sending the request
         
         Returns:
-            bool: True if successful, False otherwise
+            bool: True if queued for delivery, False otherwise
         """
-        title = "New Connection Request"
-        body = f"{sender_name} sent you a connection request"
-        
-        data = {
-            "type": "connection_request",
-            "sender_name": sender_name,
-            "sender_email": sender_email,
-            "action": "view_requests"
-        }
-        
-        return cls.send_push_notification(receiver_fcm_token, title, body, data)
+        return cls.queue_push_notification(receiver, *cls.connection_request_message(sender_name, sender_email))
     
     @classmethod
-    def send_request_accepted_notification(cls, requester_fcm_token, accepter_name):
+    def send_request_accepted_notification(cls, requester, accepter_name):
         """
         Send notification when connection request is accepted
         
         Args:
-            requester_fcm_token (str): FCM token of the person who sent the request
+            requester (User): The person who sent the request
             accepter_name (str): Name of the person who accepted the request
         
         Returns:
-            bool: True if successful, False otherwise
+            bool: True if queued for delivery, False otherwise
         """
-        title = "Connection Request Accepted"
-        body = f"{accepter_name} accepted your connection request"
-        
-        data = {
-            "type": "request_accepted",
-            "accepter_name": accepter_name,
-            "action": "view_connections"
-        }
-        
-        return cls.send_push_notification(requester_fcm_token, title, body, data)
+        return cls.queue_push_notification(requester, *cls.request_accepted_message(accepter_name))
     
     @classmethod
-    def send_request_rejected_notification(cls, requester_fcm_token, rejecter_name):
+    def send_request_rejected_notification(cls, requester, rejecter_name):
         """
         Send notification when connection request is rejected
         
         Args:
-            requester_fcm_token (str): FCM token of the person who sent the request
+            requester (User): The person who sent the request
             rejecter_name (str): Name of the person who rejected the request
         
         Returns:
-            bool: True if successful, False otherwise
+            bool: True if queued for delivery, False otherwise
         """
-        title = "Connection Request Rejected"
-        body = f"{rejecter_name} rejected your connection request"
-        
-        data = {
-            "type": "request_rejected",
-            "rejecter_name": rejecter_name,
-            "action": "view_requests"
-        }
-        
-        return cls.send_push_notification(requester_fcm_token, title, body, data)
+        return cls.queue_push_notification(requester, *cls.request_rejected_message(rejecter_name))
     
     @classmethod
-    def send_connection_deleted_notification(cls, receiver_fcm_token, deleter_name):
+    def send_connection_deleted_notification(cls, receiver, deleter_name):
         """
         Send notification when a connection is deleted
         
         Args:
-            receiver_fcm_token (str): FCM token of the other user
+            receiver (User): The other user
             deleter_name (str): Name of the person who deleted the connection
         
         Returns:
-            bool: True if successful, False otherwise
+            bool: True if queued for delivery, False otherwise
         """
         title = "Connection Deleted"
         body = f"{deleter_name} has removed the connection with you."
@@ -269,7 +388,7 @@ class FirebaseService:
             "action": "view_connections"
         }
         
-        return cls.send_push_notification(receiver_fcm_token, title, body, data)
+        return cls.queue_push_notification(receiver, title, body, data)
     
     @classmethod
     def send_notification(cls, fcm_token, title, body, data=None):
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -89,11 +90,51 @@ WSGI_APPLICATION = 'core.wsgi.application'
 ASGI_APPLICATION = 'core.asgi.application'
 
 # Channels Configuration
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+# The in-memory layer only reaches consumers of the same process. Set
+# CHANNEL_LAYER_PATH to share a SQLite/WAL layer between several ASGI workers
+# on one host (see core/channel_layers.py).
+if os.getenv('CHANNEL_LAYER_PATH'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'core.channel_layers.SQLiteChannelLayer',
+            'CONFIG': {
+                'path': os.getenv('CHANNEL_LAYER_PATH'),
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        }
+    }
+
+
+# Cache Configuration
+# Per-user dashboard/analytics responses and chat room participants
+# (see core/user_cache.py). Local memory by default; set CACHE_LOCATION to
+# share a file cache across workers. Invalidation is a version bump in this
+# cache, so a per-process cache would leave the other workers serving stale
+# entries - several workers (CHANNEL_LAYER_PATH) require CACHE_LOCATION.
+if os.getenv('CHANNEL_LAYER_PATH') and not os.getenv('CACHE_LOCATION'):
+    raise ImproperlyConfigured(
+        'CHANNEL_LAYER_PATH runs several workers - set CACHE_LOCATION so they share one cache'
+    )
+
+if os.getenv('CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hisabkhata-default',
+        }
     }
-}
 
 
 # Database
@@ -193,4 +234,30 @@ FCM_DJANGO_SETTINGS = {
     "FCM_SERVER_KEY": os.getenv('FCM_SERVER_KEY'),
     "ONE_DEVICE_PER_USER": False,
     "DELETE_INACTIVE_DEVICES": True,
-}
\ No newline at end of file
+}
+
+# Push notification outbox (see notification/outbox.py)
+# Handlers queue pushes; an in-process dispatcher thread delivers them unless
+# PUSH_OUTBOX_AUTOSTART=False and `manage.py run_push_outbox` runs as a worker.
+PUSH_OUTBOX = {
+    'TRANSPORT': os.getenv('PUSH_OUTBOX_TRANSPORT', 'notification.outbox.FirebaseTransport'),
+    'MAX_ATTEMPTS': 5,
+    'AUTOSTART': os.getenv('PUSH_OUTBOX_AUTOSTART', 'True') == 'True',
+}
+
+# Write-behind chat message persistence (see realtime_chat/write_behind.py)
+# Off by default: each WebSocket message is inserted before it is broadcast.
+CHAT_WRITE_BEHIND = {
+    'ENABLED': os.getenv('CHAT_WRITE_BEHIND', 'False') == 'True',
+    'JOURNAL_DIR': os.getenv('CHAT_JOURNAL_DIR', str(BASE_DIR / 'chat_journal')),
+    'FLUSH_INTERVAL_MS': int(os.getenv('CHAT_FLUSH_INTERVAL_MS', '20')),
+    'BATCH_SIZE': 200,
+    'FSYNC': os.getenv('CHAT_JOURNAL_FSYNC', 'False') == 'True',
+}
+
+# Sync cursors and read watermarks rely on message_id order, which each
+# process's ID blocks only keep while one process writes messages.
+if CHAT_WRITE_BEHIND['ENABLED'] and os.getenv('CHANNEL_LAYER_PATH'):
+    raise ImproperlyConfigured(
+        'CHAT_WRITE_BEHIND needs a single worker - unset CHANNEL_LAYER_PATH or CHAT_WRITE_BEHIND'
+    )
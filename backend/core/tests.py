@@ -0,0 +1,186 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from channels.exceptions import ChannelFull
+from django.test import SimpleTestCase
+
+from .channel_layers import SQLiteChannelLayer
+
+
+class SQLiteChannelLayerTest(SimpleTestCase):
+    """
+    SQLiteChannelLayer, following channels' own layer tests. Two layer
+    instances on the same file stand in for two worker processes.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'channels.sqlite3')
+        self.layers = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _layer(self, **config):
+        config.setdefault('poll_interval', 0.001)
+        config.setdefault('max_poll_interval', 0.01)
+        layer = SQLiteChannelLayer(self.path, **config)
+        self.layers.append(layer)
+        return layer
+
+    async def _close_layers(self):
+        for layer in self.layers:
+            if layer._poller is not None and not layer._poller.done():
+                layer._poller.cancel()
+                try:
+                    await layer._poller
+                except asyncio.CancelledError:
+                    pass
+
+    def _rows(self, table):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        finally:
+            conn.close()
+
+    async def test_send_receive(self):
+        layer = self._layer()
+        try:
+            channel = await layer.new_channel()
+            await layer.send(channel, {'type': 'test.message', 'text': 'Ahoy-hoy!'})
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            self.assertEqual(message, {'type': 'test.message', 'text': 'Ahoy-hoy!'})
+        finally:
+            await self._close_layers()
+
+    async def test_send_receive_across_processes(self):
+        first, second = self._layer(), self._layer()
+        try:
+            channel = await first.new_channel()
+            await second.send(channel, {'type': 'test.message', 'bytes': b'\x00\xff'})
+            message = await asyncio.wait_for(first.receive(channel), 1)
+            self.assertEqual(message, {'type': 'test.message', 'bytes': b'\x00\xff'})
+
+            # Normal channels are competing consumers across processes
+            await first.send('work', {'type': 'job', 'n': 1})
+            await first.send('work', {'type': 'job', 'n': 2})
+            received = [
+                await asyncio.wait_for(second.receive('work'), 1),
+                await asyncio.wait_for(first.receive('work'), 1),
+            ]
+            self.assertEqual([message['n'] for message in received], [1, 2])
+        finally:
+            await self._close_layers()
+
+    async def test_group_send_across_processes(self):
+        first, second = self._layer(), self._layer()
+        try:
+            local = await first.new_channel()
+            remote = await second.new_channel()
+            gone = await second.new_channel()
+            for channel in (local, remote, gone):
+                await first.group_add('room', channel)
+            await second.group_discard('room', gone)
+
+            await first.group_send('room', {'type': 'chat.message', 'text': 'hi'})
+
+            self.assertEqual((await asyncio.wait_for(first.receive(local), 1))['text'], 'hi')
+            self.assertEqual((await asyncio.wait_for(second.receive(remote), 1))['text'], 'hi')
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(second.receive(gone), 0.1)
+        finally:
+            await self._close_layers()
+
+    async def test_capacity(self):
+        first, second = self._layer(capacity=2), self._layer(capacity=2)
+        try:
+            local = await first.new_channel()
+            await first.send(local, {'type': 'test'})
+            await first.send(local, {'type': 'test'})
+            with self.assertRaises(ChannelFull):
+                await first.send(local, {'type': 'test'})
+
+            # Remote sends count the rows still waiting in the database
+            remote = await first.new_channel()
+            await second.send(remote, {'type': 'test'})
+            await second.send(remote, {'type': 'test'})
+            with self.assertRaises(ChannelFull):
+                await second.send(remote, {'type': 'test'})
+
+            # group_send drops messages for full channels instead of raising
+            await first.group_add('room', local)
+            await first.group_send('room', {'type': 'test'})
+            self.assertEqual(first._queues[local].qsize(), 2)
+        finally:
+            await self._close_layers()
+
+    async def test_expired_messages_are_skipped_and_swept(self):
+        first, second = self._layer(expiry=0.05, group_expiry=0.05), self._layer(expiry=0.05)
+        try:
+            channel = await first.new_channel()
+            await first.group_add('room', channel)
+            await second.send(channel, {'type': 'test', 'n': 1})
+            await asyncio.sleep(0.1)
+
+            await first._run(first._sweep)
+            self.assertEqual(self._rows('channel_message'), 0)
+            self.assertEqual(self._rows('channel_group'), 0)
+
+            # A message that expires in the local queue is never returned
+            await first.send(channel, {'type': 'test', 'n': 2})
+            await asyncio.sleep(0.1)
+            await second.send(channel, {'type': 'test', 'n': 3})
+            message = await asyncio.wait_for(first.receive(channel), 1)
+            self.assertEqual(message['n'], 3)
+        finally:
+            await self._close_layers()
+
+    async def test_cancelled_receive_forgets_queue(self):
+        layer = self._layer()
+        try:
+            channel = await layer.new_channel()
+            receiver = asyncio.ensure_future(layer.receive(channel))
+            await asyncio.sleep(0.02)
+            receiver.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await receiver
+
+            self.assertNotIn(channel, layer._queues)
+            # With no queues left the poller stops on its own
+            await asyncio.wait_for(layer._poller, 1)
+
+            # Late messages for the gone channel are dropped, not queued
+            await layer.group_add('room', channel)
+            await layer.group_send('room', {'type': 'test'})
+            self.assertNotIn(channel, layer._queues)
+        finally:
+            await self._close_layers()
+
+    async def test_flush(self):
+        first, second = self._layer(), self._layer()
+        try:
+            channel = await first.new_channel()
+            await first.group_add('room', channel)
+            await second.send(channel, {'type': 'test'})
+
+            await first.flush()
+
+            self.assertEqual(self._rows('channel_message'), 0)
+            self.assertEqual(self._rows('channel_group'), 0)
+            self.assertEqual(first._queues, {})
+        finally:
+            await self._close_layers()
+
+    async def test_invalid_names_are_rejected(self):
+        layer = self._layer()
+        try:
+            with self.assertRaises(TypeError):
+                await layer.send('bad name!', {'type': 'test'})
+            with self.assertRaises(TypeError):
+                await layer.group_add('bad group!', 'channel')
+        finally:
+            await self._close_layers()
@@ -0,0 +1,88 @@
+from functools import wraps
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from rest_framework import status
+from rest_framework.response import Response
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UserCacheService:
+    """
+    Per-user response cache with versioned keys.
+
+    Every cached entry embeds the user's current version number, so bumping
+    the version invalidates all of that user's dashboard/analytics entries at
+    once without having to know which keys exist.
+    """
+
+    VERSION_KEY = 'user_cache_version:{user_id}'
+    ENTRY_KEY = 'user_cache:{user_id}:v{version}:{endpoint}'
+
+    # Safety net for time-dependent values (current month, days remaining)
+    TIMEOUT = 300
+
+    @classmethod
+    def get_version(cls, user_id):
+        """Current cache version for a user (starts at 1)"""
+        return cache.get(cls.VERSION_KEY.format(user_id=user_id), 1)
+
+    @classmethod
+    def make_key(cls, user_id, endpoint):
+        """Versioned cache key for one endpoint of one user"""
+        return cls.ENTRY_KEY.format(
+            user_id=user_id,
+            version=cls.get_version(user_id),
+            endpoint=endpoint
+        )
+
+    @classmethod
+    def bump(cls, *user_ids):
+        """
+        Invalidate all cached entries of the given users.
+        Deferred until the surrounding DB transaction commits so a concurrent
+        read can't re-cache pre-commit data under the new version.
+        """
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+        db_transaction.on_commit(lambda: cls._bump_now(user_ids))
+
+    @classmethod
+    def _bump_now(cls, user_ids):
+        for user_id in user_ids:
+            key = cls.VERSION_KEY.format(user_id=user_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Version not stored yet (or evicted) - start past the default
+                cache.set(key, 2, timeout=None)
+            except Exception as e:
+                logger.error(f"Failed to bump cache version for user {user_id}: {str(e)}")
+
+
+def cache_user_response(endpoint):
+    """
+    Cache a view's successful response per authenticated user.
+
+    Usage:
+        @cache_user_response('analytics:total_amount')
+        def get(self, request): ...
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            user_id = request.user.pk
+            key = UserCacheService.make_key(user_id, endpoint)
+
+            cached = cache.get(key)
+            if cached is not None:
+                return Response(cached)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout=UserCacheService.TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from customer_dashboard.models import CustomerBusinessRelationship
+
+
+class Command(BaseCommand):
+    help = 'Verify pending_due against the full transaction history and optionally repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Rewrite pending_due from the full re-aggregate when it has drifted'
+        )
+        parser.add_argument(
+            '--relationship-id',
+            type=int,
+            help='Only check a single relationship'
+        )
+
+    def handle(self, *args, **options):
+        relationships = CustomerBusinessRelationship.objects.all()
+        if options['relationship_id']:
+            relationships = relationships.filter(relationship_id=options['relationship_id'])
+        
+        checked_count = 0
+        drift_count = 0
+        
+        for relationship in relationships.iterator():
+            checked_count += 1
+            stored, actual = relationship.verify_pending_due()
+            if stored == actual:
+                continue
+            
+            drift_count += 1
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Drift on relationship {relationship.relationship_id}: stored={stored} actual={actual}'
+                )
+            )
+            if options['repair']:
+                relationship.update_pending_due()
+        
+        action = 'Repaired' if options['repair'] else 'Drifted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nVerify complete! Checked: {checked_count}, {action}: {drift_count}'
+            )
+        )
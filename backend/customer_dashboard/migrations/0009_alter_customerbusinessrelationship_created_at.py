@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_dashboard', '0008_customerbusinessrelationship_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerbusinessrelationship',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
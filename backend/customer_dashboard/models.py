@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from hisabauth.models import User
+from core.user_cache import UserCacheService
 
 
 class CustomerManager(models.Manager):
@@ -85,6 +87,10 @@ class Customer(models.Model):
     
     def __str__(self):
         return f"Customer: {self.user.full_name}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        UserCacheService.bump(self.user_id)
 
 
 class CustomerBusinessRelationship(models.Model):
@@ -123,7 +129,9 @@ class CustomerBusinessRelationship(models.Model):
         ],
         help_text="Status of the connection between customer and business"
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add so sync_relationships can backfill
+    # the time the connection was accepted
+    created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -136,11 +144,61 @@ class CustomerBusinessRelationship(models.Model):
     def __str__(self):
         return f"{self.customer.user.full_name} - {self.business.business_name}"
     
-    def update_pending_due(self):
-        """Recalculate pending_due based on all transactions"""
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_user_caches()
+    
+    def delete(self, *args, **kwargs):
+        user_ids = self.get_user_ids()
+        result = super().delete(*args, **kwargs)
+        UserCacheService.bump(*user_ids)
+        return result
+    
+    def get_user_ids(self):
+        """Return (customer user_id, business user_id) without loading both profiles"""
+        if 'customer' in self._state.fields_cache and 'business' in self._state.fields_cache:
+            return self.customer.user_id, self.business.user_id
+        return CustomerBusinessRelationship.objects.filter(
+            relationship_id=self.relationship_id
+        ).values_list('customer__user_id', 'business__user_id').first() or ()
+    
+    def invalidate_user_caches(self):
+        """Drop cached dashboard/analytics responses of both sides"""
+        UserCacheService.bump(*self.get_user_ids())
+    
+    def apply_pending_due_delta(self, delta):
+        """
+        Atomically shift pending_due by delta without re-reading transactions.
+        Used on the transaction write path so cost stays flat as history grows.
+        """
+        from django.db.models import F
+        from django.utils import timezone
+        if not delta:
+            return
+        CustomerBusinessRelationship.objects.filter(
+            relationship_id=self.relationship_id
+        ).update(
+            pending_due=F('pending_due') + delta,
+            updated_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['pending_due', 'updated_at'])
+    
+    def calculate_pending_due(self):
+        """Full re-aggregate of pending_due from all transactions"""
         from django.db.models import Sum
-        total = self.transactions.aggregate(total=Sum('amount'))['total'] or 0
-        self.pending_due = total
+        return self.transactions.aggregate(total=Sum('amount'))['total'] or 0
+    
+    def verify_pending_due(self):
+        """Return (stored, actual) pending_due so drift can be detected"""
+        self.refresh_from_db(fields=['pending_due'])
+        return self.pending_due, self.calculate_pending_due()
+    
+    def update_pending_due(self):
+        """
+        Recalculate pending_due based on all transactions.
+        Repair path only - regular writes go through apply_pending_due_delta.
+        """
+        self.pending_due = self.calculate_pending_due()
         self.save(update_fields=['pending_due', 'updated_at'])
     
     def get_total_paid(self):
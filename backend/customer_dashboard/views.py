@@ -6,12 +6,14 @@ from django.db.models import Sum, Q, Count
 from .models import Customer, CustomerBusinessRelationship
 from .serializers import CustomerDashboardSerializer, CustomerProfileSerializer, RecentBusinessSerializer
 from request.models import BusinessCustomerRequest
+from core.user_cache import cache_user_response
 
 
 class CustomerDashboardView(APIView):
     """Customer home dashboard overview"""
     permission_classes = [IsAuthenticated]
     
+    @cache_user_response('customer:dashboard')
     def get(self, request):
         try:
             # Get customer profile
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Role, UserRole
+from .models import DeviceToken, User, Role, UserRole
 
 
 @admin.register(Role)
@@ -40,3 +40,10 @@ class UserRoleAdmin(admin.ModelAdmin):
     search_fields = ['user__phone_number', 'user__full_name', 'role__name']
 
 
+@admin.register(DeviceToken)
+class DeviceTokenAdmin(admin.ModelAdmin):
+    list_display = ['device_token_id', 'user', 'platform', 'last_seen', 'failure_count', 'created_at']
+    list_filter = ['platform']
+    search_fields = ['user__email', 'user__full_name']
+    readonly_fields = ['created_at']
+    ordering = ['-last_seen']
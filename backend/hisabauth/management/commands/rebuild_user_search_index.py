@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from hisabauth.models import User, UserSearchToken
+from hisabauth.search import build_rows
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the user search token index from the user table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of index rows written per bulk_create'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_count = 0
+        row_count = 0
+        
+        with transaction.atomic():
+            UserSearchToken.objects.all().delete()
+            
+            batch = []
+            for user in User.objects.filter(is_active=True).iterator():
+                user_count += 1
+                batch.extend(build_rows(user, UserSearchToken))
+                if len(batch) >= batch_size:
+                    UserSearchToken.objects.bulk_create(batch)
+                    row_count += len(batch)
+                    batch = []
+            if batch:
+                UserSearchToken.objects.bulk_create(batch)
+                row_count += len(batch)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {user_count} users ({row_count} search tokens)')
+        )
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-17 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from hisabauth.search import build_rows
+    User = apps.get_model('hisabauth', 'User')
+    UserSearchToken = apps.get_model('hisabauth', 'UserSearchToken')
+    
+    batch = []
+    for user in User.objects.filter(is_active=True).iterator():
+        batch.extend(build_rows(user, UserSearchToken))
+        if len(batch) >= 5000:
+            UserSearchToken.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        UserSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hisabauth', '0002_user_fcm_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('search_token_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('token', 'Token'), ('trigram', 'Trigram')], max_length=10)),
+                ('term', models.CharField(max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Search Token',
+                'verbose_name_plural': 'User Search Tokens',
+                'db_table': 'user_search_token',
+                'indexes': [models.Index(fields=['kind', 'term'], name='user_search_kind_72741f_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_fcm_tokens(apps, schema_editor):
+    User = apps.get_model('hisabauth', 'User')
+    DeviceToken = apps.get_model('hisabauth', 'DeviceToken')
+    
+    tokens = {}
+    for user_id, token in User.objects.exclude(fcm_token__isnull=True).exclude(
+        fcm_token=''
+    ).order_by('updated_at').values_list('user_id', 'fcm_token'):
+        # A token registered twice stays with the user who saved it last
+        tokens[token] = user_id
+    DeviceToken.objects.bulk_create(
+        [DeviceToken(user_id=user_id, token=token) for token, user_id in tokens.items()],
+        batch_size=500
+    )
+
+
+def restore_fcm_tokens(apps, schema_editor):
+    User = apps.get_model('hisabauth', 'User')
+    DeviceToken = apps.get_model('hisabauth', 'DeviceToken')
+    
+    for device in DeviceToken.objects.order_by('last_seen').iterator():
+        User.objects.filter(user_id=device.user_id).update(fcm_token=device.token)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hisabauth', '0003_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('device_token_id', models.AutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=512, unique=True)),
+                ('platform', models.CharField(blank=True, choices=[('android', 'Android'), ('ios', 'iOS'), ('web', 'Web')], max_length=10)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('failure_count', models.PositiveIntegerField(default=0, help_text='Consecutive failed sends; reset by a successful send or re-registration')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Device Token',
+                'verbose_name_plural': 'Device Tokens',
+                'db_table': 'device_token',
+            },
+        ),
+        migrations.RunPython(copy_fcm_tokens, restore_fcm_tokens),
+        migrations.RemoveField(
+            model_name='user',
+            name='fcm_token',
+        ),
+    ]
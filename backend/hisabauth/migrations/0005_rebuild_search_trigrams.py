@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def rebuild_search_index(apps, schema_editor):
+    """Rebuild every user's rows so trigrams only cover name words"""
+    from hisabauth.search import build_rows
+    User = apps.get_model('hisabauth', 'User')
+    UserSearchToken = apps.get_model('hisabauth', 'UserSearchToken')
+    
+    UserSearchToken.objects.all().delete()
+    batch = []
+    for user in User.objects.filter(is_active=True).iterator():
+        batch.extend(build_rows(user, UserSearchToken))
+        if len(batch) >= 5000:
+            UserSearchToken.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        UserSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hisabauth', '0004_devicetoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
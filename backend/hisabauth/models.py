@@ -47,7 +47,6 @@ class User(AbstractBaseUser, PermissionsMixin):
             ('ne', 'Nepali'),
         ]
     )
-    fcm_token = models.TextField(null=True, blank=True, help_text="Firebase Cloud Messaging token for push notifications")
     is_active = models.BooleanField(default=False)
     is_premium = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
@@ -77,6 +76,115 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     def __str__(self):
         return f"{self.full_name} ({self.email})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the persisted searchable fields so save() can skip reindexing"""
+        from .search import SEARCH_FIELDS
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if SEARCH_FIELDS.issubset(loaded):
+            instance._search_state = {field: loaded[field] for field in SEARCH_FIELDS}
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Keep the search index in sync when searchable fields change"""
+        from .search import SEARCH_FIELDS, index_user
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+            return
+        
+        # New users, and users loaded without the searchable fields, have
+        # no remembered state and are always reindexed
+        search_state = {field: getattr(self, field) for field in SEARCH_FIELDS}
+        if getattr(self, '_search_state', None) != search_state:
+            index_user(self)
+            self._search_state = search_state
+
+
+class UserSearchToken(models.Model):
+    """
+    Normalized search terms for a user (see hisabauth/search.py).
+    'token' rows answer prefix queries, 'trigram' rows answer fuzzy ones.
+    """
+    KIND_CHOICES = [
+        ('token', 'Token'),
+        ('trigram', 'Trigram'),
+    ]
+    
+    search_token_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    term = models.CharField(max_length=255)
+    
+    class Meta:
+        db_table = 'user_search_token'
+        verbose_name = 'User Search Token'
+        verbose_name_plural = 'User Search Tokens'
+        indexes = [
+            models.Index(fields=['kind', 'term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.term} -> {self.user_id}"
+
+
+class DeviceToken(models.Model):
+    """
+    Firebase Cloud Messaging token of one of a user's devices.
+    Pushes go to every device; tokens FCM reports as unregistered, or that
+    keep failing, are pruned by the push outbox (notification/outbox.py).
+    """
+    PLATFORM_CHOICES = [
+        ('android', 'Android'),
+        ('ios', 'iOS'),
+        ('web', 'Web'),
+    ]
+    
+    device_token_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='device_tokens'
+    )
+    # A token identifies an app install, so it belongs to one user at a time
+    token = models.CharField(max_length=512, unique=True)
+    platform = models.CharField(max_length=10, choices=PLATFORM_CHOICES, blank=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+    failure_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Consecutive failed sends; reset by a successful send or re-registration"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'device_token'
+        verbose_name = 'Device Token'
+        verbose_name_plural = 'Device Tokens'
+    
+    def __str__(self):
+        return f"{self.platform or 'device'} token of {self.user_id}"
+    
+    @classmethod
+    def register(cls, user, token, platform=''):
+        """
+        Upsert a device token for a user. A token already registered to
+        another user (someone else logged in on the device) moves to this one.
+        """
+        return cls.objects.update_or_create(
+            token=token,
+            defaults={
+                'user': user,
+                'platform': platform,
+                'last_seen': timezone.now(),
+                'failure_count': 0,
+            }
+        )
 
 
 class UserRole(models.Model):
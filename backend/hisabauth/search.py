@@ -0,0 +1,135 @@
+"""
+Token index for user type-ahead search.
+
+Each user is broken into normalized tokens (name words, email, email parts,
+phone digits) and trigrams of the name words, stored in UserSearchToken.
+Prefix lookups are B-tree range scans on (kind, term) and fuzzy/substring
+lookups are trigram equality hits, so neither scans the user table.
+Email and phone trigrams are left out: grams like "gma" or "com" are shared
+by nearly every user and would make each fuzzy lookup group most of the index.
+"""
+import re
+from collections import defaultdict
+
+from django.db.models import Count
+
+# Fields on User that feed the index - saves touching none of these skip reindexing
+SEARCH_FIELDS = {'email', 'phone_number', 'full_name', 'is_active'}
+
+# Upper bound on ranked candidates returned to the paginator
+MAX_RESULTS = 500
+
+# Share of a query token's trigrams a user must hit to count as a fuzzy match
+FUZZY_THRESHOLD = 0.5
+
+# Score per query token by match quality
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+FUZZY_SCORE = 1
+
+_WORD_RE = re.compile(r'[^\w]+', re.UNICODE)
+_PREFIX_END = '\uffff'
+
+
+def normalize(text):
+    """Lowercase and split text into alphanumeric words"""
+    return [word for word in _WORD_RE.split((text or '').lower()) if word]
+
+
+def tokens_for(email, phone_number, full_name):
+    """All search tokens for one user"""
+    tokens = set(normalize(full_name))
+    if email:
+        email = email.lower()
+        tokens.add(email)
+        tokens.update(normalize(email))
+    if phone_number:
+        digits = re.sub(r'\D', '', phone_number)
+        if digits:
+            tokens.add(digits)
+    return tokens
+
+
+def trigrams(token):
+    """Trigrams of a token; short tokens are their own single gram"""
+    if len(token) < 3:
+        return {token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def build_rows(user, token_model):
+    """Unsaved UserSearchToken rows for a user (works with historical models)"""
+    tokens = tokens_for(user.email, user.phone_number, user.full_name)
+    grams = set()
+    for token in normalize(user.full_name):
+        grams.update(trigrams(token))
+    rows = [token_model(user_id=user.pk, kind='token', term=token[:255]) for token in tokens]
+    rows.extend(token_model(user_id=user.pk, kind='trigram', term=gram) for gram in grams)
+    return rows
+
+
+def index_user(user):
+    """Replace a user's index rows"""
+    from .models import UserSearchToken
+    UserSearchToken.objects.filter(user_id=user.pk).delete()
+    if user.is_active:
+        UserSearchToken.objects.bulk_create(build_rows(user, UserSearchToken))
+
+
+def search_user_ids(query, exclude_user_id=None, limit=MAX_RESULTS):
+    """
+    Ranked user_ids matching a search query.
+
+    Every query token scores each user by its best match: exact token,
+    token prefix, or trigram overlap above FUZZY_THRESHOLD. Users are
+    ranked by how many query tokens they matched, then by total score.
+    """
+    from .models import UserSearchToken
+
+    query_tokens = normalize(query)
+    raw = (query or '').strip().lower()
+    if raw and raw not in query_tokens:
+        # Lets a pasted email or +977 phone match its whole-value token
+        query_tokens.append(re.sub(r'\D', '', raw) if raw.lstrip('+').isdigit() else raw)
+    if not query_tokens:
+        return []
+
+    entries = UserSearchToken.objects.all()
+    if exclude_user_id is not None:
+        entries = entries.exclude(user_id=exclude_user_id)
+
+    scores = defaultdict(int)
+    matched = defaultdict(int)
+
+    for token in query_tokens:
+        best = {}
+
+        # Prefix range scan - uses the (kind, term) index on every backend
+        prefix_hits = entries.filter(
+            kind='token',
+            term__gte=token,
+            term__lt=token + _PREFIX_END
+        ).values_list('user_id', 'term')[:limit * 4]
+        for user_id, term in prefix_hits:
+            score = EXACT_SCORE if term == token else PREFIX_SCORE
+            best[user_id] = max(best.get(user_id, 0), score)
+
+        # Trigram overlap for typos and mid-word matches in names
+        grams = trigrams(token)
+        if len(token) >= 3:
+            needed = max(1, int(len(grams) * FUZZY_THRESHOLD + 0.5))
+            fuzzy_hits = entries.filter(
+                kind='trigram',
+                term__in=grams
+            ).values('user_id').annotate(
+                shared=Count('term')
+            ).filter(shared__gte=needed).order_by('-shared')[:limit * 4]
+            for row in fuzzy_hits:
+                best.setdefault(row['user_id'], FUZZY_SCORE)
+
+        for user_id, score in best.items():
+            scores[user_id] += score
+            matched[user_id] += 1
+
+    ranked = sorted(scores, key=lambda user_id: (-matched[user_id], -scores[user_id], user_id))
+    return ranked[:limit]
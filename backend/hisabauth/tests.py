@@ -1,3 +1,99 @@
+import importlib
+
+from django.apps import apps
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import User, UserSearchToken
+from .search import search_user_ids, trigrams
+
+
+class UserSearchIndexTest(TestCase):
+    """The token index behind search_users"""
+
+    def setUp(self):
+        self.ram = User.objects.create_user(
+            email='ram.sharma@example.com', full_name='Ram Sharma',
+            phone_number='+977 9812345678', is_active=True
+        )
+        self.sita = User.objects.create_user(
+            email='sita@example.com', full_name='Sita Karki', is_active=True
+        )
+
+    def _terms(self, user, kind='token'):
+        return set(UserSearchToken.objects.filter(user=user, kind=kind).values_list('term', flat=True))
+
+    def test_search_by_prefix_email_phone_and_typo(self):
+        self.assertEqual(search_user_ids('sha'), [self.ram.user_id])
+        # Everyone shares 'example' and 'com' - the full email ranks its owner first
+        self.assertEqual(search_user_ids('sita@example.com')[0], self.sita.user_id)
+        self.assertEqual(search_user_ids('+977 9812345678'), [self.ram.user_id])
+        self.assertEqual(search_user_ids('karky'), [self.sita.user_id])
+        self.assertEqual(search_user_ids('sita', exclude_user_id=self.sita.user_id), [])
+
+    def test_inactive_users_are_not_indexed(self):
+        user = User.objects.create_user(email='hidden@example.com', full_name='Hidden Person')
+
+        self.assertFalse(UserSearchToken.objects.filter(user=user).exists())
+        self.assertEqual(search_user_ids('hidden'), [])
+
+    def test_changing_a_searchable_field_reindexes(self):
+        user = User.objects.get(user_id=self.sita.user_id)
+        user.full_name = 'Sita Thapa'
+        user.save()
+
+        self.assertIn('thapa', self._terms(user))
+        self.assertNotIn('karki', self._terms(user))
+        self.assertEqual(search_user_ids('thapa'), [self.sita.user_id])
+
+    def test_saves_without_searchable_changes_skip_reindexing(self):
+        user = User.objects.get(user_id=self.sita.user_id)
+        user.preferred_language = 'ne'
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+            user.save(update_fields=['is_premium'])
+            self.sita.is_premium = True
+            self.sita.save()
+
+        self.assertFalse(any('user_search_token' in query['sql'] for query in ctx.captured_queries))
+        self.assertIn('karki', self._terms(user))
+
+    def test_deactivating_removes_from_index(self):
+        self.sita.is_active = False
+        self.sita.save(update_fields=['is_active'])
+
+        self.assertFalse(UserSearchToken.objects.filter(user=self.sita).exists())
+
+    def test_fuzzy_lookup_skips_grams_every_user_shares(self):
+        for i, name in enumerate(['Hari Thapa', 'Gita Rai', 'Mohan Shrestha', 'Kiran Gurung'] * 5):
+            User.objects.create_user(email=f'user{i}@gmail.com', full_name=name, is_active=True)
+
+        # Only name words are split into trigrams - not the shared domain
+        self.assertFalse(UserSearchToken.objects.filter(
+            kind='trigram', term__in=trigrams('gmail') | trigrams('com')
+        ).exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(search_user_ids('gmial'), [])
+            self.assertEqual(len(search_user_ids('shresta')), 5)
+        # One prefix and one trigram query per token
+        self.assertEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(
+            UserSearchToken.objects.filter(kind='trigram', term__in=trigrams('shresta')).count(),
+            5 * len(trigrams('shresta') & trigrams('shrestha'))
+        )
+
+    def test_migration_builds_the_same_index(self):
+        expected = {(user.user_id, kind): self._terms(user, kind)
+                    for user in (self.ram, self.sita) for kind in ('token', 'trigram')}
+        UserSearchToken.objects.all().delete()
+
+        migration = importlib.import_module('hisabauth.migrations.0003_usersearchtoken')
+        migration.build_search_index(apps, None)
 
-# Create your tests here.
+        self.assertEqual(
+            {(user.user_id, kind): self._terms(user, kind)
+             for user in (self.ram, self.sita) for kind in ('token', 'trigram')},
+            expected
+        )
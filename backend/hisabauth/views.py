@@ -5,7 +5,7 @@ from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from hisabauth.serializer import UserSerializer, UserProfileSerializer
-from hisabauth.models import User, Role
+from hisabauth.models import DeviceToken, User, Role
 from otp_verification.services import send_otp_email, verify_otp
 from otp_verification.models import PendingRegistration
 from rest_framework.response import Response
@@ -212,14 +212,16 @@ class ChangePasswordView(APIView):
 
 class FCMTokenView(APIView):
     """
-    Handle FCM token operations for push notifications
+    Handle FCM token operations for push notifications.
+    A user can have one token per device; pushes go to all of them.
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        """Store/update FCM token for the authenticated user"""
+        """Register/refresh the FCM token of one of the user's devices"""
         try:
             fcm_token = request.data.get('fcm_token')
+            platform = request.data.get('platform', '')
             
             if not fcm_token:
                 return Response({
@@ -228,19 +230,16 @@ class FCMTokenView(APIView):
                     'data': None
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Update user's FCM token
+            if platform not in dict(DeviceToken.PLATFORM_CHOICES):
+                platform = ''
+            
             user = request.user
-            old_token = user.fcm_token
-            user.fcm_token = fcm_token
-            user.save()
+            device, created = DeviceToken.register(user, fcm_token, platform)
             
-            logger.info(f"FCM token updated for user {user.email} (user_id={user.user_id})")
-            logger.info(f"  New token: {fcm_token[:30]}...")
-            if old_token:
-                token_changed = old_token != fcm_token
-                logger.info(f"  Token changed: {token_changed}")
-            else:
-                logger.info(f"  Previous token was None")
+            logger.info(
+                f"FCM token {'registered' if created else 'refreshed'} for user {user.email} "
+                f"(user_id={user.user_id}, platform={platform or 'unknown'})"
+            )
             
             return Response({
                 'status': 200,
@@ -248,7 +247,8 @@ class FCMTokenView(APIView):
                 'data': {
                     'user_id': user.user_id,
                     'email': user.email,
-                    'fcm_token_updated': True
+                    'fcm_token_updated': True,
+                    'device_count': user.device_tokens.count()
                 }
             }, status=status.HTTP_200_OK)
             
@@ -261,13 +261,19 @@ class FCMTokenView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def delete(self, request):
-        """Remove FCM token for the authenticated user (on logout)"""
+        """
+        Remove this device's FCM token (on logout). Without an fcm_token
+        in the body every device of the user is removed.
+        """
         try:
             user = request.user
-            user.fcm_token = None
-            user.save()
+            fcm_token = request.data.get('fcm_token')
+            devices = user.device_tokens.all()
+            if fcm_token:
+                devices = devices.filter(token=fcm_token)
+            removed, _ = devices.delete()
             
-            logger.info(f"FCM token cleared for user {user.email}")
+            logger.info(f"{removed} FCM token(s) cleared for user {user.email}")
             
             return Response({
                 'status': 200,
@@ -295,28 +301,30 @@ class FCMTestView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        from notification.outbox import record_token_results
         user = request.user
+        fcm_tokens = list(user.device_tokens.values_list('token', flat=True))
         
         logger.info(f"\n{'='*50}")
         logger.info(f"FCM TEST NOTIFICATION for {user.email}")
         logger.info(f"  User ID: {user.user_id}")
-        logger.info(f"  FCM Token in DB: {user.fcm_token[:40] if user.fcm_token else 'NONE'}...")
+        logger.info(f"  Devices in DB: {len(fcm_tokens)}")
         logger.info(f"{'='*50}")
         
-        if not user.fcm_token:
+        if not fcm_tokens:
             return Response({
                 'status': 400,
                 'message': 'No FCM token stored for your account. Open the app first to register the token.',
                 'data': {
                     'user_id': user.user_id,
                     'email': user.email,
-                    'fcm_token': None
+                    'device_count': 0
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Send test notification
-        success = FirebaseService.send_push_notification(
-            fcm_token=user.fcm_token,
+        # Send test notification to every device, pruning dead tokens
+        result = FirebaseService.send_push_notification_to_multiple(
+            fcm_tokens,
             title="Test Notification",
             body=f"Hello {user.full_name}! If you see this, FCM is working.",
             data={
@@ -324,48 +332,50 @@ class FCMTestView(APIView):
                 "message": "This is a test push notification"
             }
         )
+        record_token_results(fcm_tokens, result)
         
-        if success:
+        data = {
+            'user_id': user.user_id,
+            'email': user.email,
+            'device_count': len(fcm_tokens),
+            'success_count': result['success_count'],
+            'failure_count': result['failure_count'],
+            'pruned_count': len(result['invalid_tokens']),
+            'firebase_accepted': result['success_count'] > 0
+        }
+        if result['success_count']:
             return Response({
                 'status': 200,
                 'message': 'Test notification sent successfully via FCM',
-                'data': {
-                    'user_id': user.user_id,
-                    'email': user.email,
-                    'fcm_token_prefix': user.fcm_token[:30] + '...',
-                    'firebase_accepted': True
-                }
+                'data': data
             }, status=status.HTTP_200_OK)
         else:
             return Response({
                 'status': 500,
                 'message': 'Failed to send test notification. Check server logs.',
-                'data': {
-                    'user_id': user.user_id,
-                    'email': user.email,
-                    'fcm_token_prefix': user.fcm_token[:30] + '...',
-                    'firebase_accepted': False
-                }
+                'data': data
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def get(self, request):
         """Check FCM token status for current user and all users (debug)"""
         user = request.user
         
-        # Get all users with FCM tokens
-        users_with_tokens = User.objects.exclude(fcm_token__isnull=True).exclude(fcm_token='').values_list(
-            'user_id', 'email', 'full_name', 'fcm_token'
-        )
+        # Get all registered devices
+        devices = DeviceToken.objects.select_related('user').order_by('user_id', '-last_seen')
         
         token_info = []
-        for uid, email, name, token in users_with_tokens:
+        for device in devices:
             token_info.append({
-                'user_id': uid,
-                'email': email,
-                'full_name': name,
-                'fcm_token_prefix': token[:30] + '...' if token else None,
-                'is_current_user': uid == user.user_id
+                'user_id': device.user_id,
+                'email': device.user.email,
+                'full_name': device.user.full_name,
+                'platform': device.platform,
+                'last_seen': device.last_seen,
+                'failure_count': device.failure_count,
+                'fcm_token_prefix': device.token[:30] + '...',
+                'is_current_user': device.user_id == user.user_id
             })
+        current_devices = [info for info in token_info if info['is_current_user']]
         
         return Response({
             'status': 200,
@@ -374,10 +384,10 @@ class FCMTestView(APIView):
                 'current_user': {
                     'user_id': user.user_id,
                     'email': user.email,
-                    'has_fcm_token': bool(user.fcm_token),
-                    'fcm_token_prefix': user.fcm_token[:30] + '...' if user.fcm_token else None,
+                    'has_fcm_token': bool(current_devices),
+                    'devices': current_devices,
                 },
                 'all_users_with_tokens': token_info,
-                'total_users_with_tokens': len(token_info)
+                'total_users_with_tokens': len({info['user_id'] for info in token_info})
             }
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
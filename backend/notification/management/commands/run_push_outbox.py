@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from notification.outbox import OutboxDispatcher, get_setting
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued push notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain everything currently due and exit'
+        )
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher()
+        
+        if options['once']:
+            processed = dispatcher.drain()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} push notification(s)'))
+            return
+        
+        self.stdout.write(f"Push outbox worker started, sending up to {get_setting('BATCH_SIZE')} notification(s) per batch")
+        while True:
+            processed = dispatcher.drain()
+            if processed:
+                self.stdout.write(f'Processed {processed} push notification(s)')
+            time.sleep(get_setting('POLL_INTERVAL_SECONDS'))
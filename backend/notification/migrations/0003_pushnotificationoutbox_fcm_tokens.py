@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+def copy_tokens(apps, schema_editor):
+    PushNotificationOutbox = apps.get_model('notification', 'PushNotificationOutbox')
+    for row in PushNotificationOutbox.objects.exclude(fcm_token='').iterator():
+        PushNotificationOutbox.objects.filter(outbox_id=row.outbox_id).update(fcm_tokens=[row.fcm_token])
+
+
+def restore_tokens(apps, schema_editor):
+    PushNotificationOutbox = apps.get_model('notification', 'PushNotificationOutbox')
+    for row in PushNotificationOutbox.objects.iterator():
+        PushNotificationOutbox.objects.filter(outbox_id=row.outbox_id).update(
+            fcm_token=row.fcm_tokens[0] if row.fcm_tokens else ''
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0002_pushnotificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushnotificationoutbox',
+            name='fcm_tokens',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(copy_tokens, restore_tokens),
+        migrations.RemoveField(
+            model_name='pushnotificationoutbox',
+            name='fcm_token',
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Notification(models.Model):
@@ -35,4 +36,70 @@ class Notification(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.receiver.email}"
+    
+    def save(self, *args, **kwargs):
+        """Override save to push new notifications to the receiver's open socket."""
+        is_new = self.pk is None
+        super().save(*args, **kwargs)
+        
+        if is_new:
+            self.push_to_receiver()
+    
+    def push_to_receiver(self):
+        """
+        Send a new notification to the receiver's open sockets. Called by
+        save; bulk_create callers call it for each created row.
+        """
+        from realtime_chat.events import send_to_user
+        from realtime_chat.framing import frame_event
+        from .serializers import NotificationSerializer
+        send_to_user(self.receiver_id, frame_event('notification', {
+            'type': 'notification',
+            'notification': dict(NotificationSerializer(self).data),
+        }))
+
 
+
+class PushNotificationOutbox(models.Model):
+    """
+    Persistent queue of push notifications.
+    Request handlers only insert rows here; the outbox dispatcher
+    (notification/outbox.py) delivers them off the request path.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+    ]
+    
+    outbox_id = models.BigAutoField(primary_key=True)
+    # Device tokens still to deliver to; narrowed to the failed ones on retry
+    fcm_tokens = models.JSONField(default=list)
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the row is next due; while sending this is the claim lease expiry"
+    )
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'push_notification_outbox'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"Push {self.outbox_id}: {self.title} ({self.status})"
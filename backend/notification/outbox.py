@@ -0,0 +1,329 @@
+"""
+Push notification outbox dispatcher.
+
+Handlers call enqueue_push() which only inserts a PushNotificationOutbox row
+addressed to every registered device of the user. OutboxDispatcher claims
+due rows and delivers each claimed batch with one send_batch call on a
+pluggable transport (FCM send_each). It retries the devices that failed
+with exponential backoff and dead-letters rows that keep failing. Device tokens FCM reports as
+unregistered, or that fail MAX_TOKEN_FAILURES sends in a row, are deleted.
+
+Settings (all optional), e.g.:
+    PUSH_OUTBOX = {
+        'TRANSPORT': 'notification.outbox.FirebaseTransport',
+        'BATCH_SIZE': 100,
+        'AUTOSTART': True,
+    }
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    'TRANSPORT': 'notification.outbox.FirebaseTransport',
+    # Rows claimed and sent per send_batch call
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE_SECONDS': 5,
+    'BACKOFF_MAX_SECONDS': 3600,
+    # A row stuck in 'sending' longer than this (worker crashed) is retried
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL_SECONDS': 5,
+    # Consecutive failed sends after which a device token is pruned
+    'MAX_TOKEN_FAILURES': 10,
+    # Start an in-process dispatcher thread on first enqueue
+    'AUTOSTART': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'PUSH_OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+class PushDeliveryError(Exception):
+    """Raised by a transport when a notification could not be delivered"""
+
+
+class FirebaseTransport:
+    """
+    Delivers through Firebase Cloud Messaging (send_each).
+    A transport's send_batch returns one result per notification with the
+    tokens that were unregistered ('invalid_tokens'), that FCM rejected
+    ('failed_tokens') and that were never sent ('unsent_tokens'); see
+    FirebaseService.send_batch.
+    """
+
+    def send_batch(self, notifications):
+        """One result per (fcm_tokens, title, body, data), sent in as few requests as possible"""
+        from core.firebase_service import FirebaseService
+        return FirebaseService.send_batch(notifications)
+
+
+class FakeTransport:
+    """
+    In-memory transport for tests and offline development.
+    Fails the first `fail_times` sends, then records every delivery in `sent`.
+    Tokens in `invalid_tokens` are reported as unregistered.
+    """
+
+    def __init__(self, fail_times=0, invalid_tokens=()):
+        self.fail_times = fail_times
+        self.invalid_tokens = set(invalid_tokens)
+        self.sent = []
+        self.attempts = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def send(self, fcm_tokens, title, body, data):
+        with self._lock:
+            self.attempts += 1
+            if self.attempts <= self.fail_times:
+                raise PushDeliveryError('Simulated failure')
+            invalid = [token for token in fcm_tokens if token in self.invalid_tokens]
+            self.sent.append({
+                'fcm_tokens': [token for token in fcm_tokens if token not in self.invalid_tokens],
+                'title': title,
+                'body': body,
+                'data': data,
+            })
+        return {
+            'success_count': len(fcm_tokens) - len(invalid),
+            'failure_count': len(invalid),
+            'invalid_tokens': invalid,
+            'failed_tokens': [],
+            'unsent_tokens': [],
+        }
+
+    def send_batch(self, notifications):
+        with self._lock:
+            self.batches += 1
+        return [self.send(*notification) for notification in notifications]
+
+
+def record_token_results(fcm_tokens, result):
+    """
+    Device token bookkeeping after a send: unregistered tokens are deleted,
+    failed ones count towards MAX_TOKEN_FAILURES, delivered ones start over.
+    Unsent tokens (FCM unreachable) are left alone.
+    """
+    from hisabauth.models import DeviceToken
+
+    invalid = set(result.get('invalid_tokens', []))
+    failed = set(result.get('failed_tokens', []))
+    delivered = set(fcm_tokens) - invalid - failed - set(result.get('unsent_tokens', []))
+    if invalid:
+        DeviceToken.objects.filter(token__in=invalid).delete()
+        logger.info(f"Pruned {len(invalid)} unregistered device token(s)")
+    if failed:
+        DeviceToken.objects.filter(token__in=failed).update(failure_count=F('failure_count') + 1)
+        pruned, _ = DeviceToken.objects.filter(
+            token__in=failed,
+            failure_count__gte=get_setting('MAX_TOKEN_FAILURES')
+        ).delete()
+        if pruned:
+            logger.info(f"Pruned {pruned} device token(s) that kept failing")
+    if delivered:
+        DeviceToken.objects.filter(token__in=delivered, failure_count__gt=0).update(failure_count=0)
+
+
+def backoff_delay(attempts):
+    """Delay before the next attempt after `attempts` failures"""
+    delay = get_setting('BACKOFF_BASE_SECONDS') * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, get_setting('BACKOFF_MAX_SECONDS')))
+
+
+class OutboxDispatcher:
+    """Claims due outbox rows and delivers them in batches"""
+
+    def __init__(self, transport=None):
+        self.transport = transport or import_string(get_setting('TRANSPORT'))()
+
+    def claim_batch(self):
+        """
+        Claim up to BATCH_SIZE due rows. Each claim is a conditional update,
+        so several dispatcher processes never deliver the same row twice.
+        """
+        from .models import PushNotificationOutbox
+
+        now = timezone.now()
+        lease_until = now + timedelta(seconds=get_setting('LEASE_SECONDS'))
+        candidates = PushNotificationOutbox.objects.filter(
+            status__in=['pending', 'sending'],
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at')[:get_setting('BATCH_SIZE')]
+
+        claimed = []
+        for row in candidates:
+            updated = PushNotificationOutbox.objects.filter(
+                outbox_id=row.outbox_id,
+                status=row.status,
+                next_attempt_at=row.next_attempt_at
+            ).update(
+                status='sending',
+                next_attempt_at=lease_until,
+                attempts=F('attempts') + 1
+            )
+            if updated:
+                row.attempts += 1
+                claimed.append(row)
+        return claimed
+
+    def deliver_batch(self, rows):
+        """
+        Send claimed rows with one transport.send_batch call (FCM send_each,
+        up to 500 messages per round-trip) and record each outcome
+        """
+        try:
+            results = self.transport.send_batch([
+                (row.fcm_tokens, row.title, row.body, row.data) for row in rows
+            ])
+        except Exception as e:
+            return [self._record(row, error=e) for row in rows]
+        return [self._record(row, result=result) for row, result in zip(rows, results)]
+
+    def _record(self, row, result=None, error=None):
+        """Store the outcome of one row's send; True if every device got it"""
+        from .models import PushNotificationOutbox
+
+        remaining = row.fcm_tokens
+        try:
+            if error is not None:
+                raise error
+            record_token_results(row.fcm_tokens, result)
+            # Only devices that failed are retried - the others already have it
+            remaining = result.get('failed_tokens', []) + result.get('unsent_tokens', [])
+            if remaining:
+                raise PushDeliveryError(
+                    result.get('error') or f"{len(remaining)} of {len(row.fcm_tokens)} device(s) failed"
+                )
+        except Exception as e:
+            if row.attempts >= get_setting('MAX_ATTEMPTS'):
+                logger.error(f"Push {row.outbox_id} dead-lettered after {row.attempts} attempts: {str(e)}")
+                updates = {'status': 'dead'}
+            else:
+                logger.warning(f"Push {row.outbox_id} attempt {row.attempts} failed: {str(e)}")
+                updates = {
+                    'status': 'pending',
+                    'next_attempt_at': timezone.now() + backoff_delay(row.attempts),
+                }
+            updates['fcm_tokens'] = remaining
+            PushNotificationOutbox.objects.filter(outbox_id=row.outbox_id).update(
+                last_error=str(e)[:1000], **updates
+            )
+            return False
+        PushNotificationOutbox.objects.filter(outbox_id=row.outbox_id).update(
+            status='sent',
+            sent_at=timezone.now(),
+            last_error=''
+        )
+        return True
+
+    def drain_once(self):
+        """Deliver one claimed batch. Returns the number of rows processed."""
+        rows = self.claim_batch()
+        if not rows:
+            return 0
+        self.deliver_batch(rows)
+        return len(rows)
+
+    def drain(self):
+        """Deliver batches until nothing is due. Returns rows processed."""
+        total = 0
+        while True:
+            processed = self.drain_once()
+            if not processed:
+                return total
+            total += processed
+
+
+class BackgroundDispatcher:
+    """
+    In-process daemon thread that drains the outbox when kicked and
+    polls for due retries. Used when no run_push_outbox worker is deployed.
+    """
+
+    _lock = threading.Lock()
+    _thread = None
+    _wakeup = threading.Event()
+
+    @classmethod
+    def kick(cls):
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(
+                    target=cls._run,
+                    name='push-outbox-dispatcher',
+                    daemon=True
+                )
+                cls._thread.start()
+        cls._wakeup.set()
+
+    @classmethod
+    def _run(cls):
+        dispatcher = OutboxDispatcher()
+        while True:
+            cls._wakeup.wait(timeout=get_setting('POLL_INTERVAL_SECONDS'))
+            cls._wakeup.clear()
+            try:
+                dispatcher.drain()
+            except Exception as e:
+                logger.error(f"Push outbox dispatcher error: {str(e)}")
+            finally:
+                close_old_connections()
+
+
+def enqueue_pushes(notifications):
+    """
+    Queue (user, title, body, data) notifications with one device token
+    query and one bulk insert. Users without devices are skipped.
+    Returns the created outbox rows.
+    """
+    from hisabauth.models import DeviceToken
+    from .models import PushNotificationOutbox
+
+    notifications = list(notifications)
+    tokens_by_user = {}
+    for user_id, token in DeviceToken.objects.filter(
+        user_id__in={user.user_id for user, *_ in notifications}
+    ).values_list('user_id', 'token'):
+        tokens_by_user.setdefault(user_id, []).append(token)
+
+    rows = [
+        PushNotificationOutbox(
+            fcm_tokens=tokens_by_user[user.user_id],
+            title=title,
+            body=body,
+            # Firebase requires string values
+            data={str(k): str(v) for k, v in (data or {}).items()},
+        )
+        for user, title, body, data in notifications
+        if user.user_id in tokens_by_user
+    ]
+    if not rows:
+        return []
+    rows = PushNotificationOutbox.objects.bulk_create(rows, batch_size=500)
+    if get_setting('AUTOSTART'):
+        transaction.on_commit(BackgroundDispatcher.kick)
+    return rows
+
+
+def enqueue_push(user, title, body, data=None):
+    """
+    Queue a push notification to all of a user's devices. Returns the outbox
+    row, or None if the user has no registered device.
+    Delivery starts after the surrounding DB transaction commits.
+    """
+    rows = enqueue_pushes([(user, title, body, data)])
+    if not rows:
+        logger.info(f"No device tokens registered for user {user.user_id}")
+        return None
+    return rows[0]
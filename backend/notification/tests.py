@@ -1,3 +1,150 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from hisabauth.models import DeviceToken, User
+from .models import PushNotificationOutbox
+from .outbox import FakeTransport, OutboxDispatcher, enqueue_push, enqueue_pushes
+
+
+@override_settings(PUSH_OUTBOX={'AUTOSTART': False, 'MAX_ATTEMPTS': 3, 'BACKOFF_BASE_SECONDS': 10})
+class PushOutboxTest(TestCase):
+    """Outbox delivery, retry and dead-lettering with the fake transport"""
+
+    def setUp(self):
+        self.user = self._user('token-1')
+
+    def _user(self, *tokens):
+        user = User.objects.create_user(
+            email=f'user{User.objects.count()}@example.com',
+            full_name='Push User',
+            is_active=True
+        )
+        for token in tokens:
+            DeviceToken.register(user, token)
+        return user
+
+    def _make_due(self):
+        PushNotificationOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_enqueue_does_not_send(self):
+        with mock.patch('core.firebase_service.FirebaseService.send_batch') as send_batch, \
+                mock.patch('notification.outbox.BackgroundDispatcher.kick') as kick:
+            enqueue_push(self.user, 'Title', 'Body', {'count': 1})
+
+        row = PushNotificationOutbox.objects.get()
+        self.assertEqual(row.status, 'pending')
+        self.assertEqual(row.attempts, 0)
+        self.assertEqual(row.data, {'count': '1'})
+        send_batch.assert_not_called()
+        # AUTOSTART is off - nothing was even scheduled
+        kick.assert_not_called()
+
+    def test_enqueue_without_token_is_skipped(self):
+        self.assertIsNone(enqueue_push(self._user(), 'Title', 'Body'))
+        self.assertFalse(PushNotificationOutbox.objects.exists())
+
+    def test_drain_delivers_pending_rows(self):
+        for i in range(5):
+            enqueue_push(self._user(f'token-{i}-a'), 'Title', 'Body')
+        transport = FakeTransport()
+
+        processed = OutboxDispatcher(transport=transport).drain()
+
+        self.assertEqual(processed, 5)
+        self.assertEqual(len(transport.sent), 5)
+        self.assertEqual(PushNotificationOutbox.objects.filter(status='sent').count(), 5)
+
+    def test_failure_backs_off_then_succeeds(self):
+        enqueue_push(self.user, 'Title', 'Body')
+        transport = FakeTransport(fail_times=1)
+        dispatcher = OutboxDispatcher(transport=transport)
+
+        dispatcher.drain()
+        row = PushNotificationOutbox.objects.get()
+        self.assertEqual(row.status, 'pending')
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=5))
+
+        # Not due yet - nothing is retried early
+        self.assertEqual(dispatcher.drain(), 0)
+
+        self._make_due()
+        dispatcher.drain()
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'sent')
+        self.assertEqual(row.attempts, 2)
+        self.assertEqual(len(transport.sent), 1)
+
+    def test_dead_letter_after_max_attempts(self):
+        enqueue_push(self.user, 'Title', 'Body')
+        transport = FakeTransport(fail_times=10)
+        dispatcher = OutboxDispatcher(transport=transport)
+
+        for _ in range(3):
+            self._make_due()
+            dispatcher.drain()
+
+        row = PushNotificationOutbox.objects.get()
+        self.assertEqual(row.status, 'dead')
+        self.assertEqual(row.attempts, 3)
+        self.assertIn('Simulated failure', row.last_error)
+
+        self._make_due()
+        self.assertEqual(dispatcher.drain(), 0)
+
+    def test_expired_lease_is_reclaimed(self):
+        enqueue_push(self.user, 'Title', 'Body')
+        # Simulate a worker that claimed the row and crashed
+        PushNotificationOutbox.objects.update(status='sending', attempts=1)
+        self._make_due()
+        transport = FakeTransport()
+
+        OutboxDispatcher(transport=transport).drain()
+
+        row = PushNotificationOutbox.objects.get()
+        self.assertEqual(row.status, 'sent')
+        self.assertEqual(row.attempts, 2)
+
+    def test_sends_to_every_device(self):
+        DeviceToken.register(self.user, 'token-2', 'ios')
+        enqueue_push(self.user, 'Title', 'Body')
+        transport = FakeTransport()
+
+        OutboxDispatcher(transport=transport).drain()
+
+        self.assertEqual(len(transport.sent), 1)
+        self.assertCountEqual(transport.sent[0]['fcm_tokens'], ['token-1', 'token-2'])
+
+    def test_unregistered_tokens_are_pruned(self):
+        DeviceToken.register(self.user, 'token-2')
+        enqueue_push(self.user, 'Title', 'Body')
+        transport = FakeTransport(invalid_tokens=['token-2'])
+
+        OutboxDispatcher(transport=transport).drain()
+
+        self.assertEqual(PushNotificationOutbox.objects.get().status, 'sent')
+        self.assertEqual(list(self.user.device_tokens.values_list('token', flat=True)), ['token-1'])
+
+    def test_register_moves_token_to_new_user(self):
+        other = self._user()
+        DeviceToken.register(other, 'token-1', 'android')
+
+        self.assertFalse(self.user.device_tokens.exists())
+        self.assertEqual(DeviceToken.objects.get(token='token-1').user_id, other.user_id)
+
+    def test_bulk_enqueue_is_sent_as_one_batch(self):
+        users = [self._user(f'bulk-{i}') for i in range(3)] + [self._user()]
+        rows = enqueue_pushes([(user, 'Title', 'Body', {'n': i}) for i, user in enumerate(users)])
+        transport = FakeTransport()
+
+        OutboxDispatcher(transport=transport).drain()
+
+        # The user without a device is skipped
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(transport.batches, 1)
+        self.assertEqual(len(transport.sent), 3)
+        self.assertEqual(PushNotificationOutbox.objects.filter(status='sent').count(), 3)
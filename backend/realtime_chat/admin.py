@@ -4,7 +4,7 @@ from .models import ChatRoom, Message
 
 @admin.register(ChatRoom)
 class ChatRoomAdmin(admin.ModelAdmin):
-    list_display = ['chat_room_id', 'participant_one', 'participant_two', 'last_message_at', 'created_at']
+    list_display = ['chat_room_id', 'participant_one', 'participant_two', 'last_message_at', 'participant_one_unread_count', 'participant_two_unread_count', 'created_at']
     list_filter = ['created_at', 'last_message_at']
     search_fields = ['participant_one__full_name', 'participant_two__full_name', 'participant_one__email', 'participant_two__email']
     readonly_fields = ['created_at', 'updated_at']
@@ -1,130 +1,114 @@
+import asyncio
 import json
+import time
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .events import room_group_name, user_group_name
+from .framing import BINARY_SUBPROTOCOL, encode_json, frame_event, packb, unpackb
+from .typing_indicator import TypingStats
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatHandlersMixin:
+    """
+    Chat frame handling shared by the per-room and the per-user consumers.
+    Handlers take the resolved ChatRoom so one connection can serve many rooms.
     """
-    WebSocket consumer for real-time one-to-one chat.
     
-    Connection URL: ws://host/ws/chat/<chat_room_id>/?token=<jwt_token>
+    # Typing frames arrive once per keystroke; while a user keeps typing only
+    # one refresh per interval is fanned out
+    TYPING_REFRESH_INTERVAL = 3
+    # Seconds without a typing frame before is_typing=false is sent for the client
+    TYPING_IDLE_TIMEOUT = 6
     
-    Message format (send):
-    {
-        "type": "chat_message",
-        "content": "message text",
-        "message_type": "text"  # optional, defaults to "text"
-    }
+    # Set on accept when the client negotiated BINARY_SUBPROTOCOL
+    binary_frames = False
     
-    Message format (receive):
-    {
-        "type": "chat_message",
-        "message": {
-            "message_id": 1,
-            "sender_id": 1,
-            "sender_name": "John Doe",
-            "content": "Hello",
-            "message_type": "text",
-            "created_at": "2024-01-01T00:00:00Z",
-            "is_read": false
-        }
-    }
-    """
+    async def _accept(self):
+        """Accept, switching to binary MessagePack frames if the client offers them."""
+        self.binary_frames = BINARY_SUBPROTOCOL in self.scope.get('subprotocols', [])
+        await self.accept(subprotocol=BINARY_SUBPROTOCOL if self.binary_frames else None)
     
-    async def connect(self):
-        """Handle WebSocket connection."""
-        self.chat_room_id = self.scope['url_route']['kwargs']['chat_room_id']
-        self.room_group_name = f'chat_{self.chat_room_id}'
-        self.user = None
-        
-        # Authenticate user via JWT token from query string
-        token = self._get_token_from_query_string()
-        if not token:
-            await self.close(code=4001)  # Unauthorized - no token
-            return
-        
-        self.user = await self._authenticate_token(token)
-        if not self.user:
-            await self.close(code=4001)  # Unauthorized - invalid token
-            return
-        
-        # Verify user is participant in this chat room
-        is_participant = await self._verify_chat_room_participant()
-        if not is_participant:
-            await self.close(code=4003)  # Forbidden - not a participant
-            return
-        
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        
-        await self.accept()
-        
-        # Send connection confirmation
-        await self.send(text_data=json.dumps({
-            'type': 'connection_established',
-            'message': 'Connected to chat room',
-            'chat_room_id': int(self.chat_room_id),
-            'user_id': self.user.user_id,
-        }))
+    def _decode_frame(self, text_data, bytes_data):
+        """Client frame as a dict; ValueError if it can't be decoded."""
+        if bytes_data is not None:
+            return unpackb(bytes_data)
+        return json.loads(text_data)
     
-    async def disconnect(self, close_code):
-        """Handle WebSocket disconnection."""
-        # Leave room group
-        if hasattr(self, 'room_group_name'):
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
+    async def _send_json(self, frame):
+        """Encode and send a frame for this connection only."""
+        if self.binary_frames:
+            await self.send(bytes_data=packb(frame))
+        else:
+            await self.send(text_data=encode_json(frame))
+    
+    async def _send_frame(self, event):
+        """Forward a broadcast frame that frame_event already encoded."""
+        if self.binary_frames:
+            await self.send(bytes_data=event['bytes'])
+        else:
+            await self.send(text_data=event['text'])
     
-    async def receive(self, text_data):
-        """Handle incoming WebSocket messages."""
+    async def _send_error(self, message):
+        await self._send_json({
+            'type': 'error',
+            'message': message
+        })
+    
+    async def _handle_sync(self, data):
+        """Answer a sync frame with everything missed since the client's marks."""
+        from .sync import SyncParamError, parse_sync_params
         try:
-            data = json.loads(text_data)
-            message_type = data.get('type', 'chat_message')
-            
-            if message_type == 'chat_message':
-                await self._handle_chat_message(data)
-            elif message_type == 'mark_read':
-                await self._handle_mark_read(data)
-            elif message_type == 'typing':
-                await self._handle_typing(data)
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': 'Invalid JSON format'
-            }))
-        except Exception as e:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': str(e)
-            }))
+            since, read_since, limit = parse_sync_params(data)
+        except SyncParamError as e:
+            await self._send_error(str(e))
+            return
+        payload = await self._build_sync_payload(since, read_since, limit)
+        await self._send_json({'type': 'sync', **payload})
     
-    async def _handle_chat_message(self, data):
+    @database_sync_to_async
+    def _build_sync_payload(self, since, read_since, limit):
+        from .sync import build_sync_payload
+        return build_sync_payload(self.user, since, read_since, limit)
+    
+    async def _dispatch(self, chat_room, data):
+        """Route one client frame for a room."""
+        message_type = data.get('type', 'chat_message')
+        
+        if message_type == 'chat_message':
+            await self._handle_chat_message(chat_room, data)
+        elif message_type == 'mark_read':
+            await self._handle_mark_read(chat_room, data)
+        elif message_type == 'typing':
+            await self._handle_typing(chat_room, data)
+    
+    async def _handle_chat_message(self, chat_room, data):
         """Process and broadcast a chat message."""
         content = data.get('content', '').strip()
         msg_type = data.get('message_type', 'text')
         
         if not content:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': 'Message content cannot be empty'
-            }))
+            await self._send_error('Message content cannot be empty')
             return
         
-        # Save message to database
-        message = await self._save_message(content, msg_type)
+        # Save message to database, or journal it for a batched insert
+        if self._write_behind_enabled():
+            message = await self._buffer_message(chat_room, content, msg_type)
+        else:
+            message = await self._save_message(chat_room, content, msg_type)
         
-        # Broadcast message to room group
+        # Clients clear the indicator when the message arrives
+        self._clear_typing(chat_room.chat_room_id)
+        
+        # Broadcast message to room group (encoded once for all members)
         await self.channel_layer.group_send(
-            self.room_group_name,
-            {
+            room_group_name(chat_room.chat_room_id),
+            frame_event('chat_message', {
                 'type': 'chat_message',
+                'chat_room_id': chat_room.chat_room_id,
                 'message': {
                     'message_id': message.message_id,
                     'sender_id': message.sender.user_id,
@@ -134,66 +118,113 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'created_at': message.created_at.isoformat(),
                     'is_read': message.is_read,
                 }
-            }
+            })
         )
     
-    async def _handle_mark_read(self, data):
-        """Mark messages as read."""
-        message_ids = data.get('message_ids', [])
-        if message_ids:
-            await self._mark_messages_read(message_ids)
+    async def _handle_mark_read(self, chat_room, data):
+        """Move the read watermark (older clients still send message_ids)."""
+        last_read_message_id = data.get('last_read_message_id')
+        if last_read_message_id is None and data.get('message_ids'):
+            last_read_message_id = max(data['message_ids'])
+        if last_read_message_id:
+            watermark = await self._mark_messages_read(chat_room, int(last_read_message_id))
+            if watermark is None:
+                # Already read that far - nothing to announce
+                return
             
             # Notify the room that messages were read
             await self.channel_layer.group_send(
-                self.room_group_name,
-                {
+                room_group_name(chat_room.chat_room_id),
+                frame_event('messages_read', {
                     'type': 'messages_read',
-                    'message_ids': message_ids,
+                    'chat_room_id': chat_room.chat_room_id,
+                    'last_read_message_id': watermark,
                     'read_by': self.user.user_id,
                     'read_at': timezone.now().isoformat(),
-                }
+                })
             )
     
-    async def _handle_typing(self, data):
-        """Broadcast typing indicator."""
-        is_typing = data.get('is_typing', False)
+    async def _handle_typing(self, chat_room, data):
+        """
+        Coalesce typing frames: only start/stop transitions and at most one
+        refresh per TYPING_REFRESH_INTERVAL are broadcast.
+        """
+        is_typing = bool(data.get('is_typing', False))
+        chat_room_id = chat_room.chat_room_id
+        typing = self._typing_state()
+        state = typing.get(chat_room_id)
+        now = time.monotonic()
+        TypingStats.incr('received')
+        
+        if is_typing:
+            if state is not None:
+                state['timer'].cancel()
+            send = state is None or now - state['last_sent'] >= self.TYPING_REFRESH_INTERVAL
+            typing[chat_room_id] = {
+                'chat_room': chat_room,
+                'last_sent': now if send else state['last_sent'],
+                'timer': asyncio.ensure_future(self._typing_idle(chat_room)),
+            }
+        else:
+            send = state is not None
+            self._clear_typing(chat_room_id)
         
+        if send:
+            await self._broadcast_typing(chat_room, is_typing)
+        else:
+            TypingStats.incr('dropped')
+    
+    def _typing_state(self):
+        """Per-connection typing state: chat_room_id -> last broadcast and idle timer."""
+        if not hasattr(self, '_typing'):
+            self._typing = {}
+        return self._typing
+    
+    def _clear_typing(self, chat_room_id):
+        state = self._typing_state().pop(chat_room_id, None)
+        if state is not None:
+            state['timer'].cancel()
+    
+    async def _typing_idle(self, chat_room):
+        """Stop the indicator for a client that went quiet without sending is_typing=false."""
+        await asyncio.sleep(self.TYPING_IDLE_TIMEOUT)
+        self._typing_state().pop(chat_room.chat_room_id, None)
+        TypingStats.incr('idle_stops')
+        await self._broadcast_typing(chat_room, False)
+    
+    async def _stop_typing(self):
+        """Broadcast is_typing=false for every room this connection is typing in."""
+        for chat_room_id in list(self._typing_state()):
+            chat_room = self._typing_state()[chat_room_id]['chat_room']
+            self._clear_typing(chat_room_id)
+            await self._broadcast_typing(chat_room, False)
+    
+    async def _broadcast_typing(self, chat_room, is_typing):
+        TypingStats.incr('broadcast')
         await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'typing_indicator',
+            room_group_name(chat_room.chat_room_id),
+            frame_event('typing_indicator', {
+                'type': 'typing',
+                'chat_room_id': chat_room.chat_room_id,
                 'user_id': self.user.user_id,
                 'user_name': self.user.full_name,
                 'is_typing': is_typing,
-            }
+            }, user_id=self.user.user_id)
         )
     
     # Channel layer event handlers
     async def chat_message(self, event):
         """Send chat message to WebSocket."""
-        await self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message']
-        }))
+        await self._send_frame(event)
     
     async def messages_read(self, event):
         """Send read receipt to WebSocket."""
-        await self.send(text_data=json.dumps({
-            'type': 'messages_read',
-            'message_ids': event['message_ids'],
-            'read_by': event['read_by'],
-            'read_at': event['read_at'],
-        }))
+        await self._send_frame(event)
     
     async def typing_indicator(self, event):
         """Send typing indicator to WebSocket (exclude sender)."""
         if event['user_id'] != self.user.user_id:
-            await self.send(text_data=json.dumps({
-                'type': 'typing',
-                'user_id': event['user_id'],
-                'user_name': event['user_name'],
-                'is_typing': event['is_typing'],
-            }))
+            await self._send_frame(event)
     
     # Helper methods
     def _get_token_from_query_string(self):
@@ -214,20 +245,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return None
     
     @database_sync_to_async
-    def _verify_chat_room_participant(self):
-        """Verify user is a participant in the chat room."""
-        from .models import ChatRoom
-        try:
-            chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
-            return chat_room.is_participant(self.user)
-        except ChatRoom.DoesNotExist:
-            return False
-    
-    @database_sync_to_async
-    def _save_message(self, content, message_type):
+    def _save_message(self, chat_room, content, message_type):
         """Save message to database."""
-        from .models import ChatRoom, Message
-        chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
+        from .models import Message
         message = Message.objects.create(
             chat_room=chat_room,
             sender=self.user,
@@ -236,16 +256,292 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
         return message
     
-    @database_sync_to_async
-    def _mark_messages_read(self, message_ids):
-        """Mark specified messages as read."""
+    async def _buffer_message(self, chat_room, content, message_type):
+        """Assign an ID and journal the message; the DB insert happens in a later batch."""
         from .models import Message
-        Message.objects.filter(
-            message_id__in=message_ids,
-            chat_room_id=self.chat_room_id
-        ).exclude(
-            sender=self.user  # Don't mark own messages
-        ).update(
-            is_read=True,
-            read_at=timezone.now()
+        from .write_behind import MessageIdAllocator, get_buffer
+        message = Message(
+            chat_room_id=chat_room.chat_room_id,
+            sender=self.user,
+            content=content,
+            message_type=message_type,
         )
+        # The buffer numbers the message itself so its queue stays in ID order.
+        # The journal write (and fsync) runs on the shared sync thread, not the
+        # event loop, which also keeps this worker's appends in order
+        append = sync_to_async(get_buffer().append)
+        while not await append(message):
+            await database_sync_to_async(MessageIdAllocator.refill)()
+        return message
+    
+    @staticmethod
+    def _write_behind_enabled():
+        from .write_behind import get_setting
+        return get_setting('ENABLED')
+    
+    @database_sync_to_async
+    def _mark_messages_read(self, chat_room, message_id):
+        """Move the user's read watermark; returns it, or None if unchanged."""
+        return chat_room.mark_read_up_to(self.user.user_id, message_id)
+
+
+class ChatConsumer(ChatHandlersMixin, AsyncWebsocketConsumer):
+    """
+    WebSocket consumer for real-time one-to-one chat.
+    
+    Connection URL: ws://host/ws/chat/<chat_room_id>/?token=<jwt_token>
+    
+    Frames are JSON text by default. Clients that offer the "hisab.msgpack.v1"
+    subprotocol exchange the same frames as binary MessagePack
+    (see realtime_chat/framing.py).
+    
+    Message format (send):
+    {
+        "type": "chat_message",
+        "content": "message text",
+        "message_type": "text"  # optional, defaults to "text"
+    }
+    
+    Message format (receive):
+    {
+        "type": "chat_message",
+        "chat_room_id": 1,
+        "message": {
+            "message_id": 1,
+            "sender_id": 1,
+            "sender_name": "John Doe",
+            "content": "Hello",
+            "message_type": "text",
+            "created_at": "2024-01-01T00:00:00Z",
+            "is_read": false
+        }
+    }
+    """
+    
+    # Seconds a room's participant list is trusted without re-checking the DB
+    ROOM_ACCESS_TIMEOUT = 60
+    
+    async def connect(self):
+        """Handle WebSocket connection."""
+        self.chat_room_id = self.scope['url_route']['kwargs']['chat_room_id']
+        self.room_group_name = room_group_name(self.chat_room_id)
+        self.user = None
+        
+        # Authenticate user via JWT token from query string
+        token = self._get_token_from_query_string()
+        if not token:
+            await self.close(code=4001)  # Unauthorized - no token
+            return
+        
+        self.user = await self._authenticate_token(token)
+        if not self.user:
+            await self.close(code=4001)  # Unauthorized - invalid token
+            return
+        
+        # Verify user is participant in this chat room; the room is kept
+        # for the whole connection so messages don't re-fetch it
+        self.chat_room = await self._get_chat_room()
+        if self.chat_room is None:
+            await self.close(code=4003)  # Forbidden - not a participant
+            return
+        
+        # Join room group
+        await self.channel_layer.group_add(
+            self.room_group_name,
+            self.channel_name
+        )
+        
+        await self._accept()
+        
+        # Send connection confirmation
+        await self._send_json({
+            'type': 'connection_established',
+            'message': 'Connected to chat room',
+            'chat_room_id': int(self.chat_room_id),
+            'user_id': self.user.user_id,
+        })
+    
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection."""
+        await self._stop_typing()
+        
+        # Leave room group
+        if hasattr(self, 'room_group_name'):
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        """Handle incoming WebSocket messages (JSON text or MessagePack binary)."""
+        try:
+            data = self._decode_frame(text_data, bytes_data)
+        except ValueError:
+            await self._send_error('Invalid JSON format' if bytes_data is None else 'Invalid MessagePack format')
+            return
+        try:
+            if data.get('type') == 'sync':
+                await self._handle_sync(data)
+            else:
+                await self._dispatch(self.chat_room, data)
+        except Exception as e:
+            await self._send_error(str(e))
+    
+    @database_sync_to_async
+    def _get_chat_room(self):
+        """
+        Resolve the chat room if the user is a participant, else None.
+        Participants are cached per user for ROOM_ACCESS_TIMEOUT so reconnect
+        storms don't hit the DB; the key is versioned by UserCacheService,
+        which relationship saves (e.g. status changes) bump for both users.
+        A bump only reaches workers sharing the cache, which is why settings
+        require CACHE_LOCATION alongside the multi-process channel layer.
+        """
+        from django.core.cache import cache
+        from core.user_cache import UserCacheService
+        from .models import ChatRoom
+        key = UserCacheService.make_key(self.user.user_id, f'chat:room:{self.chat_room_id}')
+        participants = cache.get(key)
+        if participants is None:
+            room = ChatRoom.objects.filter(
+                chat_room_id=self.chat_room_id
+            ).values_list('participant_one_id', 'participant_two_id').first()
+            participants = list(room) if room else []
+            cache.set(key, participants, timeout=self.ROOM_ACCESS_TIMEOUT)
+        
+        if self.user.user_id not in participants:
+            return None
+        # Only the ids are needed to save messages and update counters
+        return ChatRoom(
+            chat_room_id=int(self.chat_room_id),
+            participant_one_id=participants[0],
+            participant_two_id=participants[1],
+        )
+
+
+class UserConsumer(ChatHandlersMixin, AsyncWebsocketConsumer):
+    """
+    One WebSocket per user carrying every chat room and notifications.
+    
+    Connection URL: ws://host/ws/user/?token=<jwt_token>
+    
+    The connection joins all of the user's room groups plus a personal
+    group. Frames are the same as on ChatConsumer, tagged with the room:
+    {
+        "type": "chat_message",
+        "chat_room_id": 1,
+        "content": "message text"
+    }
+    
+    {"type": "sync", "since": 120, "read_since": "<server_time>"} is answered
+    with everything missed across all rooms (see realtime_chat/sync.py).
+    
+    Server-only frames:
+    - {"type": "notification", "notification": {...}} for new in-app notifications
+    - {"type": "room_joined", "chat_room_id": 2} when a new chat room is created
+    """
+    
+    async def connect(self):
+        """Handle WebSocket connection."""
+        self.user = None
+        self.rooms = {}
+        
+        token = self._get_token_from_query_string()
+        if not token:
+            await self.close(code=4001)  # Unauthorized - no token
+            return
+        
+        self.user = await self._authenticate_token(token)
+        if not self.user:
+            await self.close(code=4001)  # Unauthorized - invalid token
+            return
+        
+        self.user_group_name = user_group_name(self.user.user_id)
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        
+        self.rooms, unread_notifications = await self._load_user_state()
+        for chat_room_id in self.rooms:
+            await self.channel_layer.group_add(room_group_name(chat_room_id), self.channel_name)
+        
+        await self._accept()
+        
+        # Initial state, so the client doesn't need to poll unread counts
+        await self._send_json({
+            'type': 'connection_established',
+            'message': 'Connected',
+            'user_id': self.user.user_id,
+            'chat_room_ids': list(self.rooms),
+            'unread_notifications': unread_notifications,
+        })
+    
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection."""
+        await self._stop_typing()
+        
+        if getattr(self, 'user_group_name', None):
+            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+        for chat_room_id in getattr(self, 'rooms', {}):
+            await self.channel_layer.group_discard(room_group_name(chat_room_id), self.channel_name)
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        """Handle incoming WebSocket messages (JSON text or MessagePack binary)."""
+        try:
+            data = self._decode_frame(text_data, bytes_data)
+        except ValueError:
+            await self._send_error('Invalid JSON format' if bytes_data is None else 'Invalid MessagePack format')
+            return
+        try:
+            if data.get('type') == 'sync':
+                await self._handle_sync(data)
+                return
+            chat_room = self.rooms.get(self._parse_room_id(data.get('chat_room_id')))
+            if chat_room is None:
+                await self._send_error('chat_room_id is missing or you are not a participant')
+                return
+            await self._dispatch(chat_room, data)
+        except Exception as e:
+            await self._send_error(str(e))
+    
+    @staticmethod
+    def _parse_room_id(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    
+    # Personal group event handlers
+    async def notification(self, event):
+        """Send a new in-app notification to WebSocket."""
+        await self._send_frame(event)
+    
+    async def room_joined(self, event):
+        """Subscribe to a chat room created after connecting."""
+        from .models import ChatRoom
+        chat_room_id = event['chat_room_id']
+        if chat_room_id not in self.rooms:
+            self.rooms[chat_room_id] = ChatRoom(
+                chat_room_id=chat_room_id,
+                participant_one_id=event['participant_one_id'],
+                participant_two_id=event['participant_two_id'],
+            )
+            await self.channel_layer.group_add(room_group_name(chat_room_id), self.channel_name)
+        await self._send_frame(event)
+    
+    @database_sync_to_async
+    def _load_user_state(self):
+        """All of the user's rooms (ids only) and the unread notification count."""
+        from django.db.models import Q
+        from notification.models import Notification
+        from .models import ChatRoom
+        rooms = {
+            chat_room_id: ChatRoom(
+                chat_room_id=chat_room_id,
+                participant_one_id=participant_one_id,
+                participant_two_id=participant_two_id,
+            )
+            for chat_room_id, participant_one_id, participant_two_id in ChatRoom.objects.filter(
+                Q(participant_one=self.user) | Q(participant_two=self.user)
+            ).values_list('chat_room_id', 'participant_one_id', 'participant_two_id')
+        }
+        unread = Notification.objects.filter(receiver=self.user, is_read=False).count()
+        return rooms, unread
@@ -0,0 +1,37 @@
+"""
+Pushing channel layer events from synchronous code (views, model saves).
+
+Room groups carry chat traffic; every connected user also joins a personal
+group that UserConsumer uses for notifications and new-room announcements.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def room_group_name(chat_room_id):
+    return f'chat_{chat_room_id}'
+
+
+def user_group_name(user_id):
+    return f'user_{user_id}'
+
+
+def send_to_user(user_id, event):
+    """
+    group_send an event to a user's personal group once the surrounding
+    DB transaction commits. Failures are logged, never raised.
+    """
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(user_group_name(user_id), event)
+        except Exception as e:
+            logger.error(f"Failed to send {event.get('type')} event to user {user_id}: {str(e)}")
+
+    transaction.on_commit(send)
@@ -0,0 +1,189 @@
+"""
+Wire encodings for chat WebSocket frames.
+
+Clients get JSON text frames unless they offer the BINARY_SUBPROTOCOL
+("Sec-WebSocket-Protocol: hisab.msgpack.v1"), in which case every frame in
+both directions is a binary MessagePack frame with the same structure.
+
+Broadcast events are built with frame_event, which encodes the client frame
+in both forms once, before group_send. Consumers forward the pre-encoded
+frame that matches their connection, so fan-out to N members costs no
+serialization per recipient.
+
+The `msgpack` package is used when installed; otherwise a pure-Python
+encoder covering the types frames use (None, bool, int, float, str, bytes,
+list, dict) produces the same bytes.
+"""
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # Pure-Python fallback below
+    msgpack = None
+
+BINARY_SUBPROTOCOL = 'hisab.msgpack.v1'
+
+
+def encode_json(frame):
+    return json.dumps(frame, separators=(',', ':'))
+
+
+def frame_event(handler, frame, **extra):
+    """
+    Channel layer event for a consumer `handler` carrying `frame` encoded
+    for both JSON and binary connections. `extra` keys are for the handler
+    itself (e.g. filtering) and are not sent to the client.
+    """
+    return {
+        'type': handler,
+        'text': encode_json(frame),
+        'bytes': packb(frame),
+        **extra,
+    }
+
+
+def packb(obj):
+    """Encode obj as MessagePack"""
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True)
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def unpackb(data):
+    """Decode one MessagePack value; ValueError if data is malformed"""
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(f'Invalid MessagePack data: {e}') from e
+    try:
+        value, offset = _unpack(data, 0)
+    except (IndexError, TypeError, RecursionError, struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid MessagePack data: {e}') from e
+    if offset != len(data):
+        raise ValueError('Invalid MessagePack data: trailing bytes')
+    return value
+
+
+def _pack_length(length, out, fix_base, fix_max, codes):
+    if length <= fix_max:
+        out.append(fix_base | length)
+    elif codes[0] is not None and length < 0x100:
+        out += struct.pack('>BB', codes[0], length)
+    elif length < 0x10000:
+        out += struct.pack('>BH', codes[1], length)
+    else:
+        out += struct.pack('>BI', codes[2], length)
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -0x20 <= obj < 0:
+            out += struct.pack('>b', obj)
+        elif obj >= 0:
+            for code, fmt, limit in ((0xcc, 'B', 0x100), (0xcd, 'H', 0x10000), (0xce, 'I', 0x100000000), (0xcf, 'Q', 1 << 64)):
+                if obj < limit:
+                    out += struct.pack(f'>B{fmt}', code, obj)
+                    break
+            else:
+                raise ValueError(f'{obj} is too large for MessagePack')
+        else:
+            for code, fmt, limit in ((0xd0, 'b', 0x80), (0xd1, 'h', 0x8000), (0xd2, 'i', 0x80000000), (0xd3, 'q', 1 << 63)):
+                if obj >= -limit:
+                    out += struct.pack(f'>B{fmt}', code, obj)
+                    break
+            else:
+                raise ValueError(f'{obj} is too small for MessagePack')
+    elif isinstance(obj, float):
+        out += struct.pack('>Bd', 0xcb, obj)
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        _pack_length(len(data), out, 0xa0, 31, (0xd9, 0xda, 0xdb))
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        _pack_length(len(obj), out, 0, -1, (0xc4, 0xc5, 0xc6))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_length(len(obj), out, 0x90, 15, (None, 0xdc, 0xdd))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_length(len(obj), out, 0x80, 15, (None, 0xde, 0xdf))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f'{type(obj).__name__} is not MessagePack serializable')
+
+
+# Fixed-width values: code -> struct format
+_FIXED = {
+    0xca: '>f', 0xcb: '>d',
+    0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+    0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q',
+}
+# Length-prefixed values: code -> (kind, length format)
+_SIZED = {
+    0xc4: ('bin', '>B'), 0xc5: ('bin', '>H'), 0xc6: ('bin', '>I'),
+    0xd9: ('str', '>B'), 0xda: ('str', '>H'), 0xdb: ('str', '>I'),
+    0xdc: ('array', '>H'), 0xdd: ('array', '>I'),
+    0xde: ('map', '>H'), 0xdf: ('map', '>I'),
+}
+
+
+def _unpack(data, offset):
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if 0xa0 <= code <= 0xbf:
+        kind, length = 'str', code & 0x1f
+    elif 0x90 <= code <= 0x9f:
+        kind, length = 'array', code & 0x0f
+    elif 0x80 <= code <= 0x8f:
+        kind, length = 'map', code & 0x0f
+    elif code == 0xc0:
+        return None, offset
+    elif code == 0xc2:
+        return False, offset
+    elif code == 0xc3:
+        return True, offset
+    elif code in _FIXED:
+        fmt = _FIXED[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + struct.calcsize(fmt)
+    elif code in _SIZED:
+        kind, fmt = _SIZED[code]
+        length = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+    else:
+        raise ValueError(f'Unsupported MessagePack type 0x{code:02x}')
+
+    if kind in ('str', 'bin'):
+        chunk = bytes(data[offset:offset + length])
+        if len(chunk) != length:
+            raise IndexError('truncated value')
+        return (chunk.decode('utf-8') if kind == 'str' else chunk), offset + length
+    if kind == 'array':
+        items = []
+        for _ in range(length):
+            item, offset = _unpack(data, offset)
+            items.append(item)
+        return items, offset
+    result = {}
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        result[key], offset = _unpack(data, offset)
+    return result, offset
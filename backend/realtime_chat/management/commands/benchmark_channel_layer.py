@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+from core.channel_layers import SQLiteChannelLayer
+
+GROUP = 'benchmark'
+
+
+async def _receive_all(layer, channels, count):
+    """Latencies (seconds) of `count` messages on every channel"""
+    latencies = []
+
+    async def drain(channel):
+        for _ in range(count):
+            message = await layer.receive(channel)
+            latencies.append(time.time() - message['sent_at'])
+
+    await asyncio.gather(*(drain(channel) for channel in channels))
+    return latencies
+
+
+def _sqlite_receiver(path, channels_per_process, count, ready, results):
+    async def run():
+        layer = SQLiteChannelLayer(path, capacity=count + 1)
+        channels = [await layer.new_channel() for _ in range(channels_per_process)]
+        for channel in channels:
+            await layer.group_add(GROUP, channel)
+        ready.put(os.getpid())
+        results.put(await _receive_all(layer, channels, count))
+
+    asyncio.run(run())
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'deliveries': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare group_send fan-out latency and throughput of the in-memory and SQLite channel layers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Receiver processes (SQLite layer)')
+        parser.add_argument('--channels', type=int, default=50, help='Group members per receiver process')
+        parser.add_argument('--messages', type=int, default=200, help='group_send calls')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Milliseconds between group_send calls (0 = burst, measures throughput)'
+        )
+        parser.add_argument('--path', help='SQLite file for the channel layer (default: a temp file)')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        channels = options['channels']
+        count = options['messages']
+        self.interval = options['interval'] / 1000
+
+        memory = asyncio.run(self._bench_memory(processes * channels, count))
+        self._report('in-memory (1 process)', memory)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = options['path'] or os.path.join(tmp, 'channels.sqlite3')
+            sqlite = self._bench_sqlite(path, processes, channels, count)
+        self._report(f'sqlite ({processes} receiver processes)', sqlite)
+
+    def _report(self, label, result):
+        self.stdout.write(self.style.SUCCESS(label))
+        self.stdout.write(
+            f"  {result['deliveries']} deliveries, {result['throughput']:.0f} msg/s, "
+            f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+            f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms"
+        )
+
+    async def _bench_memory(self, members, count):
+        layer = InMemoryChannelLayer(capacity=count + 1)
+        channels = [await layer.new_channel() for _ in range(members)]
+        for channel in channels:
+            await layer.group_add(GROUP, channel)
+
+        receiver = asyncio.ensure_future(_receive_all(layer, channels, count))
+        started = time.time()
+        for i in range(count):
+            await layer.group_send(GROUP, {'type': 'bench', 'seq': i, 'sent_at': time.time()})
+            await asyncio.sleep(self.interval)
+        latencies = await receiver
+        return _summary(latencies, time.time() - started)
+
+    def _bench_sqlite(self, path, processes, channels, count):
+        ready = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=_sqlite_receiver,
+                args=(path, channels, count, ready, results),
+                daemon=True
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            ready.get(timeout=30)
+
+        async def send_all():
+            layer = SQLiteChannelLayer(path, capacity=count + 1)
+            for i in range(count):
+                await layer.group_send(GROUP, {'type': 'bench', 'seq': i, 'sent_at': time.time()})
+                await asyncio.sleep(self.interval)
+
+        started = time.time()
+        asyncio.run(send_all())
+        latencies = []
+        for _ in workers:
+            latencies.extend(results.get(timeout=120))
+        elapsed = time.time() - started
+        for worker in workers:
+            worker.join()
+        return _summary(latencies, elapsed)
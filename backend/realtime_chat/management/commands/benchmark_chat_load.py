@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+import uuid
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.asgi import application
+from hisabauth.models import User
+from realtime_chat.framing import BINARY_SUBPROTOCOL, packb, unpackb
+from realtime_chat.models import ChatRoom
+
+# Benchmark users are created under this domain and deleted afterwards
+EMAIL_DOMAIN = 'loadtest.invalid'
+
+
+class QueryCounter:
+    """execute_wrapper counting queries on every DB connection, whichever thread opened it"""
+
+    def __init__(self):
+        self.active = False
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.active:
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+        connection_created.connect(self._on_connection_created, weak=False)
+
+    def uninstall(self):
+        connection_created.disconnect(self._on_connection_created)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class SimulatedClient:
+    """One WebSocket connection of a benchmark user and the rooms it talks in"""
+
+    def __init__(self, user, token, rooms, path, tag_room, binary):
+        self.user = user
+        self.rooms = rooms
+        self.tag_room = tag_room
+        self.binary = binary
+        self.communicator = WebsocketCommunicator(
+            application,
+            f'{path}?token={token}',
+            subprotocols=[BINARY_SUBPROTOCOL] if binary else None
+        )
+
+    async def send(self, room, **data):
+        if self.tag_room:
+            data['chat_room_id'] = room.chat_room_id
+        if self.binary:
+            await self.communicator.send_to(bytes_data=packb(data))
+        else:
+            await self.communicator.send_json_to(data)
+
+    async def receive(self, timeout=1):
+        payload = await self.communicator.receive_from(timeout=timeout)
+        return unpackb(payload) if isinstance(payload, bytes) else json.loads(payload)
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate concurrent chat users over WebSockets in this process and report '
+        'delivery latency, DB queries and memory per connection'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Simulated users')
+        parser.add_argument('--rooms', type=int, default=10, help='Chat rooms, each between two of the users')
+        parser.add_argument(
+            '--endpoint',
+            choices=['chat', 'user'],
+            default='chat',
+            help='chat: one ws/chat/<id>/ connection per user and room; user: one ws/user/ connection per user'
+        )
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load')
+        parser.add_argument('--message-rate', type=float, default=1, help='Chat messages per second per connection')
+        parser.add_argument('--typing-rate', type=float, default=2, help='Typing frames per second per connection')
+        parser.add_argument('--binary', action='store_true', help=f'Negotiate the {BINARY_SUBPROTOCOL} subprotocol')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the benchmark users, rooms and messages')
+
+    def handle(self, *args, **options):
+        users_count = options['users']
+        rooms_count = options['rooms']
+        if users_count < 2:
+            raise CommandError('--users must be at least 2')
+        if rooms_count < 1 or rooms_count > users_count * (users_count - 1) // 2:
+            raise CommandError('--rooms must be between 1 and users*(users-1)/2 (one room per pair of users)')
+
+        run_id = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(
+                email=f'bench-{run_id}-{i}@{EMAIL_DOMAIN}',
+                full_name=f'Bench User {i}',
+                is_active=True
+            )
+            for i in range(users_count)
+        ]
+        try:
+            rooms = [
+                ChatRoom.get_or_create_room(first, second)[0]
+                for first, second in itertools.islice(itertools.combinations(users, 2), rooms_count)
+            ]
+            clients = self._build_clients(users, rooms, options['endpoint'], options['binary'])
+            self.queries = QueryCounter()
+            self.queries.install()
+            try:
+                result = asyncio.run(self._run(clients, options))
+            finally:
+                self.queries.uninstall()
+        finally:
+            if not options['keep_data']:
+                # Cascades to the rooms and messages
+                User.objects.filter(user_id__in=[user.user_id for user in users]).delete()
+
+        self._report(options, len(clients), result)
+
+    def _build_clients(self, users, rooms, endpoint, binary):
+        rooms_by_user = {user.user_id: [] for user in users}
+        for room in rooms:
+            rooms_by_user[room.participant_one_id].append(room)
+            rooms_by_user[room.participant_two_id].append(room)
+
+        clients = []
+        for user in users:
+            user_rooms = rooms_by_user[user.user_id]
+            if not user_rooms:
+                continue
+            token = str(AccessToken.for_user(user))
+            if endpoint == 'user':
+                clients.append(SimulatedClient(user, token, user_rooms, '/ws/user/', tag_room=True, binary=binary))
+            else:
+                clients.extend(
+                    SimulatedClient(
+                        user, token, [room], f'/ws/chat/{room.chat_room_id}/', tag_room=False, binary=binary
+                    )
+                    for room in user_rooms
+                )
+        return clients
+
+    async def _run(self, clients, options):
+        # Memory is traced only while connecting - tracing slows the load phase down
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for client in clients:
+            connected, code = await client.communicator.connect()
+            if not connected:
+                raise CommandError(f'Connection refused for {client.user.email} (close code {code})')
+            await client.receive()  # connection_established
+        memory_per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / len(clients)
+        tracemalloc.stop()
+
+        self.sent = {}
+        self.latencies = []
+        self.typing_received = 0
+        self.errors = 0
+        receivers = [asyncio.ensure_future(self._receive(client)) for client in clients]
+
+        self.queries.active = True
+        started = time.perf_counter()
+        deadline = started + options['duration']
+        await asyncio.gather(*(
+            self._drive(client, deadline, options['message_rate'], options['typing_rate'])
+            for client in clients
+        ))
+        # Let in-flight messages land before stopping the receivers
+        await asyncio.sleep(1)
+        self.queries.active = False
+        elapsed = time.perf_counter() - started
+
+        for receiver in receivers:
+            receiver.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        for client in clients:
+            await client.communicator.disconnect()
+
+        return {
+            'elapsed': elapsed,
+            'memory_per_connection': memory_per_connection,
+        }
+
+    async def _drive(self, client, deadline, message_rate, typing_rate):
+        """Send chat messages and typing frames at the configured rates until the deadline"""
+        def next_at(rate):
+            return time.perf_counter() + random.expovariate(rate) if rate > 0 else float('inf')
+
+        next_message = next_at(message_rate)
+        next_typing = next_at(typing_rate)
+        while True:
+            due = min(next_message, next_typing)
+            if due >= deadline:
+                return
+            await asyncio.sleep(max(0, due - time.perf_counter()))
+            room = random.choice(client.rooms)
+            if next_message <= next_typing:
+                nonce = uuid.uuid4().hex
+                self.sent[nonce] = time.perf_counter()
+                await client.send(room, type='chat_message', content=nonce)
+                next_message = next_at(message_rate)
+            else:
+                await client.send(room, type='typing', is_typing=True)
+                next_typing = next_at(typing_rate)
+
+    async def _receive(self, client):
+        """Record delivery latency of messages sent by the other participants"""
+        while True:
+            data = await client.receive(timeout=3600)
+            if data['type'] == 'chat_message':
+                message = data['message']
+                if message['sender_id'] != client.user.user_id and message['content'] in self.sent:
+                    self.latencies.append(time.perf_counter() - self.sent[message['content']])
+            elif data['type'] == 'typing':
+                self.typing_received += 1
+            elif data['type'] == 'error':
+                self.errors += 1
+
+    def _report(self, options, connections_count, result):
+        sent = len(self.sent)
+        delivered = len(self.latencies)
+        elapsed = result['elapsed']
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['users']} users, {options['rooms']} rooms, {connections_count} connections "
+            f"(ws/{options['endpoint']}/, {'binary' if options['binary'] else 'JSON'} frames), {elapsed:.1f}s"
+        ))
+        self.stdout.write(f"  memory per connection: {result['memory_per_connection'] / 1024:.1f} KiB")
+        self.stdout.write(
+            f"  messages: {sent} sent ({sent / elapsed:.0f}/s), {delivered} delivered, "
+            f"{sent - delivered} lost or late, {self.errors} errors"
+        )
+        if len(self.latencies) >= 2:
+            quantiles = statistics.quantiles(self.latencies, n=100)
+            self.stdout.write(
+                f"  delivery latency: p50 {quantiles[49] * 1000:.2f} ms, "
+                f"p99 {quantiles[98] * 1000:.2f} ms, max {max(self.latencies) * 1000:.2f} ms"
+            )
+        self.stdout.write(f"  typing indicators received: {self.typing_received}")
+        self.stdout.write(
+            f"  DB queries: {self.queries.count} ({self.queries.count / sent if sent else 0:.1f} per message sent)"
+        )
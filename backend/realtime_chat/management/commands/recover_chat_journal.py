@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from realtime_chat.write_behind import get_setting, recover_journals
+
+
+class Command(BaseCommand):
+    help = 'Replay write-behind chat journals left behind by crashed processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--journal-dir',
+            help='Journal directory (default: CHAT_WRITE_BEHIND JOURNAL_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        journal_dir = options['journal_dir'] or get_setting('JOURNAL_DIR')
+        recovered = recover_journals(journal_dir)
+        self.stdout.write(self.style.SUCCESS(f'Recovered {recovered} chat message(s) from {journal_dir}'))
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_room_summaries(apps, schema_editor):
+    ChatRoom = apps.get_model('realtime_chat', 'ChatRoom')
+    Message = apps.get_model('realtime_chat', 'Message')
+    
+    for room in ChatRoom.objects.iterator():
+        last = Message.objects.filter(chat_room_id=room.chat_room_id).order_by('-created_at', '-message_id').first()
+        unread = Message.objects.filter(chat_room_id=room.chat_room_id, is_read=False)
+        ChatRoom.objects.filter(chat_room_id=room.chat_room_id).update(
+            last_message_id=last.message_id if last else None,
+            last_message_preview=last.content[:255] if last else '',
+            last_message_sender_id=last.sender_id if last else None,
+            participant_one_unread_count=unread.exclude(sender_id=room.participant_one_id).count(),
+            participant_two_unread_count=unread.exclude(sender_id=room.participant_two_id).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime_chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='realtime_chat.message'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_one_unread_count',
+            field=models.PositiveIntegerField(default=0, help_text='Messages from participant_two not yet read by participant_one'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_two_unread_count',
+            field=models.PositiveIntegerField(default=0, help_text='Messages from participant_one not yet read by participant_two'),
+        ),
+        migrations.RunPython(backfill_room_summaries, migrations.RunPython.noop),
+    ]
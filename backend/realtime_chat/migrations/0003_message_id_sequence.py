@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_sequence(apps, schema_editor):
+    Message = apps.get_model('realtime_chat', 'Message')
+    MessageIdSequence = apps.get_model('realtime_chat', 'MessageIdSequence')
+    top = Message.objects.aggregate(top=Max('message_id'))['top'] or 0
+    MessageIdSequence.objects.create(sequence_id=1, next_id=top + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime_chat', '0002_chatroom_last_message_and_unread_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='MessageIdSequence',
+            fields=[
+                ('sequence_id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('next_id', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Message ID Sequence',
+                'verbose_name_plural': 'Message ID Sequences',
+                'db_table': 'chat_message_id_sequence',
+            },
+        ),
+        migrations.RunPython(seed_sequence, migrations.RunPython.noop),
+    ]
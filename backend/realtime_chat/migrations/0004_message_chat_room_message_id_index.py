@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime_chat', '0003_message_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat_room', 'message_id'], name='chat_messag_chat_ro_92dd9a_idx'),
+        ),
+    ]
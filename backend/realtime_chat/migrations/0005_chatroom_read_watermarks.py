@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:40
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_read_watermarks(apps, schema_editor):
+    ChatRoom = apps.get_model('realtime_chat', 'ChatRoom')
+    Message = apps.get_model('realtime_chat', 'Message')
+    
+    for room in ChatRoom.objects.iterator():
+        messages = Message.objects.filter(chat_room_id=room.chat_room_id)
+        updates = {}
+        for reader, sender_id in (('participant_one', room.participant_two_id),
+                                  ('participant_two', room.participant_one_id)):
+            # Highest message the reader had marked read becomes the watermark
+            read = messages.filter(sender_id=sender_id, is_read=True).aggregate(
+                last_read_id=Max('message_id'), last_read_at=Max('read_at')
+            )
+            last_read_id = read['last_read_id'] or 0
+            updates[f'{reader}_last_read_id'] = last_read_id
+            updates[f'{reader}_last_read_at'] = read['last_read_at']
+            updates[f'{reader}_unread_count'] = messages.filter(
+                sender_id=sender_id, message_id__gt=last_read_id
+            ).count()
+        ChatRoom.objects.filter(chat_room_id=room.chat_room_id).update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime_chat', '0004_message_chat_room_message_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_one_last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_one_last_read_id',
+            field=models.PositiveIntegerField(default=0, help_text='Highest message_id participant_one has read'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_two_last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_two_last_read_id',
+            field=models.PositiveIntegerField(default=0, help_text='Highest message_id participant_two has read'),
+        ),
+        migrations.RunPython(backfill_read_watermarks, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 from hisabauth.models import User
 
@@ -25,6 +26,45 @@ class ChatRoom(models.Model):
     # Track last activity for sorting
     last_message_at = models.DateTimeField(null=True, blank=True)
     
+    # Denormalized last message and unread counters so the room list
+    # never has to query messages (maintained by Message.save / mark-read paths)
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    last_message_preview = models.CharField(max_length=255, blank=True)
+    last_message_sender = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    participant_one_unread_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Messages from participant_two not yet read by participant_one"
+    )
+    participant_two_unread_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Messages from participant_one not yet read by participant_two"
+    )
+    
+    # Read watermarks: every message from the other participant with
+    # message_id <= watermark is read. Replaces per-message is_read updates.
+    participant_one_last_read_id = models.PositiveIntegerField(
+        default=0,
+        help_text="Highest message_id participant_one has read"
+    )
+    participant_one_last_read_at = models.DateTimeField(null=True, blank=True)
+    participant_two_last_read_id = models.PositiveIntegerField(
+        default=0,
+        help_text="Highest message_id participant_two has read"
+    )
+    participant_two_last_read_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -49,9 +89,150 @@ class ChatRoom(models.Model):
         """Check if user is a participant in this chat room."""
         return user in [self.participant_one, self.participant_two]
     
+    def _unread_field_for(self, user_id):
+        """Name of the unread counter belonging to a participant."""
+        if user_id == self.participant_one_id:
+            return 'participant_one_unread_count'
+        return 'participant_two_unread_count'
+    
     def get_unread_count(self, user):
         """Get count of unread messages for a specific user."""
-        return self.messages.filter(is_read=False).exclude(sender=user).count()
+        return getattr(self, self._unread_field_for(user.user_id))
+    
+    def record_message(self, message):
+        """
+        Point the room at a new message and bump the recipient's unread
+        counter in one atomic UPDATE.
+        """
+        recipient_field = self._unread_field_for(
+            self.get_other_participant_id(message.sender_id)
+        )
+        preview = message.content[:255]
+        ChatRoom.objects.filter(chat_room_id=self.chat_room_id).update(**{
+            'last_message_id': message.message_id,
+            'last_message_at': message.created_at,
+            'last_message_preview': preview,
+            'last_message_sender_id': message.sender_id,
+            recipient_field: F(recipient_field) + 1,
+            'updated_at': timezone.now(),
+        })
+        self.last_message_id = message.message_id
+        self.last_message_at = message.created_at
+        self.last_message_preview = preview
+        self.last_message_sender_id = message.sender_id
+        setattr(self, recipient_field, getattr(self, recipient_field) + 1)
+    
+    def record_messages(self, messages):
+        """
+        Batch form of record_message for write-behind flushes.
+        The last-message fields only move forward, so replaying an old
+        journal never replaces a newer last message.
+        """
+        if not messages:
+            return
+        counters = {}
+        for message in messages:
+            field = self._unread_field_for(self.get_other_participant_id(message.sender_id))
+            counters[field] = counters.get(field, 0) + 1
+        
+        rooms = ChatRoom.objects.filter(chat_room_id=self.chat_room_id)
+        rooms.update(
+            updated_at=timezone.now(),
+            **{field: F(field) + count for field, count in counters.items()}
+        )
+        
+        last = max(messages, key=lambda message: (message.created_at, message.message_id))
+        rooms.filter(
+            models.Q(last_message_at__isnull=True) | models.Q(last_message_at__lte=last.created_at)
+        ).update(
+            last_message_id=last.message_id,
+            last_message_at=last.created_at,
+            last_message_preview=last.content[:255],
+            last_message_sender_id=last.sender_id
+        )
+    
+    def get_other_participant_id(self, user_id):
+        """Get the other participant's user_id without loading either user."""
+        if user_id == self.participant_one_id:
+            return self.participant_two_id
+        return self.participant_one_id
+    
+    def _read_fields_for(self, user_id):
+        """Names of a participant's (watermark, watermark time) fields."""
+        if user_id == self.participant_one_id:
+            return 'participant_one_last_read_id', 'participant_one_last_read_at'
+        return 'participant_two_last_read_id', 'participant_two_last_read_at'
+    
+    def get_last_read_id(self, user_id):
+        """Highest message_id a participant has read."""
+        return getattr(self, self._read_fields_for(user_id)[0])
+    
+    def get_read_watermark(self, user_id):
+        """(last read message_id, when it was set) for a participant."""
+        id_field, at_field = self._read_fields_for(user_id)
+        return getattr(self, id_field), getattr(self, at_field)
+    
+    def is_message_read(self, message):
+        """
+        Whether the recipient of a message has read it. Sound because messages
+        become visible in message_id order (see write_behind.py).
+        """
+        recipient_id = self.get_other_participant_id(message.sender_id)
+        return message.message_id <= self.get_last_read_id(recipient_id)
+    
+    def get_message_read_at(self, message):
+        """When the recipient's watermark passed the message (None while unread)."""
+        if not self.is_message_read(message):
+            return None
+        return getattr(self, self._read_fields_for(self.get_other_participant_id(message.sender_id))[1])
+    
+    def mark_read_up_to(self, user_id, message_id=None):
+        """
+        Move a participant's read watermark forward to message_id (default:
+        the room's last message). Reading up to the last message is a single
+        conditional UPDATE; a partial read recounts unread messages with an
+        indexed message_id > watermark range count.
+        Returns the new watermark, or None if it did not move.
+        """
+        from .write_behind import get_buffer, get_setting
+        # Buffered messages below the watermark would be read but never
+        # recounted, and later bump the unread counter on flush
+        if get_setting('ENABLED') and get_buffer().flush():
+            self.last_message_id = ChatRoom.objects.values_list(
+                'last_message_id', flat=True
+            ).get(chat_room_id=self.chat_room_id)
+        
+        if message_id is None:
+            message_id = self.last_message_id
+        if not message_id:
+            return None
+        
+        id_field, at_field = self._read_fields_for(user_id)
+        unread_field = self._unread_field_for(user_id)
+        now = timezone.now()
+        behind = ChatRoom.objects.filter(
+            chat_room_id=self.chat_room_id,
+            **{f'{id_field}__lt': message_id}
+        )
+        
+        if behind.filter(last_message_id__lte=message_id).update(**{
+            id_field: message_id, at_field: now, unread_field: 0
+        }):
+            unread = 0
+        else:
+            with transaction.atomic():
+                if not behind.update(**{id_field: message_id, at_field: now}):
+                    return None
+                unread = Message.objects.filter(
+                    chat_room_id=self.chat_room_id,
+                    message_id__gt=message_id
+                ).exclude(sender_id=user_id).count()
+                ChatRoom.objects.filter(chat_room_id=self.chat_room_id).update(**{unread_field: unread})
+        
+        setattr(self, id_field, message_id)
+        setattr(self, at_field, now)
+        setattr(self, unread_field, unread)
+        return message_id
     
     @classmethod
     def get_or_create_room(cls, user1, user2):
@@ -67,6 +248,19 @@ class ChatRoom(models.Model):
             participant_one=user1,
             participant_two=user2
         )
+        if created:
+            # Let open per-user sockets subscribe to the new room
+            from .events import send_to_user
+            from .framing import frame_event
+            event = frame_event(
+                'room_joined',
+                {'type': 'room_joined', 'chat_room_id': room.chat_room_id},
+                chat_room_id=room.chat_room_id,
+                participant_one_id=room.participant_one_id,
+                participant_two_id=room.participant_two_id,
+            )
+            for user in (user1, user2):
+                send_to_user(user.user_id, event)
         return room, created
 
 
@@ -100,12 +294,14 @@ class Message(models.Model):
         default='text'
     )
     
-    # Read status
+    # Legacy read status - no longer written; read state comes from the
+    # room's read watermarks (kept for rollback, backfilled into them)
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
     
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Timestamps (a default rather than auto_now_add so write-behind
+    # flushes keep the time the message was broadcast)
+    created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -113,23 +309,69 @@ class Message(models.Model):
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
         ordering = ['created_at']
+        indexes = [
+            # Delta resync: range scan per room past the client's high-water mark
+            models.Index(fields=['chat_room', 'message_id']),
+        ]
     
     def __str__(self):
         return f"{self.sender.full_name}: {self.content[:50]}"
     
     def mark_as_read(self):
-        """Mark message as read."""
-        if not self.is_read:
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at', 'updated_at'])
+        """Mark message (and everything before it) as read by the recipient."""
+        self.chat_room.mark_read_up_to(
+            self.chat_room.get_other_participant_id(self.sender_id),
+            self.message_id
+        )
     
     def save(self, *args, **kwargs):
-        """Override save to update chat room's last_message_at."""
+        """Override save to update the chat room's last message and unread counter."""
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        if not is_new:
+            super().save(*args, **kwargs)
+            return
+        
+        # Insert and room summary commit together
+        kwargs.setdefault('force_insert', True)
+        
+        from .write_behind import MessageIdAllocator, get_buffer, get_setting
         
-        # Update chat room's last message timestamp
-        if is_new:
-            self.chat_room.last_message_at = self.created_at
-            self.chat_room.save(update_fields=['last_message_at', 'updated_at'])
+        def insert():
+            numbered = self.message_id is None
+            try:
+                with transaction.atomic():
+                    if numbered:
+                        # From the sequence, never the autoincrement, so it can't
+                        # reuse an ID reserved for a buffered message
+                        self.message_id = MessageIdAllocator.reserve_one()
+                    super(Message, self).save(*args, **kwargs)
+                    self.chat_room.record_message(self)
+            except Exception:
+                if numbered:
+                    self.message_id = None
+                raise
+        
+        # With write-behind on, IDs come from the shared block allocator so they
+        # never collide with IDs handed out to messages that are not flushed yet,
+        # and the buffer inserts this one only after the lower IDs it holds
+        if self.message_id is None and get_setting('ENABLED'):
+            get_buffer().insert(self, insert)
+        else:
+            insert()
+
+
+class MessageIdSequence(models.Model):
+    """
+    Single-row high-water mark for message IDs.
+    Processes reserve blocks of IDs from it (see write_behind.MessageIdAllocator).
+    """
+    sequence_id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    next_id = models.BigIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'chat_message_id_sequence'
+        verbose_name = 'Message ID Sequence'
+        verbose_name_plural = 'Message ID Sequences'
+    
+    def __str__(self):
+        return f"Next message ID {self.next_id}"
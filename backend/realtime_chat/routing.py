@@ -9,4 +9,10 @@ websocket_urlpatterns = [
         r'ws/chat/(?P<chat_room_id>\d+)/$',
         consumers.ChatConsumer.as_asgi()
     ),
+    # Multiplexed connection: all of the user's rooms plus notifications
+    # URL: ws://host/ws/user/?token=<jwt_token>
+    re_path(
+        r'ws/user/$',
+        consumers.UserConsumer.as_asgi()
+    ),
 ]
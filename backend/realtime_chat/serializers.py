@@ -31,9 +31,15 @@ class UserBasicSerializer(serializers.ModelSerializer):
 
 
 class MessageSerializer(serializers.ModelSerializer):
-    """Serializer for chat messages."""
+    """
+    Serializer for chat messages.
+    Read state comes from the room's read watermarks: pass the rooms as
+    context['chat_rooms'] ({chat_room_id: ChatRoom}) to avoid a query per message.
+    """
     sender = UserBasicSerializer(read_only=True)
     sender_id = serializers.IntegerField(write_only=True, required=False)
+    is_read = serializers.SerializerMethodField()
+    read_at = serializers.SerializerMethodField()
     
     class Meta:
         model = Message
@@ -49,6 +55,17 @@ class MessageSerializer(serializers.ModelSerializer):
             'created_at',
         ]
         read_only_fields = ['message_id', 'is_read', 'read_at', 'created_at']
+    
+    def _get_room(self, obj):
+        rooms = self.context.get('chat_rooms') or {}
+        return rooms.get(obj.chat_room_id) or obj.chat_room
+    
+    def get_is_read(self, obj):
+        return self._get_room(obj).is_message_read(obj)
+    
+    def get_read_at(self, obj):
+        read_at = self._get_room(obj).get_message_read_at(obj)
+        return read_at.isoformat() if read_at else None
 
 
 class MessageCreateSerializer(serializers.ModelSerializer):
@@ -85,17 +102,21 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         ]
     
     def get_last_message(self, obj):
-        """Get the most recent message in the chat room."""
-        last_msg = obj.messages.order_by('-created_at').first()
-        if last_msg:
-            return {
-                'content': last_msg.content,
-                'sender_id': last_msg.sender.user_id,
-                'sender_name': last_msg.sender.full_name,
-                'created_at': last_msg.created_at.isoformat(),
-                'is_read': last_msg.is_read,
-            }
-        return None
+        """Get the most recent message from the room's denormalized fields."""
+        if obj.last_message_id is None:
+            return None
+        # The sender is always one of the already-loaded participants
+        if obj.last_message_sender_id == obj.participant_one_id:
+            sender, recipient = obj.participant_one, obj.participant_two
+        else:
+            sender, recipient = obj.participant_two, obj.participant_one
+        return {
+            'content': obj.last_message_preview,
+            'sender_id': obj.last_message_sender_id,
+            'sender_name': sender.full_name,
+            'created_at': obj.last_message_at.isoformat(),
+            'is_read': obj.last_message_id <= obj.get_last_read_id(recipient.user_id),
+        }
     
     def get_unread_count(self, obj):
         """Get unread message count for current user."""
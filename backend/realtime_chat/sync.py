@@ -0,0 +1,92 @@
+"""
+Delta resync for reconnecting chat clients.
+
+A client keeps the highest message_id it has seen (`since`) and the
+server_time of its last sync (`read_since`). build_sync_payload returns only
+what changed after those marks across all of the user's rooms: new messages,
+found with a range scan on the (chat_room, message_id) index, and read
+receipts (the other participants' read watermarks). Served over REST
+(chat-rooms/sync/) and as the WebSocket "sync" frame.
+
+`since` is only safe because messages become visible in message_id order:
+direct inserts take their ID from the sequence inside the insert transaction,
+and write-behind keeps that order within its single worker (see write_behind.py).
+"""
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+
+class SyncParamError(ValueError):
+    """Raised for a malformed since / read_since / limit"""
+
+
+def parse_sync_params(params):
+    """(since, read_since, limit) from query params or a WebSocket frame"""
+    try:
+        since = int(params.get('since') or 0)
+        limit = min(int(params.get('limit') or DEFAULT_LIMIT), MAX_LIMIT)
+    except (TypeError, ValueError):
+        raise SyncParamError('since and limit must be integers')
+    if since < 0 or limit < 1:
+        raise SyncParamError('since must be >= 0 and limit >= 1')
+
+    read_since = params.get('read_since')
+    if read_since:
+        read_since = parse_datetime(str(read_since))
+        if read_since is None:
+            raise SyncParamError('read_since must be an ISO 8601 datetime')
+        if timezone.is_naive(read_since):
+            read_since = timezone.make_aware(read_since)
+    return since, read_since or None, limit
+
+
+def build_sync_payload(user, since, read_since=None, limit=DEFAULT_LIMIT):
+    """
+    Messages with message_id > since (oldest first, at most `limit`) and
+    the other participant's read watermark for rooms where it moved after
+    read_since. Without read_since (first sync) every room's watermark is sent.
+    """
+    from .models import ChatRoom, Message
+    from .serializers import MessageSerializer
+
+    server_time = timezone.now()
+    rooms = ChatRoom.objects.filter(
+        Q(participant_one=user) | Q(participant_two=user)
+    ).only(
+        'chat_room_id', 'participant_one_id', 'participant_two_id',
+        'participant_one_last_read_id', 'participant_one_last_read_at',
+        'participant_two_last_read_id', 'participant_two_last_read_at',
+    ).in_bulk()
+
+    messages = list(Message.objects.filter(
+        chat_room_id__in=list(rooms),
+        message_id__gt=since
+    ).select_related('sender__business_profile').order_by('message_id')[:limit + 1])
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+
+    read_receipts = []
+    for chat_room_id, room in rooms.items():
+        other_id = room.get_other_participant_id(user.user_id)
+        last_read_id, read_at = room.get_read_watermark(other_id)
+        if read_at is None or (read_since is not None and read_at <= read_since):
+            continue
+        read_receipts.append({
+            'chat_room_id': chat_room_id,
+            'read_by': other_id,
+            'last_read_message_id': last_read_id,
+            'read_at': read_at.isoformat(),
+        })
+
+    return {
+        'messages': MessageSerializer(messages, many=True, context={'chat_rooms': rooms}).data,
+        'read_receipts': read_receipts,
+        'next_since': messages[-1].message_id if messages else since,
+        'has_more': has_more,
+        # Pass back as read_since on the next sync
+        'server_time': server_time.isoformat(),
+    }
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from hisabauth.models import User
+from . import framing
+from .models import ChatRoom, Message
+from .sync import build_sync_payload
+from .write_behind import (
+    MessageIdAllocator,
+    WriteBehindBuffer,
+    message_to_entry,
+    persist_entries,
+    read_journal,
+    recover_journals,
+)
+
+
+@override_settings(CHAT_WRITE_BEHIND={'AUTOSTART': False})
+class WriteBehindRecoveryTest(TestCase):
+    """Buffered messages survive a crash and replays never duplicate them"""
+
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir, ignore_errors=True)
+        self.alice = User.objects.create_user(email='alice@example.com', full_name='Alice', is_active=True)
+        self.bob = User.objects.create_user(email='bob@example.com', full_name='Bob', is_active=True)
+        self.room, _ = ChatRoom.get_or_create_room(self.alice, self.bob)
+        self.buffer = WriteBehindBuffer(journal_dir=self.journal_dir, autostart=False)
+
+    def _message(self, content, sender=None):
+        return Message(
+            message_id=MessageIdAllocator.next_id(),
+            chat_room_id=self.room.chat_room_id,
+            sender=sender or self.alice,
+            content=content,
+        )
+
+    def _crash(self):
+        # Process death: the journal handle (and its lock) goes away unflushed
+        self.buffer._journal.close()
+
+    def _bob_unread(self):
+        self.room.refresh_from_db()
+        return self.room.get_unread_count(self.bob)
+
+    def test_flush_persists_and_checkpoints_journal(self):
+        for i in range(3):
+            self.buffer.append(self._message(f'hello {i}'))
+        self.assertFalse(Message.objects.exists())
+
+        self.assertEqual(self.buffer.flush(), 3)
+
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertEqual(self.buffer.pending_count(), 0)
+        self.assertEqual(read_journal(self.buffer.journal_path), [])
+        self.assertEqual(self._bob_unread(), 3)
+        self.assertEqual(self.room.last_message_preview, 'hello 2')
+
+    def test_crash_before_flush_is_recovered(self):
+        messages = [self._message(f'hello {i}') for i in range(3)]
+        for message in messages:
+            self.buffer.append(message)
+        self._crash()
+
+        self.assertEqual(recover_journals(self.journal_dir), 3)
+
+        self.assertEqual(
+            sorted(Message.objects.values_list('message_id', flat=True)),
+            sorted(message.message_id for message in messages)
+        )
+        self.assertEqual(self._bob_unread(), 3)
+        self.assertEqual(self.room.last_message_id, messages[-1].message_id)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    def test_crash_between_commit_and_checkpoint_does_not_duplicate(self):
+        for i in range(2):
+            self.buffer.append(self._message(f'hello {i}'))
+        # Rows commit, then the process dies before truncating the journal
+        persist_entries(read_journal(self.buffer.journal_path))
+        self._crash()
+
+        self.assertEqual(recover_journals(self.journal_dir), 0)
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(self._bob_unread(), 2)
+
+    def test_torn_last_line_is_ignored(self):
+        message = self._message('complete')
+        self.buffer.append(message)
+        self._crash()
+        with open(self.buffer.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('{"message_id": 99, "chat_ro')
+
+        self.assertEqual(recover_journals(self.journal_dir), 1)
+        self.assertEqual(Message.objects.get().message_id, message.message_id)
+
+    def test_live_journal_is_left_alone(self):
+        self.buffer.append(self._message('in flight'))
+
+        self.assertEqual(recover_journals(self.journal_dir), 0)
+        self.assertTrue(os.path.exists(self.buffer.journal_path))
+        self.assertEqual(self.buffer.pending_count(), 1)
+
+    def test_replay_keeps_newer_last_message(self):
+        old = self._message('old')
+        entry = message_to_entry(old)
+        Message.objects.create(chat_room=self.room, sender=self.bob, content='newer')
+
+        persist_entries([entry])
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message_preview, 'newer')
+        self.assertEqual(self.room.get_unread_count(self.bob), 1)
+
+    def test_id_taken_by_another_message_is_a_collision(self):
+        stored = Message.objects.create(chat_room=self.room, sender=self.bob, content='stored')
+        entry = message_to_entry(self._message('journaled'))
+        entry['message_id'] = stored.message_id
+
+        with self.assertLogs('realtime_chat.write_behind', 'ERROR'):
+            self.assertEqual(persist_entries([entry]), 0)
+        self.assertEqual(Message.objects.get().content, 'stored')
+
+
+@override_settings(CHAT_WRITE_BEHIND={'ENABLED': True, 'AUTOSTART': False, 'ID_BLOCK_SIZE': 3})
+class WriteBehindOrderTest(TestCase):
+    """With write-behind on, messages still become visible in message_id order"""
+
+    def setUp(self):
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir, ignore_errors=True)
+        self.buffer = WriteBehindBuffer(journal_dir=journal_dir, autostart=False)
+        # Message.save and the consumer share the process-wide buffer; the
+        # allocator starts without a block, like a fresh process
+        for patcher in (
+            mock.patch('realtime_chat.write_behind._buffer', self.buffer),
+            mock.patch.multiple(MessageIdAllocator, _next=None, _end=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.alice = User.objects.create_user(email='alice@example.com', full_name='Alice', is_active=True)
+        self.bob = User.objects.create_user(email='bob@example.com', full_name='Bob', is_active=True)
+        self.room, _ = ChatRoom.get_or_create_room(self.alice, self.bob)
+
+    def _buffered(self, content, sender=None):
+        """The WebSocket path: journaled now, inserted by a later flush"""
+        message = Message(chat_room_id=self.room.chat_room_id, sender=sender or self.alice, content=content)
+        while not self.buffer.append(message):
+            with self.captureOnCommitCallbacks(execute=True):
+                MessageIdAllocator.refill()
+        return message
+
+    def _direct(self, content, sender=None):
+        """The REST path: inserted straight away"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(chat_room=self.room, sender=sender or self.alice, content=content)
+
+    def test_sync_across_interleaved_blocks_misses_nothing(self):
+        seen = []
+        since = 0
+
+        def sync():
+            nonlocal since
+            payload = build_sync_payload(self.bob, since)
+            seen.extend(message['message_id'] for message in payload['messages'])
+            since = payload['next_since']
+
+        self._buffered('a')
+        self._buffered('b')
+        # Takes the last ID of the block - the queued lower IDs go in first
+        self._direct('c')
+        self.assertEqual(self.buffer.pending_count(), 0)
+        sync()
+
+        self._buffered('d')
+        # A block reserved in between leaves a gap in this process's IDs
+        MessageIdAllocator._reserve_block(3)
+        self._buffered('e')
+        self._buffered('f')
+        sync()
+        self._direct('g')
+        self._buffered('h')
+        sync()
+        self.buffer.flush()
+        sync()
+
+        messages = list(Message.objects.order_by('message_id').values_list('message_id', 'content'))
+        self.assertEqual([content for _, content in messages], list('abcdefgh'))
+        self.assertEqual(seen, [message_id for message_id, _ in messages])
+
+    def test_read_watermark_across_interleaved_blocks(self):
+        first = self._buffered('a')
+        self._buffered('b')
+        self._direct('c')
+        read_to = self._buffered('d')
+        MessageIdAllocator._reserve_block(3)
+        unread = self._buffered('e')
+        self._buffered('reply', sender=self.bob)
+
+        # Marked through a room loaded before the queued messages were flushed
+        room = ChatRoom.objects.get(chat_room_id=self.room.chat_room_id)
+        self.assertEqual(room.mark_read_up_to(self.bob.user_id, read_to.message_id), read_to.message_id)
+
+        room.refresh_from_db()
+        self.assertEqual(room.get_unread_count(self.bob), 1)
+        self.assertEqual(room.get_unread_count(self.alice), 1)
+        self.assertTrue(room.is_message_read(first))
+        self.assertTrue(room.is_message_read(read_to))
+        self.assertFalse(room.is_message_read(unread))
+
+        # Reading everything includes what was still queued
+        last = self._buffered('g')
+        self.assertEqual(room.mark_read_up_to(self.bob.user_id), last.message_id)
+        self.assertEqual(self.buffer.flush(), 0)
+
+        room.refresh_from_db()
+        self.assertEqual(room.get_unread_count(self.bob), 0)
+        self.assertTrue(room.is_message_read(unread))
+
+    def test_allocator_never_returns_to_a_lower_block(self):
+        MessageIdAllocator._adopt(10, 13)
+        # An earlier reservation whose commit arrives late
+        MessageIdAllocator._adopt(4, 7)
+
+        self.assertEqual(MessageIdAllocator.try_next_id(), 10)
+
+
+class ReadWatermarkTest(TestCase):
+    """Read state is a per-room watermark with a range-counted unread counter"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', full_name='Alice', is_active=True)
+        self.bob = User.objects.create_user(email='bob@example.com', full_name='Bob', is_active=True)
+        self.room, _ = ChatRoom.get_or_create_room(self.alice, self.bob)
+        self.messages = [
+            Message.objects.create(chat_room=self.room, sender=self.alice, content=f'hello {i}')
+            for i in range(3)
+        ]
+
+    def test_read_to_last_message_clears_unread(self):
+        self.assertEqual(self.room.mark_read_up_to(self.bob.user_id), self.messages[-1].message_id)
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.get_unread_count(self.bob), 0)
+        self.assertTrue(all(self.room.is_message_read(message) for message in self.messages))
+
+    def test_partial_read_recounts_unread(self):
+        self.room.mark_read_up_to(self.bob.user_id, self.messages[0].message_id)
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.get_unread_count(self.bob), 2)
+        self.assertTrue(self.room.is_message_read(self.messages[0]))
+        self.assertFalse(self.room.is_message_read(self.messages[1]))
+
+    def test_watermark_never_moves_back(self):
+        self.room.mark_read_up_to(self.bob.user_id)
+
+        self.assertIsNone(self.room.mark_read_up_to(self.bob.user_id, self.messages[0].message_id))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.get_last_read_id(self.bob.user_id), self.messages[-1].message_id)
+
+
+@mock.patch.object(framing, 'msgpack', None)
+class FramingTest(SimpleTestCase):
+    """The pure-Python MessagePack codec produces standard bytes"""
+
+    def test_known_encodings(self):
+        self.assertEqual(framing.packb({'a': 1}), b'\x81\xa1a\x01')
+        self.assertEqual(framing.packb([None, True, -1, 200]), b'\x94\xc0\xc3\xff\xcc\xc8')
+
+    def test_round_trip(self):
+        frame = {
+            'type': 'chat_message',
+            'chat_room_id': 70000,
+            'message': {'content': 'héllo ' * 20, 'is_read': False, 'ids': list(range(20)), 'score': -1.5},
+        }
+        self.assertEqual(framing.unpackb(framing.packb(frame)), frame)
+
+    def test_malformed_data_raises_value_error(self):
+        for data in (b'\xc1', b'\xa5ab', b'\x81\xa1a', b'\x01\x02'):
+            with self.assertRaises(ValueError):
+                framing.unpackb(data)
+
+    def test_frame_event_encodes_once_for_both_protocols(self):
+        frame = {'type': 'typing', 'user_id': 3, 'is_typing': True}
+        event = framing.frame_event('typing_indicator', frame, user_id=3)
+        self.assertEqual(event['type'], 'typing_indicator')
+        self.assertEqual(event['user_id'], 3)
+        self.assertEqual(framing.unpackb(event['bytes']), frame)
+        self.assertEqual(event['text'], '{"type":"typing","user_id":3,"is_typing":true}')
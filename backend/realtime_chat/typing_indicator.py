@@ -0,0 +1,30 @@
+"""
+Process-wide counters for typing-indicator coalescing (see
+ChatHandlersMixin._handle_typing). Exposed to staff at chat/typing-stats/.
+"""
+import threading
+from collections import Counter
+
+
+class TypingStats:
+    """Typing frames received from clients vs. fanned out to rooms"""
+
+    FIELDS = ('received', 'broadcast', 'dropped', 'idle_stops')
+
+    _lock = threading.Lock()
+    _counts = Counter()
+
+    @classmethod
+    def incr(cls, name):
+        with cls._lock:
+            cls._counts[name] += 1
+
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            return {name: cls._counts[name] for name in cls.FIELDS}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._counts.clear()
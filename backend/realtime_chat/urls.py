@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ChatRoomViewSet, MessageCreateView
+from .views import ChatRoomViewSet, MessageCreateView, TypingStatsView
 
 # Create router for ViewSets
 router = DefaultRouter()
@@ -12,4 +12,7 @@ urlpatterns = [
     
     # Message creation endpoint (REST fallback)
     path('messages/', MessageCreateView.as_view(), name='message-create'),
+    
+    # Typing-indicator coalescing counters (staff only)
+    path('typing-stats/', TypingStatsView.as_view(), name='typing-stats'),
 ]
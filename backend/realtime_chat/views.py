@@ -1,11 +1,13 @@
 from rest_framework import status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from django.db.models import Q
-from .models import ChatRoom, Message
+from .models import ChatRoom
+from .sync import SyncParamError, build_sync_payload, parse_sync_params
+from .typing_indicator import TypingStats
 from .serializers import (
     ChatRoomSerializer,
     ChatRoomCreateSerializer,
@@ -24,6 +26,7 @@ class ChatRoomViewSet(ModelViewSet):
     - GET /chat/chat-rooms/<id>/ - Get chat room details
     - GET /chat/chat-rooms/<id>/messages/ - Get messages for a chat room
     - POST /chat/chat-rooms/<id>/mark_as_read/ - Mark all messages in room as read
+    - GET /chat/chat-rooms/sync/?since=<message_id> - Everything missed across all rooms
     """
     permission_classes = [IsAuthenticated]
     serializer_class = ChatRoomSerializer
@@ -33,7 +36,10 @@ class ChatRoomViewSet(ModelViewSet):
         user = self.request.user
         return ChatRoom.objects.filter(
             Q(participant_one=user) | Q(participant_two=user)
-        ).select_related('participant_one', 'participant_two')
+        ).select_related(
+            'participant_one__business_profile',
+            'participant_two__business_profile',
+        )
     
     def get_serializer_context(self):
         """Add request to serializer context."""
@@ -95,12 +101,38 @@ class ChatRoomViewSet(ModelViewSet):
         messages = messages.order_by('-created_at')[:limit]
         messages = list(reversed(messages))
         
-        serializer = MessageSerializer(messages, many=True)
+        serializer = MessageSerializer(
+            messages,
+            many=True,
+            context={'chat_rooms': {chat_room.chat_room_id: chat_room}}
+        )
         return Response({
             'messages': serializer.data,
             'has_more': len(messages) == limit,
         })
     
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Delta resync after a reconnect.
+        
+        Query params:
+        - since: Highest message_id the client has (default: 0)
+        - read_since: server_time returned by the previous sync
+        - limit: Max messages to return (default: 200, max: 1000)
+        
+        Call again with next_since while has_more is true.
+        """
+        try:
+            since, read_since, limit = parse_sync_params(request.query_params)
+        except SyncParamError as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(
+            build_sync_payload(request.user, since, read_since, limit),
+            status=status.HTTP_200_OK
+        )
+    
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """Mark all messages in chat room as read for current user."""
@@ -112,17 +144,9 @@ class ChatRoomViewSet(ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Mark messages from other user as read
-        updated_count = Message.objects.filter(
-            chat_room=chat_room
-        ).exclude(
-            sender=request.user
-        ).filter(
-            is_read=False
-        ).update(
-            is_read=True,
-            read_at=__import__('django.utils', fromlist=['timezone']).timezone.now()
-        )
+        # Move the read watermark to the last message - a single-row update
+        updated_count = chat_room.get_unread_count(request.user)
+        chat_room.mark_read_up_to(request.user.user_id)
         
         return Response({
             'message': 'Messages marked as read',
@@ -165,3 +189,14 @@ class MessageCreateView(APIView):
         message = serializer.save()
         response_serializer = MessageSerializer(message)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+
+class TypingStatsView(APIView):
+    """
+    Typing-indicator coalescing counters of the serving process (staff only).
+    GET /chat/typing-stats/
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(TypingStats.snapshot(), status=status.HTTP_200_OK)
@@ -0,0 +1,396 @@
+"""
+Write-behind persistence for chat messages.
+
+With CHAT_WRITE_BEHIND['ENABLED'] the consumer gives each message a real
+message_id from MessageIdAllocator, appends it to a per-process journal
+file and broadcasts it straight away. A background thread flushes the
+buffer to the database with bulk_create every FLUSH_INTERVAL_MS or as soon
+as BATCH_SIZE messages are pending, then truncates the journal.
+
+Durability: a message is journaled before it is broadcast. If the process
+dies before a flush, the next process (or `manage.py recover_chat_journal`)
+replays the orphaned journal. Replays skip IDs that already exist, so a
+crash between the DB commit and the journal truncate never duplicates rows
+or double counts unread messages. With FSYNC the journal also survives
+power loss, at the cost of one fsync per message.
+
+Ordering: sync cursors and read watermarks compare message_ids, so a
+message must never become visible before one with a lower ID. Each process
+numbers messages from blocks that only grow, the buffer numbers messages in
+queue order, and direct inserts (WriteBehindBuffer.insert) persist everything
+queued ahead of them first. Across processes blocks interleave, so
+write-behind requires a single worker (see core/settings.py).
+
+Settings (all optional), e.g.:
+    CHAT_WRITE_BEHIND = {
+        'ENABLED': True,
+        'JOURNAL_DIR': '/var/lib/hisab/chat_journal',
+        'FLUSH_INTERVAL_MS': 20,
+        'BATCH_SIZE': 200,
+    }
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
+from django.utils.dateparse import parse_datetime
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows - journals are not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'JOURNAL_DIR': os.path.join(str(settings.BASE_DIR), 'chat_journal'),
+    'FLUSH_INTERVAL_MS': 20,
+    'BATCH_SIZE': 200,
+    # fsync the journal after every append (survives power loss, not just crashes)
+    'FSYNC': False,
+    # Message IDs reserved per sequence round-trip
+    'ID_BLOCK_SIZE': 100,
+    # Start the flusher thread on first append
+    'AUTOSTART': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'CHAT_WRITE_BEHIND', {}).get(name, DEFAULTS[name])
+
+
+class MessageIdAllocator:
+    """
+    Hands out message IDs from blocks reserved on MessageIdSequence.
+    Every Message insert takes its ID from the sequence - a block here with
+    write-behind on, reserve_one() otherwise - so IDs given to buffered
+    messages are never reused by a later insert, even after write-behind
+    is switched off with a journal still on disk. Each newly adopted block lies above the
+    previous one, so a process's IDs only grow; across worker processes
+    blocks interleave, which is why write-behind runs a single worker.
+    """
+
+    _lock = threading.Lock()
+    _next = None
+    _end = None
+
+    @classmethod
+    def try_next_id(cls):
+        """Next ID from the reserved block, or None if it is used up (no DB access)"""
+        with cls._lock:
+            if cls._next is not None and cls._next < cls._end:
+                value = cls._next
+                cls._next += 1
+                return value
+        return None
+
+    @classmethod
+    def next_id(cls):
+        """Next ID, reserving a new block when needed"""
+        value = cls.try_next_id()
+        if value is not None:
+            return value
+        start, end = cls._reserve_block(get_setting('ID_BLOCK_SIZE'))
+        # Keep the rest of the block only once the reservation is committed -
+        # a rolled back reservation would hand the same block to another process
+        transaction.on_commit(lambda: cls._adopt(start + 1, end))
+        return start
+
+    @classmethod
+    def reserve_one(cls):
+        """
+        A single ID for an insert in the caller's transaction. The sequence
+        row stays locked until that commits, so IDs commit in order.
+        """
+        return cls._reserve_block(1)[0]
+
+    @classmethod
+    def refill(cls):
+        """Reserve a new block for try_next_id"""
+        start, end = cls._reserve_block(get_setting('ID_BLOCK_SIZE'))
+        transaction.on_commit(lambda: cls._adopt(start, end))
+
+    @classmethod
+    def _adopt(cls, start, end):
+        with cls._lock:
+            # Concurrent reservations can commit out of order - never go back
+            # to a lower block
+            if cls._end is None or end > cls._end:
+                cls._next, cls._end = start, end
+
+    @staticmethod
+    def _reserve_block(size):
+        from .models import Message, MessageIdSequence
+
+        with transaction.atomic():
+            # Stay ahead of rows inserted with database-assigned IDs while
+            # write-behind was off
+            floor = (Message.objects.aggregate(top=Max('message_id'))['top'] or 0) + 1
+            MessageIdSequence.objects.get_or_create(sequence_id=1, defaults={'next_id': floor})
+            sequence = MessageIdSequence.objects.filter(sequence_id=1)
+            sequence.update(next_id=Greatest(F('next_id'), floor) + size)
+            end = sequence.values_list('next_id', flat=True).get()
+        return end - size, end
+
+
+def message_to_entry(message):
+    """Journal entry for an unsaved Message"""
+    return {
+        'message_id': message.message_id,
+        'chat_room_id': message.chat_room_id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'message_type': message.message_type,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def persist_entries(entries):
+    """
+    Insert journal entries and update their rooms in one transaction.
+    Entries already stored under their message_id are skipped, which makes
+    replaying a journal idempotent. An existing row that is a different
+    message is a collision: it is logged and the entry dropped.
+    Returns the number of rows inserted.
+    """
+    from hisabauth.models import User
+    from .models import ChatRoom, Message
+
+    entries = {entry['message_id']: entry for entry in entries}
+    if not entries:
+        return 0
+
+    with transaction.atomic():
+        existing = {
+            message_id: (chat_room_id, sender_id, created_at)
+            for message_id, chat_room_id, sender_id, created_at in Message.objects.filter(
+                message_id__in=entries
+            ).values_list('message_id', 'chat_room_id', 'sender_id', 'created_at')
+        }
+        new_entries = []
+        for message_id, entry in entries.items():
+            if message_id not in existing:
+                new_entries.append(entry)
+            elif existing[message_id] != (
+                entry['chat_room_id'], entry['sender_id'], parse_datetime(entry['created_at'])
+            ):
+                logger.error(
+                    f"Dropping buffered message {message_id}: the ID is taken by a different message"
+                )
+
+        rooms = ChatRoom.objects.only(
+            'chat_room_id', 'participant_one_id', 'participant_two_id'
+        ).in_bulk({entry['chat_room_id'] for entry in new_entries})
+        senders = set(User.objects.filter(
+            user_id__in={entry['sender_id'] for entry in new_entries}
+        ).values_list('user_id', flat=True))
+
+        messages = []
+        for entry in new_entries:
+            if entry['chat_room_id'] not in rooms or entry['sender_id'] not in senders:
+                # Room or sender was deleted before the flush - cascade semantics
+                logger.warning(f"Dropping buffered message {entry['message_id']}: room or sender no longer exists")
+                continue
+            messages.append(Message(
+                message_id=entry['message_id'],
+                chat_room_id=entry['chat_room_id'],
+                sender_id=entry['sender_id'],
+                content=entry['content'],
+                message_type=entry['message_type'],
+                created_at=parse_datetime(entry['created_at']),
+            ))
+        Message.objects.bulk_create(messages, batch_size=500)
+
+        by_room = {}
+        for message in messages:
+            by_room.setdefault(message.chat_room_id, []).append(message)
+        for chat_room_id, room_messages in by_room.items():
+            rooms[chat_room_id].record_messages(room_messages)
+
+    return len(messages)
+
+
+def read_journal(path):
+    """Entries of a journal file. A torn last line from a crash mid-write is ignored."""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in chat journal {path}")
+    return entries
+
+
+def recover_journals(journal_dir=None):
+    """
+    Replay journals left behind by dead processes and delete them.
+    Journals still locked by a live process are skipped. Returns rows inserted.
+    """
+    journal_dir = journal_dir or get_setting('JOURNAL_DIR')
+    recovered = 0
+    for path in sorted(glob.glob(os.path.join(journal_dir, 'journal-*.log'))):
+        with open(path, 'a+', encoding='utf-8') as journal:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+            inserted = persist_entries(read_journal(path))
+            os.remove(path)
+        if inserted:
+            logger.warning(f"Recovered {inserted} chat message(s) from {path}")
+        recovered += inserted
+    return recovered
+
+
+class WriteBehindBuffer:
+    """Per-process buffer of journaled messages waiting for a bulk insert"""
+
+    def __init__(self, journal_dir=None, autostart=None):
+        self.journal_dir = journal_dir or get_setting('JOURNAL_DIR')
+        self.autostart = get_setting('AUTOSTART') if autostart is None else autostart
+        self.journal_path = None
+        self._journal = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _open_journal(self):
+        if self._journal is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self.journal_path = os.path.join(
+                self.journal_dir, f'journal-{os.getpid()}-{uuid.uuid4().hex[:8]}.log'
+            )
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            if fcntl is not None:
+                # Marks the journal as live so recovery leaves it alone
+                fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return self._journal
+
+    def _write(self, entries, truncate=False):
+        journal = self._open_journal()
+        if truncate:
+            journal.truncate(0)
+        for entry in entries:
+            journal.write(json.dumps(entry) + '\n')
+        journal.flush()
+        if get_setting('FSYNC'):
+            os.fsync(journal.fileno())
+
+    def append(self, message):
+        """
+        Journal an unsaved Message and queue it for flushing. A message without
+        a message_id is numbered here, in queue order. Returns False (and
+        queues nothing) when the reserved ID block is used up - refill it and
+        try again.
+        """
+        with self._lock:
+            if message.message_id is None:
+                message.message_id = MessageIdAllocator.try_next_id()
+                if message.message_id is None:
+                    return False
+            entry = message_to_entry(message)
+            self._write([entry])
+            self._pending.append(entry)
+            pending = len(self._pending)
+        if self.autostart:
+            self._ensure_thread()
+        if pending >= get_setting('BATCH_SIZE'):
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Persist everything pending, then checkpoint the journal. Returns rows inserted."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            return self._persist(batch)
+
+    def insert(self, message, save):
+        """
+        Number a new Message and save it with save() right away (e.g. from the
+        REST API) without overtaking queued messages: everything queued, all
+        with lower IDs, is persisted first and no flush can run in between.
+        """
+        with self._flush_lock:
+            with self._lock:
+                message.message_id = MessageIdAllocator.next_id()
+                batch = list(self._pending)
+            self._persist(batch)
+            save()
+
+    def _persist(self, batch):
+        """Insert a batch taken from the front of the queue; call with _flush_lock held"""
+        if not batch:
+            return 0
+        inserted = persist_entries(batch)
+        with self._lock:
+            # Keep what was appended while the batch was being written
+            self._pending = self._pending[len(batch):]
+            self._write(self._pending, truncate=True)
+        return inserted
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='chat-write-behind',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        try:
+            recover_journals(self.journal_dir)
+        except Exception as e:
+            logger.error(f"Chat journal recovery failed: {str(e)}")
+        while True:
+            self._wakeup.wait(timeout=get_setting('FLUSH_INTERVAL_MS') / 1000)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Entries stay pending and journaled - retried on the next tick
+                logger.error(f"Chat write-behind flush failed: {str(e)}")
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """The process-wide write-behind buffer"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = WriteBehindBuffer()
+            atexit.register(_flush_at_exit)
+        return _buffer
+
+
+def _flush_at_exit():
+    try:
+        _buffer.flush()
+    except Exception as e:
+        # The journal is still on disk and is replayed by the next process
+        logger.error(f"Chat write-behind flush at exit failed: {str(e)}")
@@ -1,66 +1,226 @@
-from django.core.management.base import BaseCommand
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+
+from business_dashboard.models import Business
+from core.user_cache import UserCacheService
+from customer_dashboard.models import Customer, CustomerBusinessRelationship
 from request.models import BusinessCustomerRequest
-from customer_dashboard.models import CustomerBusinessRelationship
 
 
 class Command(BaseCommand):
     help = 'Sync existing accepted connections to CustomerBusinessRelationship table'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Accepted requests processed (and checkpointed) per chunk'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Threads, each syncing its own range of request IDs'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be created without writing relationships or a checkpoint'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(str(settings.BASE_DIR), 'sync_relationships.checkpoint'),
+            help='File recording the last synced request ID of each range'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue from the checkpoint file instead of starting over'
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=10,
+            help='Print progress every N chunks per range (0 for none)'
+        )
+
     def handle(self, *args, **options):
-        # Get all accepted connection requests
-        accepted_requests = BusinessCustomerRequest.objects.filter(status='accepted')
-        
-        created_count = 0
-        skipped_count = 0
-        
-        for request in accepted_requests:
-            sender = request.sender
-            receiver = request.receiver
-            
-            # Determine who is customer and who is business
-            customer = None
-            business = None
-            
-            # Check sender's profile
-            if hasattr(sender, 'customer_profile'):
-                customer = sender.customer_profile
-            if hasattr(sender, 'business_profile'):
-                business = sender.business_profile
-                
-            # Check receiver's profile
-            if hasattr(receiver, 'customer_profile'):
-                customer = receiver.customer_profile
-            if hasattr(receiver, 'business_profile'):
-                business = receiver.business_profile
-            
-            # Create relationship if both exist
-            if customer and business:
-                relationship, created = CustomerBusinessRelationship.objects.get_or_create(
-                    customer=customer,
-                    business=business,
-                    defaults={
-                        'pending_due': 0.00,
-                    }
-                )
-                # Update created_at to match the original request acceptance time
-                if created:
-                    relationship.created_at = request.updated_at
-                    relationship.save(update_fields=['created_at'])
-                    created_count += 1
-                    self.stdout.write(
-                        f'Created: {customer.user.full_name} <-> {business.business_name}'
-                    )
-                else:
-                    skipped_count += 1
-            else:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f'Skipped: {sender.email} <-> {receiver.email} (missing customer/business profile)'
-                    )
-                )
-        
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+
+        self.options = options
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'created': 0, 'existing': 0, 'unmatched': 0}
+        self.started = time.monotonic()
+
+        if options['resume']:
+            self.ranges = self._load_checkpoint()
+        else:
+            self.ranges = self._split_ranges(options['workers'])
+
+        pending = [index for index, id_range in enumerate(self.ranges) if id_range['last_id'] < id_range['end']]
+        if options['workers'] == 1:
+            for index in pending:
+                self._sync_range(index)
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                # list() re-raises the first worker error
+                list(executor.map(self._sync_range_in_thread, pending))
+
+        if not options['dry_run'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+        action = 'Would create' if options['dry_run'] else 'Created'
         self.stdout.write(
             self.style.SUCCESS(
-                f'\nSync complete! Created: {created_count}, Skipped (already exists): {skipped_count}'
+                f"\nSync complete! Requests: {self.counts['requests']}, {action}: {self.counts['created']}, "
+                f"Skipped (already exists): {self.counts['existing']}, "
+                f"Skipped (missing customer/business profile): {self.counts['unmatched']}"
             )
         )
+
+    def _split_ranges(self, workers):
+        """Cut the accepted request IDs into one contiguous range per worker"""
+        bounds = BusinessCustomerRequest.objects.filter(status='accepted').aggregate(
+            low=Min('business_customer_request_id'),
+            high=Max('business_customer_request_id')
+        )
+        if bounds['low'] is None:
+            return []
+        low, high = bounds['low'], bounds['high']
+        step = max(1, -(-(high - low + 1) // workers))
+        return [
+            {'start': start, 'end': min(start + step - 1, high), 'last_id': start - 1}
+            for start in range(low, high + 1, step)
+        ]
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.options['checkpoint'], 'r', encoding='utf-8') as checkpoint:
+                ranges = json.load(checkpoint)['ranges']
+        except FileNotFoundError:
+            raise CommandError(f"No checkpoint at {self.options['checkpoint']} to resume from")
+        except (ValueError, KeyError) as e:
+            raise CommandError(f"Unreadable checkpoint {self.options['checkpoint']}: {e}")
+        self.stdout.write(
+            f"Resuming {sum(1 for id_range in ranges if id_range['last_id'] < id_range['end'])} "
+            f"unfinished range(s) from {self.options['checkpoint']}"
+        )
+        return ranges
+
+    def _save_checkpoint(self):
+        """Atomically rewrite the checkpoint; call with self.lock held"""
+        path = self.options['checkpoint']
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint:
+            json.dump({'ranges': self.ranges}, checkpoint)
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        os.replace(temp_path, path)
+
+    def _sync_range(self, index):
+        id_range = self.ranges[index]
+        requests = BusinessCustomerRequest.objects.filter(
+            status='accepted',
+            business_customer_request_id__gt=id_range['last_id'],
+            business_customer_request_id__lte=id_range['end']
+        ).order_by('business_customer_request_id').values_list(
+            'business_customer_request_id', 'sender_id', 'receiver_id', 'updated_at'
+        )
+        batch_size = self.options['batch_size']
+
+        chunks = 0
+        chunk = []
+        for row in requests.iterator(chunk_size=batch_size):
+            chunk.append(row)
+            if len(chunk) >= batch_size:
+                chunks += 1
+                self._sync_chunk(index, chunk, chunks)
+                chunk = []
+        if chunk:
+            chunks += 1
+            self._sync_chunk(index, chunk, chunks)
+
+        with self.lock:
+            id_range['last_id'] = id_range['end']
+            if not self.options['dry_run']:
+                self._save_checkpoint()
+
+    def _sync_range_in_thread(self, index):
+        try:
+            self._sync_range(index)
+        finally:
+            # Each worker thread opened its own connection
+            connection.close()
+
+    def _sync_chunk(self, index, chunk, chunks):
+        """Create the missing relationships of one chunk of (id, sender, receiver, accepted at) rows"""
+        user_ids = {user_id for _, sender_id, receiver_id, _ in chunk for user_id in (sender_id, receiver_id)}
+        customer_ids = dict(Customer.objects.filter(user_id__in=user_ids).values_list('user_id', 'customer_id'))
+        business_ids = dict(Business.objects.filter(user_id__in=user_ids).values_list('user_id', 'business_id'))
+
+        # Same rule as accepting a request: the receiver's profile wins
+        accepted_at = {}
+        unmatched = 0
+        for _, sender_id, receiver_id, updated_at in chunk:
+            customer_id = customer_ids.get(receiver_id) or customer_ids.get(sender_id)
+            business_id = business_ids.get(receiver_id) or business_ids.get(sender_id)
+            if customer_id and business_id:
+                accepted_at.setdefault((customer_id, business_id), (updated_at, sender_id, receiver_id))
+            else:
+                unmatched += 1
+                if self.options['verbosity'] >= 2:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f'Skipped: user {sender_id} <-> user {receiver_id} (missing customer/business profile)'
+                        )
+                    )
+
+        existing = set(CustomerBusinessRelationship.objects.filter(
+            customer_id__in={customer_id for customer_id, _ in accepted_at},
+            business_id__in={business_id for _, business_id in accepted_at}
+        ).values_list('customer_id', 'business_id'))
+        missing = {pair: value for pair, value in accepted_at.items() if pair not in existing}
+
+        if missing and not self.options['dry_run']:
+            # created_at matches the original request acceptance time
+            CustomerBusinessRelationship.objects.bulk_create([
+                CustomerBusinessRelationship(
+                    customer_id=customer_id,
+                    business_id=business_id,
+                    pending_due=0.00,
+                    created_at=updated_at
+                )
+                for (customer_id, business_id), (updated_at, _, _) in missing.items()
+            ], ignore_conflicts=True)
+            # What the per-row save() override would have done
+            UserCacheService.bump(*(
+                user_id for _, sender_id, receiver_id in missing.values() for user_id in (sender_id, receiver_id)
+            ))
+
+        with self.lock:
+            self.counts['requests'] += len(chunk)
+            self.counts['created'] += len(missing)
+            self.counts['existing'] += len(accepted_at) - len(missing)
+            self.counts['unmatched'] += unmatched
+            self.ranges[index]['last_id'] = chunk[-1][0]
+            if not self.options['dry_run']:
+                self._save_checkpoint()
+
+            progress_every = self.options['progress_every']
+            if progress_every and chunks % progress_every == 0:
+                elapsed = time.monotonic() - self.started
+                self.stdout.write(
+                    f"Range {index + 1}/{len(self.ranges)} at request {chunk[-1][0]}: "
+                    f"{self.counts['requests']} requests, {self.counts['created']} created "
+                    f"({self.counts['requests'] / elapsed if elapsed else 0:.0f} requests/s)"
+                )
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from core.user_cache import UserCacheService
 
 
 class BusinessCustomerRequest(models.Model):
@@ -44,4 +45,13 @@ class BusinessCustomerRequest(models.Model):
     
     def __str__(self):
         return f"Request {self.business_customer_request_id}: {self.sender.email} -> {self.receiver.email} ({self.status})"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        UserCacheService.bump(self.sender_id, self.receiver_id)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        UserCacheService.bump(self.sender_id, self.receiver_id)
+        return result
 
@@ -159,8 +159,8 @@ class BulkSendRequestSerializer(serializers.Serializer):
         if not receivers:
             raise serializers.ValidationError("Receivers list cannot be empty")
         
-        validated_receivers = []
         errors = []
+        lookups = []
         
         for idx, receiver_data in enumerate(receivers):
             # Check that each item has either email or user_id
@@ -178,21 +178,38 @@ class BulkSendRequestSerializer(serializers.Serializer):
                 })
                 continue
             
-            # Find the receiver user
-            try:
-                if receiver_data.get('email'):
-                    user = User.objects.get(email=receiver_data['email'])
-                else:
-                    user = User.objects.get(user_id=receiver_data['user_id'])
-                
-                validated_receivers.append(user)
-            except User.DoesNotExist:
-                field = 'email' if receiver_data.get('email') else 'user_id'
-                value = receiver_data.get('email') or receiver_data.get('user_id')
+            field = 'email' if receiver_data.get('email') else 'user_id'
+            lookups.append((idx, field, receiver_data[field]))
+        
+        # Find all receiver users with one query per lookup field
+        emails = {value for _, field, value in lookups if field == 'email'}
+        user_ids = set()
+        for _, field, value in lookups:
+            if field == 'user_id':
+                try:
+                    user_ids.add(int(value))
+                except (TypeError, ValueError):
+                    pass
+        users_by_email = User.objects.in_bulk(emails, field_name='email') if emails else {}
+        users_by_id = User.objects.in_bulk(user_ids) if user_ids else {}
+        
+        validated_receivers = []
+        for idx, field, value in lookups:
+            if field == 'email':
+                user = users_by_email.get(value)
+            else:
+                try:
+                    user = users_by_id.get(int(value))
+                except (TypeError, ValueError):
+                    user = None
+            
+            if user is None:
                 errors.append({
                     'index': idx,
                     'error': f"User with {field} '{value}' not found"
                 })
+                continue
+            validated_receivers.append(user)
         
         if errors:
             raise serializers.ValidationError({
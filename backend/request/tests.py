@@ -1,3 +1,310 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from business_dashboard.models import Business
+from customer_dashboard.models import Customer, CustomerBusinessRelationship
+from hisabauth.models import User
+from .models import BusinessCustomerRequest
+
+
+class SearchUsersQueryCountTest(APITestCase):
+    """search-users must resolve connection status without a query per user"""
+
+    url = '/api/request/connections/search-users/'
+
+    def setUp(self):
+        self.me = User.objects.create_user(
+            email='me@example.com', full_name='Me', is_active=True
+        )
+        self.client.force_authenticate(user=self.me)
+
+    def _create_users(self, count, start=0):
+        users = []
+        for i in range(start, start + count):
+            user = User.objects.create_user(
+                email=f'user{i}@example.com', full_name=f'User {i:03d}', is_active=True
+            )
+            # Alternate direction so both sides of the OR are exercised
+            if i % 2:
+                BusinessCustomerRequest.objects.create(sender=self.me, receiver=user)
+            else:
+                BusinessCustomerRequest.objects.create(sender=user, receiver=self.me)
+            users.append(user)
+        return users
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        self._create_users(2)
+        small_count, _ = self._count_queries()
+
+        self._create_users(20, start=2)
+        large_count, response = self._count_queries()
+
+        self.assertEqual(small_count, large_count)
+        # count + page + one batched request lookup
+        self.assertEqual(large_count, 3)
+        self.assertEqual(len(response.data['results']), 22)
+
+    def test_connection_status_is_reported(self):
+        sent_to, received_from = self._create_users(2, start=1)
+        _, response = self._count_queries()
+        results = {row['user_id']: row for row in response.data['results']}
+
+        self.assertEqual(results[sent_to.user_id]['connection_status'], 'pending')
+        self.assertTrue(results[sent_to.user_id]['is_sender'])
+        self.assertEqual(results[received_from.user_id]['connection_status'], 'pending')
+        self.assertFalse(results[received_from.user_id]['is_sender'])
+
+
+class ConnectedUsersLimitTest(APITestCase):
+    """connected_users clamps limit into 1..200"""
+
+    url = '/api/request/connections/connected/'
+
+    def setUp(self):
+        self.me = User.objects.create_user(
+            email='me@example.com', full_name='Me', is_active=True
+        )
+        for i in range(2):
+            other = User.objects.create_user(
+                email=f'user{i}@example.com', full_name=f'User {i}', is_active=True
+            )
+            BusinessCustomerRequest.objects.create(sender=self.me, receiver=other, status='accepted')
+        self.client.force_authenticate(user=self.me)
+
+    def test_zero_limit_returns_one_connection(self):
+        response = self.client.get(self.url, {'limit': 0})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['connected_users']), 1)
+        self.assertTrue(response.data['has_more'])
+        self.assertIsNotNone(response.data['next_cursor'])
+
+    def test_negative_limit_returns_one_connection(self):
+        response = self.client.get(self.url, {'limit': -5})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['connected_users']), 1)
+
+
+class BulkSendRequestQueryCountTest(APITestCase):
+    """bulk-send-request must not run queries per receiver"""
+
+    url = '/api/request/connections/bulk-send-request/'
+
+    def setUp(self):
+        self.me = User.objects.create_user(
+            email='me@example.com', full_name='Me', is_active=True
+        )
+        self.client.force_authenticate(user=self.me)
+        self.next_user = 0
+
+    def _create_users(self, count):
+        users = []
+        for _ in range(count):
+            users.append(User.objects.create_user(
+                email=f'user{self.next_user}@example.com',
+                full_name=f'User {self.next_user:03d}',
+                is_active=True
+            ))
+            self.next_user += 1
+        return users
+
+    def _send(self, users):
+        receivers = [
+            {'email': user.email} if i % 2 else {'user_id': user.user_id}
+            for i, user in enumerate(users)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'receivers': receivers}, format='json')
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        small_count, response = self._send(self._create_users(2))
+        self.assertEqual(response.data['successful'], 2)
+
+        large_count, response = self._send(self._create_users(20))
+        self.assertEqual(response.data['successful'], 20)
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(BusinessCustomerRequest.objects.filter(sender=self.me).count(), 22)
+
+    def test_results_are_reported_per_receiver(self):
+        pending, incoming, new = self._create_users(3)
+        BusinessCustomerRequest.objects.create(sender=self.me, receiver=pending)
+        BusinessCustomerRequest.objects.create(sender=incoming, receiver=self.me)
+
+        _, response = self._send([pending, incoming, new])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {row['user_id'] for row in response.data['results']['skipped']},
+            {pending.user_id, incoming.user_id}
+        )
+        successful = response.data['results']['successful']
+        self.assertEqual([row['user_id'] for row in successful], [new.user_id])
+        self.assertEqual(
+            successful[0]['request_id'],
+            BusinessCustomerRequest.objects.get(sender=self.me, receiver=new).business_customer_request_id
+        )
+        self.assertEqual(new.received_notifications.count(), 1)
+
+
+class BulkUpdateStatusQueryCountTest(APITestCase):
+    """bulk-update-status must not run queries per request"""
+
+    url = '/api/request/connections/bulk-update-status/'
+
+    def setUp(self):
+        self.me = User.objects.create_user(
+            email='shop@example.com', full_name='Shop', is_active=True
+        )
+        self.business = Business.objects.create(user=self.me, business_name='Shop')
+        self.next_user = 0
+
+    def _create_requests(self, count):
+        requests = []
+        for _ in range(count):
+            customer = User.objects.create_user(
+                email=f'customer{self.next_user}@example.com',
+                full_name=f'Customer {self.next_user:03d}',
+                is_active=True
+            )
+            Customer.objects.create(user=customer)
+            requests.append(BusinessCustomerRequest.objects.create(sender=customer, receiver=self.me))
+            self.next_user += 1
+        return requests
+
+    def _update(self, request_ids, new_status='accepted'):
+        # A fresh user per call so cached profiles don't carry over between requests
+        self.client.force_authenticate(user=User.objects.get(user_id=self.me.user_id))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(
+                self.url, {'request_ids': request_ids, 'status': new_status}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def _ids(self, requests):
+        return [connection_request.business_customer_request_id for connection_request in requests]
+
+    def test_query_count_is_constant(self):
+        small_count, response = self._update(self._ids(self._create_requests(2)))
+        self.assertEqual(response.data['successful'], 2)
+
+        large_count, response = self._update(self._ids(self._create_requests(20)))
+        self.assertEqual(response.data['successful'], 20)
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(
+            CustomerBusinessRelationship.objects.filter(business=self.business).count(), 22
+        )
+
+    def test_results_are_reported_per_request(self):
+        accepted, pending = self._create_requests(2)
+        accepted.status = 'accepted'
+        accepted.save()
+        outsider_request = BusinessCustomerRequest.objects.create(sender=self.me, receiver=pending.sender)
+
+        _, response = self._update(
+            self._ids([accepted, pending, outsider_request, pending]) + [999999],
+            new_status='rejected'
+        )
+
+        results = response.data['results']
+        self.assertEqual(
+            [row['request_id'] for row in results['successful']],
+            [pending.business_customer_request_id]
+        )
+        self.assertEqual(
+            [row['request_id'] for row in results['skipped']],
+            self._ids([accepted, pending])
+        )
+        self.assertEqual(
+            [row['request_id'] for row in results['failed']],
+            [outsider_request.business_customer_request_id, 999999]
+        )
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'rejected')
+        self.assertFalse(CustomerBusinessRelationship.objects.exists())
+        self.assertEqual(pending.sender.received_notifications.count(), 1)
+
+
+class SyncRelationshipsCommandTest(TestCase):
+    """sync_relationships backfills relationships in checkpointed chunks"""
+
+    def setUp(self):
+        self.shop = User.objects.create_user(email='shop@example.com', full_name='Shop', is_active=True)
+        self.business = Business.objects.create(user=self.shop, business_name='Shop')
+        self.accepted_at = timezone.now() - datetime.timedelta(days=30)
+        self.requests = []
+        for i in range(5):
+            customer = User.objects.create_user(
+                email=f'customer{i}@example.com', full_name=f'Customer {i}', is_active=True
+            )
+            Customer.objects.create(user=customer)
+            self.requests.append(BusinessCustomerRequest.objects.create(
+                sender=customer, receiver=self.shop, status='accepted'
+            ))
+        # No profiles on either side - never matched
+        loner = User.objects.create_user(email='loner@example.com', full_name='Loner', is_active=True)
+        BusinessCustomerRequest.objects.create(sender=loner, receiver=self.requests[0].sender, status='accepted')
+        BusinessCustomerRequest.objects.filter(status='accepted').update(updated_at=self.accepted_at)
+
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'sync.checkpoint')
+
+    def _sync(self, *args):
+        out = io.StringIO()
+        call_command('sync_relationships', '--batch-size', '2', '--checkpoint', self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_creates_missing_relationships_with_acceptance_time(self):
+        CustomerBusinessRelationship.objects.create(
+            customer=self.requests[0].sender.customer_profile, business=self.business
+        )
+
+        output = self._sync()
+
+        self.assertIn('Created: 4, Skipped (already exists): 1, Skipped (missing customer/business profile): 1', output)
+        relationships = CustomerBusinessRelationship.objects.filter(business=self.business)
+        self.assertEqual(relationships.count(), 5)
+        self.assertEqual(relationships.filter(created_at=self.accepted_at).count(), 4)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_dry_run_writes_nothing(self):
+        output = self._sync('--dry-run')
+
+        self.assertIn('Would create: 5', output)
+        self.assertFalse(CustomerBusinessRelationship.objects.exists())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_skips_checkpointed_requests(self):
+        first, second = self.requests[:2]
+        with open(self.checkpoint, 'w', encoding='utf-8') as checkpoint:
+            json.dump({'ranges': [{
+                'start': first.business_customer_request_id,
+                'end': BusinessCustomerRequest.objects.order_by('-business_customer_request_id')[0].business_customer_request_id,
+                'last_id': second.business_customer_request_id,
+            }]}, checkpoint)
+
+        output = self._sync('--resume')
 
-# Create your tests here.
+        self.assertIn('Created: 3', output)
+        self.assertFalse(
+            CustomerBusinessRelationship.objects.filter(
+                customer__user__in=[first.sender, second.sender]
+            ).exists()
+        )
@@ -16,6 +16,7 @@ from .serializers import (
     BulkUpdateStatusSerializer
 )
 from hisabauth.models import User
+from hisabauth.search import search_user_ids
 from notification.models import Notification
 from customer_dashboard.models import CustomerBusinessRelationship
 from core.firebase_service import FirebaseService
@@ -51,7 +52,8 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         Search/list users with cursor-based pagination.
         
         Query params:
-            - search (optional): Filter by email, phone_number, or full_name
+            - search (optional): Prefix/fuzzy match on email, phone_number or
+              full_name words, ranked by match quality (see hisabauth/search.py)
             - page (optional): Page number (default: 1)
             - page_size (optional): Items per page (default: 20, max: 50)
         
@@ -59,45 +61,55 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         Always excludes the current authenticated user.
         """
         search_query = request.query_params.get('search', '').strip()
+        paginator = UserSearchPagination()
         
-        # Base queryset: all active users except the current user
-        users_qs = User.objects.filter(
-            is_active=True
-        ).exclude(
-            user_id=request.user.user_id
-        ).order_by('full_name', 'user_id')
-        
-        # Apply search filter if provided
         if search_query:
-            users_qs = users_qs.filter(
-                Q(email__icontains=search_query) | 
-                Q(phone_number__icontains=search_query) |
-                Q(full_name__icontains=search_query)
-            )
-        
-        # Paginate
-        paginator = UserSearchPagination()
-        page = paginator.paginate_queryset(users_qs, request)
+            # Ranked prefix/fuzzy matches from the search token index
+            ranked_ids = search_user_ids(search_query, exclude_user_id=request.user.user_id)
+            page_ids = paginator.paginate_queryset(ranked_ids, request) or []
+            users_by_id = User.objects.filter(is_active=True).in_bulk(page_ids)
+            page = [users_by_id[user_id] for user_id in page_ids if user_id in users_by_id]
+        else:
+            # Base queryset: all active users except the current user
+            users_qs = User.objects.filter(
+                is_active=True
+            ).exclude(
+                user_id=request.user.user_id
+            ).order_by('full_name', 'user_id')
+            page = paginator.paginate_queryset(users_qs, request)
         
         if page is None:
             page = []
         
+        # Resolve connection status for the whole page in one query,
+        # keeping the newest request per user (same as .first() per user)
+        page_ids = [user.user_id for user in page]
+        requests_by_user = {}
+        if page_ids:
+            page_requests = BusinessCustomerRequest.objects.filter(
+                Q(sender=request.user, receiver_id__in=page_ids) |
+                Q(sender_id__in=page_ids, receiver=request.user)
+            ).order_by('-created_at')
+            for existing_request in page_requests:
+                other_id = (
+                    existing_request.receiver_id
+                    if existing_request.sender_id == request.user.user_id
+                    else existing_request.sender_id
+                )
+                requests_by_user.setdefault(other_id, existing_request)
+        
         # Build results with connection status
         results = []
         for user in page:
             user_data = UserSearchSerializer(user).data
             
-            # Check if there's an existing request
-            existing_request = BusinessCustomerRequest.objects.filter(
-                Q(sender=request.user, receiver=user) |
-                Q(sender=user, receiver=request.user)
-            ).first()
+            existing_request = requests_by_user.get(user.user_id)
             
             user_data['connection_status'] = None
             if existing_request:
                 user_data['connection_status'] = existing_request.status
                 user_data['request_id'] = existing_request.business_customer_request_id
-                user_data['is_sender'] = existing_request.sender == request.user
+                user_data['is_sender'] = existing_request.sender_id == request.user.user_id
             
             results.append(user_data)
         
@@ -171,22 +183,19 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
             type="connection_request"
         )
         
-        # Send push notification to receiver if they have FCM token
-        if receiver.fcm_token:
-            try:
-                logger.info(f"Attempting to send push notification to {receiver.email}")
-                logger.info(f"Receiver FCM Token: {receiver.fcm_token[:20]}...")
-                success = FirebaseService.send_connection_request_notification(
-                    receiver.fcm_token,
-                    request.user.full_name,
-                    request.user.email
-                )
-                if success:
-                    logger.info(f"Push notification sent successfully to {receiver.email}")
-                else:
-                    logger.error(f"Failed to send push notification to {receiver.email}")
-            except Exception as e:
-                logger.error(f"Exception while sending push notification to {receiver.email}: {str(e)}")
+        # Send push notification to all of the receiver's devices
+        try:
+            success = FirebaseService.send_connection_request_notification(
+                receiver,
+                request.user.full_name,
+                request.user.email
+            )
+            if success:
+                logger.info(f"Push notification queued for {receiver.email}")
+            else:
+                logger.info(f"No push devices registered for {receiver.email}")
+        except Exception as e:
+            logger.error(f"Exception while queueing push notification for {receiver.email}: {str(e)}")
         
         return Response(
             {
@@ -212,6 +221,7 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         receivers = serializer.validated_data['receivers']
+        receiver_ids = [receiver.user_id for receiver in receivers]
         
         # Track results
         results = {
@@ -220,86 +230,75 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
             'skipped': []
         }
         
-        # Check existing connections and requests
-        from django.db import transaction
+        # Existing connections with any of the receivers, in one query
+        connected_ids = set()
+        for customer_user_id, business_user_id in CustomerBusinessRelationship.objects.filter(
+            Q(customer__user=request.user, business__user_id__in=receiver_ids) |
+            Q(customer__user_id__in=receiver_ids, business__user=request.user)
+        ).values_list('customer__user_id', 'business__user_id'):
+            connected_ids.add(
+                business_user_id if customer_user_id == request.user.user_id else customer_user_id
+            )
+        
+        # Existing requests in either direction, in one query
+        # (newest per user, same as .first() per receiver)
+        requests_by_user = {}
+        for existing_request in BusinessCustomerRequest.objects.filter(
+            Q(sender=request.user, receiver_id__in=receiver_ids) |
+            Q(sender_id__in=receiver_ids, receiver=request.user)
+        ).order_by('-created_at'):
+            other_id = (
+                existing_request.receiver_id
+                if existing_request.sender_id == request.user.user_id
+                else existing_request.sender_id
+            )
+            requests_by_user.setdefault(other_id, existing_request)
         
+        new_receivers = []
         for receiver in receivers:
-            try:
-                # Check if already connected (accepted request exists)
-                existing_connection = CustomerBusinessRelationship.objects.filter(
-                    Q(customer__user=request.user, business__user=receiver) |
-                    Q(customer__user=receiver, business__user=request.user)
-                ).exists()
-                
-                if existing_connection:
-                    results['skipped'].append({
-                        'user_id': receiver.user_id,
-                        'email': receiver.email,
-                        'full_name': receiver.full_name,
-                        'reason': 'Already connected'
-                    })
-                    continue
-                
-                # Check if request already exists (pending, accepted, or rejected)
-                existing_request = BusinessCustomerRequest.objects.filter(
-                    Q(sender=request.user, receiver=receiver) |
-                    Q(sender=receiver, receiver=request.user)
-                ).first()
-                
-                if existing_request:
-                    results['skipped'].append({
-                        'user_id': receiver.user_id,
-                        'email': receiver.email,
-                        'full_name': receiver.full_name,
-                        'reason': f'Request already exists with status: {existing_request.status}',
-                        'existing_request_id': existing_request.business_customer_request_id,
-                        'existing_status': existing_request.status
-                    })
-                    continue
-                
-                # Create new request within transaction
-                with transaction.atomic():
-                    connection_request = BusinessCustomerRequest.objects.create(
-                        sender=request.user,
-                        receiver=receiver
-                    )
-                    
-                    # Send in-app notification to receiver
-                    Notification.objects.create(
-                        sender=request.user,
-                        receiver=receiver,
-                        title="New Connection Request",
-                        message=f"{request.user.full_name} sent you a connection request.",
-                        type="connection_request"
-                    )
-                
-                results['successful'].append({
+            if receiver.user_id in connected_ids:
+                results['skipped'].append({
                     'user_id': receiver.user_id,
                     'email': receiver.email,
                     'full_name': receiver.full_name,
-                    'request_id': connection_request.business_customer_request_id,
-                    'status': connection_request.status
+                    'reason': 'Already connected'
                 })
-                
-                # Send push notification to receiver if they have FCM token
-                if receiver.fcm_token:
-                    try:
-                        FirebaseService.send_connection_request_notification(
-                            receiver.fcm_token,
-                            request.user.full_name,
-                            request.user.email
-                        )
-                        logger.info(f"Push notification sent to {receiver.email} for bulk connection request")
-                    except Exception as e:
-                        logger.error(f"Failed to send push notification to {receiver.email}: {str(e)}")
-                
-            except Exception as e:
-                results['failed'].append({
+                continue
+            
+            existing_request = requests_by_user.get(receiver.user_id)
+            if existing_request:
+                results['skipped'].append({
                     'user_id': receiver.user_id,
                     'email': receiver.email,
                     'full_name': receiver.full_name,
-                    'error': str(e)
+                    'reason': f'Request already exists with status: {existing_request.status}',
+                    'existing_request_id': existing_request.business_customer_request_id,
+                    'existing_status': existing_request.status
                 })
+                continue
+            
+            new_receivers.append(receiver)
+        
+        # Create all new requests and their notifications together
+        created = self._bulk_create_requests(request.user, new_receivers, results)
+        
+        for connection_request in created:
+            results['successful'].append({
+                'user_id': connection_request.receiver.user_id,
+                'email': connection_request.receiver.email,
+                'full_name': connection_request.receiver.full_name,
+                'request_id': connection_request.business_customer_request_id,
+                'status': connection_request.status
+            })
+        
+        # Push notifications to all receivers' devices, sent as one batch
+        self._queue_bulk_pushes([
+            (
+                connection_request.receiver,
+                *FirebaseService.connection_request_message(request.user.full_name, request.user.email)
+            )
+            for connection_request in created
+        ])
         
         # Prepare summary
         summary = {
@@ -347,9 +346,45 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         serializer = ConnectionRequestSerializer(requests, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
+    # Keys accepted by ?fields= on the connected endpoint
+    CONNECTED_USER_FIELDS = {
+        'user_id', 'email', 'phone_number', 'full_name', 'profile_picture',
+        'is_business', 'business_id', 'business_name', 'customer_id',
+        'connected_at', 'request_id', 'relationship_id', 'pending_due',
+    }
+    
     @action(detail=False, methods=['get'], url_path='connected')
     def connected_users(self, request):
-        """Get all connected users (accepted connections) with detailed info"""
+        """
+        Get all connected users (accepted connections) with detailed info
+        
+        Query params:
+            - fields (optional): Comma-separated keys to return, e.g. fields=user_id,full_name
+            - limit (optional): Page size (max 200). When limit or after is given the
+              response is {"connected_users": [...], "next_cursor": ..., "has_more": ...}
+            - after (optional): next_cursor from the previous page
+        """
+        fields = None
+        if request.query_params.get('fields'):
+            fields = {field.strip() for field in request.query_params['fields'].split(',') if field.strip()}
+            unknown = fields - self.CONNECTED_USER_FIELDS
+            if unknown:
+                return Response(
+                    {'error': f"Unknown fields: {', '.join(sorted(unknown))}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        paginate = 'limit' in request.query_params or 'after' in request.query_params
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 200))
+            after = request.query_params.get('after')
+            after = int(after) if after else None
+        except ValueError:
+            return Response(
+                {'error': 'limit and after must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         connected_requests = BusinessCustomerRequest.objects.filter(
             Q(sender=request.user, status='accepted') |
             Q(receiver=request.user, status='accepted')
@@ -358,49 +393,73 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
             'sender__customer_profile',
             'receiver__business_profile',
             'receiver__customer_profile'
-        )
+        ).order_by('-business_customer_request_id')
+        
+        if paginate:
+            # Keyset on request id, newest connection first
+            if after is not None:
+                connected_requests = connected_requests.filter(business_customer_request_id__lt=after)
+            connected_requests = list(connected_requests[:limit + 1])
+            has_more = len(connected_requests) > limit
+            connected_requests = connected_requests[:limit]
+        else:
+            connected_requests = list(connected_requests)
+        
+        current_user = request.user
+        # Resolve the current user's profiles once instead of per connection
+        my_customer = getattr(current_user, 'customer_profile', None)
+        my_business = getattr(current_user, 'business_profile', None)
         
         # Get the other user from each connection
+        others = [
+            (conn, conn.receiver if conn.sender_id == current_user.user_id else conn.sender)
+            for conn in connected_requests
+        ]
+        
+        # Resolve every relationship in one query keyed by (customer_id, business_id)
+        relationship_filter = Q()
+        other_ids = [other_user.user_id for _, other_user in others]
+        if my_customer and other_ids:
+            relationship_filter |= Q(customer=my_customer, business__user_id__in=other_ids)
+        if my_business and other_ids:
+            relationship_filter |= Q(business=my_business, customer__user_id__in=other_ids)
+        relationships = {}
+        if relationship_filter:
+            for row in CustomerBusinessRelationship.objects.filter(relationship_filter).values(
+                'relationship_id', 'pending_due', 'customer_id', 'business_id'
+            ):
+                relationships[(row['customer_id'], row['business_id'])] = row
+        
         connected_users = []
-        for conn in connected_requests:
-            if conn.sender == request.user:
-                other_user = conn.receiver
-            else:
-                other_user = conn.sender
-            
+        for conn, other_user in others:
             user_data = ConnectedUserSerializer(other_user).data
             user_data['connected_at'] = conn.updated_at
             user_data['request_id'] = conn.business_customer_request_id
             
-            # Get relationship_id from CustomerBusinessRelationship
-            relationship_id = None
-            pending_due = 0.00
-            current_user = request.user
-            
             # Determine customer and business from the connection
-            if hasattr(current_user, 'customer_profile') and hasattr(other_user, 'business_profile'):
+            key = None
+            if my_customer and hasattr(other_user, 'business_profile'):
                 # Current user is customer, other is business
-                relationship = CustomerBusinessRelationship.objects.filter(
-                    customer=current_user.customer_profile,
-                    business=other_user.business_profile
-                ).first()
-                if relationship:
-                    relationship_id = relationship.relationship_id
-                    pending_due = float(relationship.pending_due)
-            elif hasattr(current_user, 'business_profile') and hasattr(other_user, 'customer_profile'):
+                key = (my_customer.customer_id, other_user.business_profile.business_id)
+            elif my_business and hasattr(other_user, 'customer_profile'):
                 # Current user is business, other is customer
-                relationship = CustomerBusinessRelationship.objects.filter(
-                    customer=other_user.customer_profile,
-                    business=current_user.business_profile
-                ).first()
-                if relationship:
-                    relationship_id = relationship.relationship_id
-                    pending_due = float(relationship.pending_due)
+                key = (other_user.customer_profile.customer_id, my_business.business_id)
+            
+            relationship = relationships.get(key)
+            user_data['relationship_id'] = relationship['relationship_id'] if relationship else None
+            user_data['pending_due'] = float(relationship['pending_due']) if relationship else 0.00
             
-            user_data['relationship_id'] = relationship_id
-            user_data['pending_due'] = pending_due
+            if fields is not None:
+                user_data = {name: value for name, value in user_data.items() if name in fields}
             connected_users.append(user_data)
         
+        if paginate:
+            return Response({
+                'connected_users': connected_users,
+                'next_cursor': connected_requests[-1].business_customer_request_id if has_more else None,
+                'has_more': has_more,
+            }, status=status.HTTP_200_OK)
+        
         return Response(connected_users, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['delete'], url_path='delete-connection')
@@ -487,16 +546,15 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
                 type="connection_deleted"
             )
             
-            # Send push notification if the other user has FCM token
-            if other_user.fcm_token:
-                try:
-                    FirebaseService.send_connection_deleted_notification(
-                        other_user.fcm_token,
-                        request.user.full_name
-                    )
-                    logger.info(f"Push notification sent to {other_user.email} for connection deletion")
-                except Exception as e:
-                    logger.error(f"Failed to send push notification to {other_user.email}: {str(e)}")
+            # Send push notification to all of the other user's devices
+            try:
+                if FirebaseService.send_connection_deleted_notification(
+                    other_user,
+                    request.user.full_name
+                ):
+                    logger.info(f"Push notification queued for {other_user.email} for connection deletion")
+            except Exception as e:
+                logger.error(f"Failed to queue push notification for {other_user.email}: {str(e)}")
             
             return Response(
                 {
@@ -603,22 +661,20 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
             type=f"connection_request_{status_text}"
         )
         
-        # Send push notification to sender if they have FCM token
-        if connection_request.sender.fcm_token:
-            try:
-                if status_text == 'accepted':
-                    FirebaseService.send_request_accepted_notification(
-                        connection_request.sender.fcm_token,
-                        request.user.full_name
-                    )
-                elif status_text == 'rejected':
-                    FirebaseService.send_request_rejected_notification(
-                        connection_request.sender.fcm_token,
-                        request.user.full_name
-                    )
-                logger.info(f"Push notification sent to {connection_request.sender.email} for request {status_text}")
-            except Exception as e:
-                logger.error(f"Failed to send push notification to {connection_request.sender.email}: {str(e)}")
+        # Send push notification to all of the sender's devices
+        try:
+            if status_text == 'accepted':
+                FirebaseService.send_request_accepted_notification(
+                    connection_request.sender,
+                    request.user.full_name
+                )
+            elif status_text == 'rejected':
+                FirebaseService.send_request_rejected_notification(
+                    connection_request.sender,
+                    request.user.full_name
+                )
+        except Exception as e:
+            logger.error(f"Failed to queue push notification for {connection_request.sender.email}: {str(e)}")
         
         return Response(
             {
@@ -651,22 +707,38 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         }
         
         from django.db import transaction
-        
-        for request_id in request_ids:
-            try:
-                connection_request = BusinessCustomerRequest.objects.get(
-                    business_customer_request_id=request_id
-                )
+        from django.utils import timezone
+        from core.user_cache import UserCacheService
+        
+        with transaction.atomic():
+            # Lock all requests in one query so concurrent updates can't
+            # accept or reject the same request twice
+            connection_requests = BusinessCustomerRequest.objects.select_for_update(
+                of=('self',)
+            ).select_related(
+                'sender__customer_profile',
+                'sender__business_profile'
+            ).in_bulk(request_ids)
+            
+            to_update = []
+            for request_id in request_ids:
+                connection_request = connection_requests.get(request_id)
+                if connection_request is None:
+                    results['failed'].append({
+                        'request_id': request_id,
+                        'error': 'Request not found'
+                    })
+                    continue
                 
                 # Only receiver can update the status
-                if connection_request.receiver != request.user:
+                if connection_request.receiver_id != request.user.user_id:
                     results['failed'].append({
                         'request_id': request_id,
                         'error': 'Only the receiver can accept or reject the request'
                     })
                     continue
                 
-                # Can only update pending requests
+                # Can only update pending requests (a repeated ID sees the new status)
                 if connection_request.status != 'pending':
                     results['skipped'].append({
                         'request_id': request_id,
@@ -675,58 +747,72 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
                     })
                     continue
                 
-                # Update status within transaction
-                with transaction.atomic():
-                    connection_request.status = new_status
-                    connection_request.save()
-                    
-                    # If accepted, create CustomerBusinessRelationship
-                    if new_status == 'accepted':
-                        self._create_customer_business_relationship(connection_request)
-                    
-                    # Send notification to sender
-                    Notification.objects.create(
+                connection_request.status = new_status
+                to_update.append(connection_request)
+            
+            if to_update:
+                BusinessCustomerRequest.objects.filter(
+                    business_customer_request_id__in=[
+                        connection_request.business_customer_request_id for connection_request in to_update
+                    ]
+                ).update(status=new_status, updated_at=timezone.now())
+                
+                # If accepted, create the CustomerBusinessRelationships together
+                if new_status == 'accepted':
+                    relationships = []
+                    for connection_request in to_update:
+                        connection_request.receiver = request.user
+                        pair = self._relationship_profiles(connection_request)
+                        if pair:
+                            relationships.append(CustomerBusinessRelationship(
+                                customer=pair[0],
+                                business=pair[1],
+                                pending_due=0.00
+                            ))
+                    CustomerBusinessRelationship.objects.bulk_create(relationships, ignore_conflicts=True)
+                
+                # Notify the senders
+                notifications = Notification.objects.bulk_create([
+                    Notification(
                         sender=request.user,
                         receiver=connection_request.sender,
                         title=f"Connection Request {new_status.capitalize()}",
                         message=f"{request.user.full_name} {new_status} your connection request.",
                         type=f"connection_request_{new_status}"
                     )
+                    for connection_request in to_update
+                ])
                 
-                results['successful'].append({
-                    'request_id': request_id,
-                    'sender_name': connection_request.sender.full_name,
-                    'sender_email': connection_request.sender.email,
-                    'new_status': new_status
-                })
-                
-                # Send push notification to sender if they have FCM token
-                if connection_request.sender.fcm_token:
-                    try:
-                        if new_status == 'accepted':
-                            FirebaseService.send_request_accepted_notification(
-                                connection_request.sender.fcm_token,
-                                request.user.full_name
-                            )
-                        elif new_status == 'rejected':
-                            FirebaseService.send_request_rejected_notification(
-                                connection_request.sender.fcm_token,
-                                request.user.full_name
-                            )
-                        logger.info(f"Push notification sent to {connection_request.sender.email} for bulk {new_status}")
-                    except Exception as e:
-                        logger.error(f"Failed to send push notification to {connection_request.sender.email}: {str(e)}")
-                
-            except BusinessCustomerRequest.DoesNotExist:
-                results['failed'].append({
-                    'request_id': request_id,
-                    'error': 'Request not found'
-                })
-            except Exception as e:
-                results['failed'].append({
-                    'request_id': request_id,
-                    'error': str(e)
-                })
+                # What the per-row save() overrides would have done
+                UserCacheService.bump(
+                    request.user.user_id,
+                    *(connection_request.sender_id for connection_request in to_update)
+                )
+                for notification in notifications:
+                    notification.push_to_receiver()
+        
+        pushes = []
+        for connection_request in to_update:
+            results['successful'].append({
+                'request_id': connection_request.business_customer_request_id,
+                'sender_name': connection_request.sender.full_name,
+                'sender_email': connection_request.sender.email,
+                'new_status': new_status
+            })
+            
+            if new_status == 'accepted':
+                pushes.append((
+                    connection_request.sender,
+                    *FirebaseService.request_accepted_message(request.user.full_name)
+                ))
+            elif new_status == 'rejected':
+                pushes.append((
+                    connection_request.sender,
+                    *FirebaseService.request_rejected_message(request.user.full_name)
+                ))
+        
+        # Push notifications to all senders' devices, sent as one batch
+        self._queue_bulk_pushes(pushes)
         
         # Prepare summary
         summary = {
@@ -750,10 +836,95 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         
         return Response(summary, status=response_status)
     
+    def _bulk_create_requests(self, sender, receivers, results):
+        """
+        Create pending requests from sender to receivers, and the receivers'
+        in-app notifications, with one bulk_create each. If a concurrent
+        request makes the batch conflict, falls back to one at a time so the
+        failure is reported against the right receiver.
+        Returns the created requests in receiver order.
+        """
+        from django.db import IntegrityError, transaction
+        from core.user_cache import UserCacheService
+        
+        if not receivers:
+            return []
+        
+        def notification_for(receiver):
+            return Notification(
+                sender=sender,
+                receiver=receiver,
+                title="New Connection Request",
+                message=f"{sender.full_name} sent you a connection request.",
+                type="connection_request"
+            )
+        
+        try:
+            with transaction.atomic():
+                created = BusinessCustomerRequest.objects.bulk_create([
+                    BusinessCustomerRequest(sender=sender, receiver=receiver)
+                    for receiver in receivers
+                ])
+                notifications = Notification.objects.bulk_create([
+                    notification_for(receiver) for receiver in receivers
+                ])
+                # What the per-row save() overrides would have done
+                UserCacheService.bump(sender.user_id, *(receiver.user_id for receiver in receivers))
+                for notification in notifications:
+                    notification.push_to_receiver()
+            return created
+        except IntegrityError:
+            logger.warning("Bulk connection request insert conflicted, creating one at a time")
+        
+        created = []
+        for receiver in receivers:
+            try:
+                with transaction.atomic():
+                    connection_request = BusinessCustomerRequest.objects.create(
+                        sender=sender,
+                        receiver=receiver
+                    )
+                    notification_for(receiver).save()
+                created.append(connection_request)
+            except Exception as e:
+                results['failed'].append({
+                    'user_id': receiver.user_id,
+                    'email': receiver.email,
+                    'full_name': receiver.full_name,
+                    'error': str(e)
+                })
+        return created
+    
+    def _queue_bulk_pushes(self, pushes):
+        """Queue (user, title, body, data) push notifications of a bulk endpoint together."""
+        if not pushes:
+            return
+        try:
+            queued = FirebaseService.queue_push_notifications(pushes)
+            logger.info(f"Queued {queued} of {len(pushes)} bulk push notification(s)")
+        except Exception as e:
+            logger.error(f"Failed to queue bulk push notifications: {str(e)}")
+    
     def _create_customer_business_relationship(self, connection_request):
         """
         Create a CustomerBusinessRelationship when a connection is accepted.
+        """
+        pair = self._relationship_profiles(connection_request)
+        
+        # Only create relationship if we have both customer and business
+        if pair:
+            CustomerBusinessRelationship.objects.get_or_create(
+                customer=pair[0],
+                business=pair[1],
+                defaults={'pending_due': 0.00}
+            )
+    
+    def _relationship_profiles(self, connection_request):
+        """
+        (customer, business) profiles for an accepted request, or None if the
+        two users don't make a customer/business pair.
         Determines who is customer and who is business based on their profiles.
+        Profiles already loaded with select_related are not queried again.
         """
         sender = connection_request.sender
         receiver = connection_request.receiver
@@ -776,10 +947,6 @@ class ConnectionRequestViewSet(viewsets.ModelViewSet):
         if hasattr(receiver, 'business_profile'):
             business = receiver.business_profile
         
-        # Only create relationship if we have both customer and business
         if customer and business:
-            CustomerBusinessRelationship.objects.get_or_create(
-                customer=customer,
-                business=business,
-                defaults={'pending_due': 0.00}
-            )
+            return customer, business
+        return None
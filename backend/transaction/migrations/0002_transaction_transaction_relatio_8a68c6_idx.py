@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_dashboard', '0008_customerbusinessrelationship_status'),
+        ('transaction', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['relationship', 'transaction_date', 'transaction_id'], name='transaction_relatio_8a68c6_idx'),
+        ),
+    ]
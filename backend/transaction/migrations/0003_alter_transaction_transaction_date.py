@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 10:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0002_transaction_transaction_relatio_8a68c6_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Date when transaction occurred'),
+        ),
+    ]
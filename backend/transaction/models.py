@@ -1,7 +1,40 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction as db_transaction
+from django.utils import timezone
 from customer_dashboard.models import CustomerBusinessRelationship
 
 
+class TransactionManager(models.Manager):
+    """Custom manager for Transaction model"""
+    
+    def bulk_create_ledger(self, transactions, batch_size=500):
+        """
+        bulk_create transactions and apply their effect on pending_due and the
+        daily rollup once per affected relationship, in one atomic block.
+        bulk_create skips Transaction.save, so this is the only safe bulk path.
+        """
+        from analytics.models import DailyLedgerRollup
+        
+        with db_transaction.atomic():
+            created = self.bulk_create(transactions, batch_size=batch_size)
+            
+            deltas = defaultdict(Decimal)
+            relationships = {}
+            for txn in created:
+                deltas[txn.relationship_id] += txn.amount
+                relationships[txn.relationship_id] = txn.relationship
+            
+            for relationship_id, delta in deltas.items():
+                relationships[relationship_id].apply_pending_due_delta(delta)
+                relationships[relationship_id].invalidate_user_caches()
+            
+            DailyLedgerRollup.apply_transactions(created)
+        
+        return created
+
+
 class Transaction(models.Model):
     """
     Model to store transactions between customers and businesses.
@@ -38,26 +71,128 @@ class Transaction(models.Model):
         help_text="Description or name of the transaction"
     )
     transaction_date = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         help_text="Date when transaction occurred"
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TransactionManager()
+    
     class Meta:
         db_table = 'transaction'
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
         ordering = ['-transaction_date']
+        indexes = [
+            # Keyset pagination of a relationship's history
+            models.Index(fields=['relationship', 'transaction_date', 'transaction_id']),
+        ]
     
     def __str__(self):
         return f"Transaction {self.transaction_id}: {self.transaction_type} - Rs.{self.amount}"
     
+    @staticmethod
+    def signed_amount(transaction_type, amount):
+        """
+        Payments and refunds reduce debt (negative),
+        purchases, credits and adjustments increase it (positive)
+        """
+        if transaction_type in ['payment', 'refund']:
+            return -abs(amount)
+        return abs(amount)
+    
+    # Fields whose persisted values drive the pending_due and rollup deltas
+    LEDGER_FIELDS = ('relationship_id', 'amount', 'transaction_type', 'transaction_date')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the persisted ledger fields so save() can apply a delta"""
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(field in loaded for field in cls.LEDGER_FIELDS):
+            instance._persisted = {field: loaded[field] for field in cls.LEDGER_FIELDS}
+        return instance
+    
+    def _get_persisted_state(self):
+        """Return the ledger fields currently stored for this row, or None"""
+        persisted = getattr(self, '_persisted', None)
+        if persisted is not None:
+            return persisted
+        return Transaction.objects.filter(pk=self.pk).values(*self.LEDGER_FIELDS).first()
+    
+    def _apply_to_ledger(self, state, sign):
+        """Add (sign=1) or reverse (sign=-1) a row's effect on balance and rollup"""
+        from analytics.models import DailyLedgerRollup
+        relationship = CustomerBusinessRelationship.objects.get(
+            relationship_id=state['relationship_id']
+        )
+        relationship.apply_pending_due_delta(sign * state['amount'])
+        relationship.invalidate_user_caches()
+        DailyLedgerRollup.apply(
+            state['relationship_id'],
+            state['transaction_date'],
+            state['amount'],
+            state['transaction_type'],
+            sign=sign
+        )
+    
     def save(self, *args, **kwargs):
-        """Update the pending_due in relationship after saving transaction"""
-        super().save(*args, **kwargs)
-        # Recalculate pending_due based on all transactions
-        self.relationship.update_pending_due()
+        """
+        Apply this transaction's delta to pending_due and the daily rollup,
+        and invalidate both users' cached dashboards
+        """
+        from analytics.models import DailyLedgerRollup
+        update_fields = kwargs.get('update_fields')
+        written = None
+        if update_fields is not None:
+            written = {self._meta.get_field(name).attname for name in update_fields}
+            if not written.intersection(self.LEDGER_FIELDS):
+                # Nothing on the ledger is written, so nothing moves
+                super().save(*args, **kwargs)
+                return
+        
+        with db_transaction.atomic():
+            old_state = None
+            if not self._state.adding and self.pk is not None:
+                old_state = self._get_persisted_state()
+            
+            super().save(*args, **kwargs)
+            new_state = {field: getattr(self, field) for field in self.LEDGER_FIELDS}
+            if written is not None and old_state is not None:
+                # Ledger fields left out of update_fields keep their stored value
+                new_state = {
+                    field: new_state[field] if field in written else old_state[field]
+                    for field in self.LEDGER_FIELDS
+                }
+            
+            if old_state is None:
+                # New row - the whole amount moves its relationship's balance
+                self.relationship.apply_pending_due_delta(self.amount)
+                self.relationship.invalidate_user_caches()
+                DailyLedgerRollup.apply(
+                    self.relationship_id,
+                    self.transaction_date,
+                    self.amount,
+                    self.transaction_type
+                )
+            elif old_state != new_state:
+                self._apply_to_ledger(old_state, sign=-1)
+                self._apply_to_ledger(new_state, sign=1)
+                # Keep the cached relationship in sync with the DB
+                self.relationship.refresh_from_db(fields=['pending_due', 'updated_at'])
+        
+        self._persisted = new_state
+    
+    def delete(self, *args, **kwargs):
+        """Reverse this transaction's effect on pending_due and the daily rollup"""
+        with db_transaction.atomic():
+            old_state = self._get_persisted_state()
+            result = super().delete(*args, **kwargs)
+            if old_state is not None:
+                self._apply_to_ledger(old_state, sign=-1)
+        self._persisted = None
+        return result
 
 
 class Favorite(models.Model):
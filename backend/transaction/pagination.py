@@ -0,0 +1,87 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(transaction):
+    """Encode a transaction's (transaction_date, transaction_id) as an opaque cursor"""
+    raw = f"{transaction.transaction_date.isoformat()}|{transaction.transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into (transaction_date, transaction_id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+
+
+def get_limit(params):
+    """Read ?limit= clamped to MAX_LIMIT"""
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValidationError({'limit': 'limit must be an integer'})
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def paginate_transactions(queryset, params):
+    """
+    Keyset pagination over (transaction_date, transaction_id), newest first.
+
+    Query params:
+    - limit: Number of transactions to return (default: 50, max: 200)
+    - after: Cursor - get transactions older than this one
+    - before: Cursor - get transactions newer than this one
+
+    Returns (transactions, meta) where meta holds next_cursor/previous_cursor
+    to pass back as after/before, and has_more in the direction of travel.
+    """
+    limit = get_limit(params)
+    after = params.get('after')
+    before = params.get('before')
+
+    if after and before:
+        raise ValidationError({'cursor': "Provide only one: 'after' or 'before'"})
+
+    if before:
+        date, transaction_id = decode_cursor(before)
+        page = list(
+            queryset.filter(
+                Q(transaction_date__gt=date) |
+                Q(transaction_date=date, transaction_id__gt=transaction_id)
+            ).order_by('transaction_date', 'transaction_id')[:limit + 1]
+        )
+        has_more = len(page) > limit
+        page = list(reversed(page[:limit]))
+        # Walking towards newer rows - the cursor row itself is always older
+        has_newer, has_older = has_more, True
+    else:
+        if after:
+            date, transaction_id = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(transaction_date__lt=date) |
+                Q(transaction_date=date, transaction_id__lt=transaction_id)
+            )
+        page = list(
+            queryset.order_by('-transaction_date', '-transaction_id')[:limit + 1]
+        )
+        has_more = len(page) > limit
+        page = page[:limit]
+        has_newer, has_older = bool(after), has_more
+
+    meta = {
+        'next_cursor': encode_cursor(page[-1]) if page and has_older else None,
+        'previous_cursor': encode_cursor(page[0]) if page and has_newer else None,
+        'has_more': has_more,
+    }
+    return page, meta
@@ -17,7 +17,32 @@ class TransactionSerializer(serializers.ModelSerializer):
             'transaction_date',
             'created_at',
         ]
-        read_only_fields = ['transaction_id', 'created_at']
+        # transaction_date can only be chosen on create (bulk/offline sync) -
+        # editing it would backdate a ledger entry
+        read_only_fields = ['transaction_id', 'transaction_date', 'created_at']
+
+
+TRANSACTION_TYPES = ['purchase', 'payment', 'credit', 'refund', 'adjustment']
+
+
+def get_transaction_role_error(is_customer, is_business, transaction_type):
+    """Return the role violation for this transaction type, or None"""
+    # Customers can only create payment transactions
+    if is_customer and transaction_type != 'payment':
+        return 'Customers can only create payment transactions'
+    
+    # Businesses cannot create payment transactions (customers pay)
+    if is_business and transaction_type == 'payment':
+        return 'Businesses cannot create payment transactions. Customers make payments.'
+    
+    return None
+
+
+def combine_description(item_title, description):
+    """Combine item_title and description into the stored description"""
+    if item_title and description:
+        return f"{item_title}: {description}"
+    return item_title or description
 
 
 class CreateTransactionSerializer(serializers.Serializer):
@@ -25,7 +50,7 @@ class CreateTransactionSerializer(serializers.Serializer):
     relationship_id = serializers.IntegerField()
     amount = serializers.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = serializers.ChoiceField(
-        choices=['purchase', 'payment', 'credit', 'refund', 'adjustment'],
+        choices=TRANSACTION_TYPES,
         default='purchase',
         required=False
     )
@@ -63,29 +88,48 @@ class CreateTransactionSerializer(serializers.Serializer):
         
         transaction_type = data.get('transaction_type', 'purchase')
         
-        # Customers can only create payment transactions
-        if is_customer and transaction_type != 'payment':
-            raise serializers.ValidationError({
-                'transaction_type': 'Customers can only create payment transactions'
-            })
-        
-        # Businesses cannot create payment transactions (customers pay)
-        if is_business and transaction_type == 'payment':
-            raise serializers.ValidationError({
-                'transaction_type': 'Businesses cannot create payment transactions. Customers make payments.'
-            })
+        role_error = get_transaction_role_error(is_customer, is_business, transaction_type)
+        if role_error:
+            raise serializers.ValidationError({'transaction_type': role_error})
         
         # Combine item_title and description
-        item_title = data.get('item_title', '')
-        description = data.get('description', '')
-        if item_title and description:
-            data['description'] = f"{item_title}: {description}"
-        elif item_title:
-            data['description'] = item_title
+        data['description'] = combine_description(
+            data.get('item_title', ''),
+            data.get('description', '')
+        )
         
         return data
 
 
+class BulkTransactionRowSerializer(serializers.Serializer):
+    """
+    Field-level validation for one row of a bulk upload.
+    Relationship access and role checks are done by the view against
+    relationships prefetched for the whole batch.
+    """
+    relationship_id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    transaction_type = serializers.ChoiceField(
+        choices=TRANSACTION_TYPES,
+        default='purchase',
+        required=False
+    )
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    item_title = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    transaction_date = serializers.DateTimeField(required=False)
+    
+    def validate(self, data):
+        data['description'] = combine_description(
+            data.get('item_title', ''),
+            data.get('description', '')
+        )
+        if len(data['description']) > 255:
+            raise serializers.ValidationError({
+                'description': 'Combined item_title and description must be at most 255 characters'
+            })
+        return data
+
+
 class ConnectedUserDetailsSerializer(serializers.Serializer):
     """Serializer for connected user details with transactions"""
     # User info
@@ -114,8 +158,9 @@ class ConnectedUserDetailsSerializer(serializers.Serializer):
     # For customers viewing businesses
     is_favorite = serializers.BooleanField(default=False)
     
-    # Transactions
+    # Transactions (first page, newest first)
     transactions = TransactionSerializer(many=True)
+    transactions_next_cursor = serializers.CharField(allow_null=True, required=False)
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -1,3 +1,254 @@
+import datetime
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from analytics.models import DailyLedgerRollup
+from business_dashboard.models import Business
+from customer_dashboard.models import Customer, CustomerBusinessRelationship
+from hisabauth.models import User
+from .models import Transaction
+
+
+def create_relationship(name):
+    """A customer and a business user connected by a fresh relationship"""
+    customer_user = User.objects.create_user(
+        email=f'{name}-customer@example.com', full_name=f'{name} Customer', is_active=True
+    )
+    business_user = User.objects.create_user(
+        email=f'{name}-business@example.com', full_name=f'{name} Business', is_active=True
+    )
+    return CustomerBusinessRelationship.objects.create(
+        customer=Customer.objects.create(user=customer_user),
+        business=Business.objects.create(user=business_user, business_name=f'{name} Shop')
+    )
+
+
+class PendingDueDeltaTest(TestCase):
+    """Delta updates of pending_due must always match a full re-aggregate"""
+
+    def setUp(self):
+        self.relationship = create_relationship('first')
+        self.other_relationship = create_relationship('second')
+
+    def _create(self, amount, transaction_type='purchase', relationship=None):
+        return Transaction.objects.create(
+            relationship=relationship or self.relationship,
+            amount=Decimal(amount),
+            transaction_type=transaction_type
+        )
+
+    def assertBalanced(self, *relationships):
+        for relationship in relationships or (self.relationship, self.other_relationship):
+            stored, actual = relationship.verify_pending_due()
+            self.assertEqual(stored, actual)
+
+    def test_create(self):
+        self._create('100.00')
+        self._create('-40.50', transaction_type='payment')
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('59.50'))
+
+    def test_edit_amount(self):
+        txn = self._create('100.00')
+        txn.amount = Decimal('250.00')
+        txn.save()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('250.00'))
+
+    def test_edit_of_row_loaded_from_queryset(self):
+        self._create('100.00')
+        txn = Transaction.objects.get(relationship=self.relationship)
+        txn.amount = Decimal('30.00')
+        txn.save()
+
+        self.assertBalanced()
+
+    def test_edit_of_row_loaded_without_ledger_fields(self):
+        txn_id = self._create('100.00').transaction_id
+        # Deferred fields mean no remembered state - save() must re-read it
+        txn = Transaction.objects.only('transaction_id', 'description').get(transaction_id=txn_id)
+        txn.description = 'renamed'
+        txn.amount = Decimal('75.00')
+        txn.save()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('75.00'))
+
+    def test_type_flip(self):
+        txn = self._create('100.00')
+        txn.transaction_type = 'payment'
+        txn.amount = Transaction.signed_amount('payment', txn.amount)
+        txn.save()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('-100.00'))
+
+    def test_relationship_move(self):
+        self._create('10.00')
+        txn = self._create('100.00')
+        txn.relationship = self.other_relationship
+        txn.save()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('10.00'))
+        self.assertEqual(self.other_relationship.pending_due, Decimal('100.00'))
+
+    def test_unchanged_save(self):
+        txn = self._create('100.00')
+        txn.description = 'note'
+        txn.save()
+        txn.save()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('100.00'))
+
+    def test_update_fields_without_ledger_fields(self):
+        txn = self._create('100.00')
+        txn.amount = Decimal('999.00')
+        txn.description = 'note only'
+        txn.save(update_fields=['description'])
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('100.00'))
+
+        # The unsaved amount is still applied once it is actually written
+        txn.save(update_fields=['amount'])
+        self.assertBalanced()
+        self.relationship.refresh_from_db()
+        self.assertEqual(self.relationship.pending_due, Decimal('999.00'))
+
+    def test_delete(self):
+        self._create('100.00')
+        txn = self._create('-25.00', transaction_type='payment')
+        txn.delete()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('100.00'))
+
+    def test_delete_of_row_loaded_from_queryset(self):
+        txn_id = self._create('100.00').transaction_id
+        Transaction.objects.get(transaction_id=txn_id).delete()
+
+        self.assertBalanced()
+        self.assertEqual(self.relationship.pending_due, Decimal('0.00'))
+
+
+class TransactionUpdateTest(APITestCase):
+    """Updates through the API must not move a transaction's date"""
+
+    def setUp(self):
+        self.relationship = create_relationship('first')
+        self.client.force_authenticate(user=self.relationship.business.user)
+        self.txn = Transaction.objects.create(relationship=self.relationship, amount=Decimal('100.00'))
+
+    def test_transaction_date_is_read_only(self):
+        original_date = self.txn.transaction_date
+        backdated = (original_date - datetime.timedelta(days=365)).isoformat()
+
+        response = self.client.patch(
+            f'/api/transaction/transactions/{self.txn.transaction_id}/',
+            {'transaction_date': backdated, 'description': 'edited'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.txn.refresh_from_db()
+        self.assertEqual(self.txn.description, 'edited')
+        self.assertEqual(self.txn.transaction_date, original_date)
+
+
+def rollup_snapshot(relationship):
+    """day -> counted fields of a relationship's rollups"""
+    fields = ('positive_sum', 'negative_sum', 'transaction_count', *DailyLedgerRollup.TYPE_COUNT_FIELDS.values())
+    return {
+        row['day']: tuple(row[field] for field in fields)
+        for row in DailyLedgerRollup.objects.filter(relationship=relationship).values('day', *fields)
+    }
+
+
+class BulkLedgerTest(APITestCase):
+    """Bulk ingestion must leave pending_due and rollups as per-row saves would"""
+
+    url = '/api/transaction/transactions/bulk/'
+
+    def setUp(self):
+        self.per_row = create_relationship('per-row')
+        self.bulk = create_relationship('bulk')
+        self.bulk_other = create_relationship('bulk-other')
+        self.today = timezone.now()
+        self.last_week = self.today - datetime.timedelta(days=7)
+
+    def _rows(self):
+        return [
+            ('100.00', 'purchase', self.today),
+            ('-40.00', 'payment', self.today),
+            ('25.50', 'credit', self.last_week),
+            ('-5.50', 'refund', self.last_week),
+        ]
+
+    def _save_per_row(self, relationship):
+        for amount, transaction_type, transaction_date in self._rows():
+            Transaction.objects.create(
+                relationship=relationship,
+                amount=Decimal(amount),
+                transaction_type=transaction_type,
+                transaction_date=transaction_date
+            )
+        relationship.refresh_from_db()
+
+    def test_bulk_create_ledger_matches_per_row_saves(self):
+        self._save_per_row(self.per_row)
+        Transaction.objects.bulk_create_ledger([
+            Transaction(
+                relationship=relationship,
+                amount=Decimal(amount),
+                transaction_type=transaction_type,
+                transaction_date=transaction_date
+            )
+            for relationship in (self.bulk, self.bulk_other)
+            for amount, transaction_type, transaction_date in self._rows()
+        ])
+
+        for relationship in (self.bulk, self.bulk_other):
+            stored, actual = relationship.verify_pending_due()
+            self.assertEqual(stored, actual)
+            self.assertEqual(stored, self.per_row.pending_due)
+            self.assertEqual(rollup_snapshot(relationship), rollup_snapshot(self.per_row))
+
+    def test_bulk_endpoint_matches_per_row_saves(self):
+        self._save_per_row(self.per_row)
+        self.client.force_authenticate(user=self.bulk.business.user)
+        rows = [
+            {
+                'relationship_id': self.bulk.relationship_id,
+                'amount': amount.lstrip('-'),
+                'transaction_type': transaction_type,
+                'transaction_date': transaction_date.isoformat(),
+            }
+            for amount, transaction_type, transaction_date in self._rows()
+            if transaction_type != 'payment'
+        ]
+        # Businesses can't record payments, and other relationships are off limits
+        rows.append({'relationship_id': self.bulk.relationship_id, 'amount': '40.00', 'transaction_type': 'payment'})
+        rows.append({'relationship_id': self.bulk_other.relationship_id, 'amount': '1.00'})
+
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['successful'], 3)
+        self.assertEqual([row['row'] for row in response.data['results']['failed']], [3, 4])
+
+        # The same rows minus the payment, saved one by one
+        Transaction.objects.filter(relationship=self.per_row, transaction_type='payment').get().delete()
+        self.per_row.refresh_from_db()
 
-# Create your tests here.
+        stored, actual = self.bulk.verify_pending_due()
+        self.assertEqual(stored, actual)
+        self.assertEqual(stored, self.per_row.pending_due)
+        self.assertEqual(rollup_snapshot(self.bulk), rollup_snapshot(self.per_row))
+        self.assertFalse(Transaction.objects.filter(relationship=self.bulk_other).exists())
@@ -1,3 +1,6 @@
+import csv
+import io
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,10 +12,13 @@ from .models import Transaction, Favorite
 from .serializers import (
     TransactionSerializer,
     CreateTransactionSerializer,
+    BulkTransactionRowSerializer,
+    get_transaction_role_error,
     ConnectedUserDetailsSerializer,
     FavoriteSerializer,
     AddFavoriteSerializer,
 )
+from .pagination import paginate_transactions
 from customer_dashboard.models import CustomerBusinessRelationship
 from business_dashboard.models import Business
 
@@ -22,6 +28,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
     
+    # Upper bound on rows accepted by the bulk endpoint
+    BULK_MAX_ROWS = 1000
+    
     def get_queryset(self):
         """Return transactions for relationships the user is part of"""
         user = self.request.user
@@ -41,7 +50,21 @@ class TransactionViewSet(viewsets.ModelViewSet):
         
         return Transaction.objects.filter(
             relationship_id__in=relationship_ids
-        ).order_by('-transaction_date')
+        ).order_by('-transaction_date', '-transaction_id')
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List transactions across all of the user's relationships.
+        
+        Query params:
+        - limit: Number of transactions to return (default: 50)
+        - after / before: Cursors from a previous page
+        """
+        transactions, meta = paginate_transactions(self.get_queryset(), request.query_params)
+        return Response({
+            'transactions': TransactionSerializer(transactions, many=True).data,
+            **meta,
+        })
     
     def create(self, request, *args, **kwargs):
         """Create a new transaction"""
@@ -57,18 +80,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
         )
         
         with db_transaction.atomic():
-            # Determine the amount based on transaction type
             # Payments and refunds should be negative (reduce debt)
             # Purchases and credits should be positive (increase debt)
             transaction_type = data.get('transaction_type', 'purchase')
-            amount = data['amount']
-            
-            if transaction_type in ['payment', 'refund']:
-                # Convert to negative to reduce the pending due
-                amount = -abs(amount)
-            else:
-                # Purchase, credit, adjustment - keep positive
-                amount = abs(amount)
+            amount = Transaction.signed_amount(transaction_type, data['amount'])
             
             # Create the transaction
             new_transaction = Transaction.objects.create(
@@ -77,18 +92,162 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 transaction_type=transaction_type,
                 description=data.get('description', ''),
             )
-            
-            # Update the pending due based on transaction type
-            relationship.update_pending_due()
+            # Transaction.save already applied the amount to pending_due
         
         return Response(
             TransactionSerializer(new_transaction).data,
             status=status.HTTP_201_CREATED
         )
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create many transactions at once (POS / offline sync).
+        
+        Body: a JSON array of transactions, {"transactions": [...]},
+        or a multipart upload with a CSV "file" whose header row uses the
+        same field names (relationship_id, amount, transaction_type,
+        description, item_title, transaction_date).
+        
+        Valid rows are written in one atomic bulk insert, pending_due is
+        updated once per relationship, and every row gets a result.
+        """
+        try:
+            rows = self._parse_bulk_rows(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not rows:
+            return Response(
+                {'error': 'At least one transaction is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > self.BULK_MAX_ROWS:
+            return Response(
+                {'error': f'Maximum {self.BULK_MAX_ROWS} transactions allowed per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Field validation for every row, no queries
+        row_serializers = []
+        relationship_ids = set()
+        for row in rows:
+            row_serializer = BulkTransactionRowSerializer(data=row)
+            if row_serializer.is_valid():
+                relationship_ids.add(row_serializer.validated_data['relationship_id'])
+            row_serializers.append(row_serializer)
+        
+        # One query for every relationship referenced by the batch
+        relationships = CustomerBusinessRelationship.objects.in_bulk(relationship_ids)
+        user = request.user
+        customer_id = user.customer_profile.customer_id if hasattr(user, 'customer_profile') else None
+        business_id = user.business_profile.business_id if hasattr(user, 'business_profile') else None
+        
+        results = {
+            'successful': [],
+            'failed': []
+        }
+        pending = []
+        
+        for index, row_serializer in enumerate(row_serializers):
+            if row_serializer.errors:
+                results['failed'].append({'row': index, 'errors': row_serializer.errors})
+                continue
+            
+            data = row_serializer.validated_data
+            relationship = relationships.get(data['relationship_id'])
+            if relationship is None:
+                results['failed'].append({
+                    'row': index,
+                    'errors': {'relationship_id': ['Relationship not found']}
+                })
+                continue
+            
+            is_customer = customer_id is not None and relationship.customer_id == customer_id
+            is_business = business_id is not None and relationship.business_id == business_id
+            if not is_customer and not is_business:
+                results['failed'].append({
+                    'row': index,
+                    'errors': {'relationship_id': ["You don't have access to this relationship"]}
+                })
+                continue
+            
+            transaction_type = data.get('transaction_type', 'purchase')
+            role_error = get_transaction_role_error(is_customer, is_business, transaction_type)
+            if role_error:
+                results['failed'].append({
+                    'row': index,
+                    'errors': {'transaction_type': [role_error]}
+                })
+                continue
+            
+            new_transaction = Transaction(
+                relationship=relationship,
+                amount=Transaction.signed_amount(transaction_type, data['amount']),
+                transaction_type=transaction_type,
+                description=data.get('description', ''),
+            )
+            if data.get('transaction_date'):
+                new_transaction.transaction_date = data['transaction_date']
+            pending.append((index, new_transaction))
+        
+        if pending:
+            Transaction.objects.bulk_create_ledger([txn for _, txn in pending])
+            for index, new_transaction in pending:
+                results['successful'].append({
+                    'row': index,
+                    'transaction': TransactionSerializer(new_transaction).data
+                })
+        
+        summary = {
+            'total_rows': len(rows),
+            'successful': len(results['successful']),
+            'failed': len(results['failed']),
+            'results': results,
+        }
+        
+        if results['successful'] and not results['failed']:
+            response_status = status.HTTP_201_CREATED
+        elif results['successful']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        
+        return Response(summary, status=response_status)
+    
+    def _parse_bulk_rows(self, request):
+        """Read bulk rows from a CSV upload or a JSON body"""
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                text = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+                # Drop empty CSV cells so optional fields fall back to defaults
+                return [
+                    {key: value for key, value in row.items() if key and value not in (None, '')}
+                    for row in csv.DictReader(text)
+                ]
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise ValueError(f'Invalid CSV file: {e}')
+        
+        data = request.data
+        if isinstance(data, dict):
+            data = data.get('transactions')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError(
+                'Provide a JSON array of transactions, {"transactions": [...]} or a CSV "file"'
+            )
+        return data
+    
     @action(detail=False, methods=['get'])
     def by_relationship(self, request):
-        """Get transactions for a specific relationship"""
+        """
+        Get transactions for a specific relationship, newest first.
+        
+        Query params:
+        - relationship_id: Relationship to read (required)
+        - limit: Number of transactions to return (default: 50)
+        - after / before: Cursors from a previous page
+        """
         relationship_id = request.query_params.get('relationship_id')
         if not relationship_id:
             return Response(
@@ -117,11 +276,15 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        transactions = Transaction.objects.filter(
-            relationship=relationship
-        ).order_by('-transaction_date')
+        transactions, meta = paginate_transactions(
+            Transaction.objects.filter(relationship=relationship),
+            request.query_params
+        )
         
-        return Response(TransactionSerializer(transactions, many=True).data)
+        return Response({
+            'transactions': TransactionSerializer(transactions, many=True).data,
+            **meta,
+        })
 
 
 class ConnectedUserDetailsViewSet(viewsets.ViewSet):
@@ -133,7 +296,9 @@ class ConnectedUserDetailsViewSet(viewsets.ViewSet):
         """
         Get detailed information about a connected user
         
-        Returns user profile, financial summary (to_pay, paid), and transaction history
+        Returns user profile, financial summary (to_pay, paid), and the first
+        page of transaction history. Older pages come from by_relationship
+        using transactions_next_cursor.
         """
         user = request.user
         
@@ -209,12 +374,14 @@ class ConnectedUserDetailsViewSet(viewsets.ViewSet):
                 'is_favorite': False,  # Businesses don't have favorites
             }
         
-        # Get transactions for this relationship
-        transactions = Transaction.objects.filter(
-            relationship=relationship
-        ).order_by('-transaction_date')
+        # Get the latest page of transactions for this relationship
+        transactions, meta = paginate_transactions(
+            Transaction.objects.filter(relationship=relationship),
+            request.query_params
+        )
         
         data['transactions'] = TransactionSerializer(transactions, many=True).data
+        data['transactions_next_cursor'] = meta['next_cursor']
         
         return Response(ConnectedUserDetailsSerializer(data).data)
 
@@ -80,7 +80,7 @@ class ChatBloc extends Bloc<ChatEvent, ChatState> {
         break;
       case 'messages_read':
         add(MessagesReadReceivedEvent(
-          messageIds: List<int>.from(event.data['message_ids'] as List),
+          lastReadMessageId: event.data['last_read_message_id'] as int,
           readByUserId: event.data['read_by'] as int,
         ));
         break;
@@ -351,9 +351,11 @@ class ChatBloc extends Bloc<ChatEvent, ChatState> {
 
     final currentState = state as ChatRoomActive;
 
-    // Update read status in messages
+    // Everything we sent up to the other user's watermark is now read
     final updatedMessages = currentState.messages.map((msg) {
-      if (event.messageIds.contains(msg.messageId)) {
+      if (!msg.isRead &&
+          msg.sender.userId == _currentUserId &&
+          msg.messageId <= event.lastReadMessageId) {
         return MessageModel(
           messageId: msg.messageId,
           chatRoomId: msg.chatRoomId,
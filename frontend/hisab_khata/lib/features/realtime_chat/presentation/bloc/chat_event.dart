@@ -128,14 +128,14 @@ class ConnectionStatusChangedEvent extends ChatEvent {
 
 /// Event when messages are marked as read by other user.
 class MessagesReadReceivedEvent extends ChatEvent {
-  final List<int> messageIds;
+  final int lastReadMessageId;
   final int readByUserId;
 
   const MessagesReadReceivedEvent({
-    required this.messageIds,
+    required this.lastReadMessageId,
     required this.readByUserId,
   });
 
   @override
-  List<Object?> get props => [messageIds, readByUserId];
+  List<Object?> get props => [lastReadMessageId, readByUserId];
 }
@@ -3,12 +3,13 @@ import '../models/transaction_model.dart';
 import '../models/connected_user_details_model.dart';
 import '../models/favorite_business_model.dart';
 import '../../domain/entities/transaction.dart';
+import '../../domain/entities/transaction_page.dart';
 
 /// Remote data source for transaction-related API calls
 class TransactionRemoteDataSource extends BaseRemoteDataSource {
   TransactionRemoteDataSource({super.client});
 
-  /// Get connected user details with transactions
+  /// Get connected user details with the first page of transactions
   /// GET /transaction/connection-details/{relationship_id}/
   Future<ConnectedUserDetailsModel> getConnectedUserDetails(
     int relationshipId,
@@ -16,23 +17,39 @@ class TransactionRemoteDataSource extends BaseRemoteDataSource {
     final response = await get(
       'transaction/connection-details/$relationshipId/',
     );
-    return ConnectedUserDetailsModel.fromJson(response as Map<String, dynamic>);
+
+    return ConnectedUserDetailsModel.fromJson(
+      response as Map<String, dynamic>,
+    );
   }
 
-  /// Get transactions for a specific relationship
-  /// GET /transaction/transactions/by_relationship/?relationship_id=X
-  Future<List<TransactionModel>> getTransactionsByRelationship(
-    int relationshipId,
-  ) async {
+  /// Get one page of transactions for a specific relationship, newest first
+  /// GET /transaction/transactions/by_relationship/?relationship_id=X&after=Y
+  /// [after] - next_cursor of the previous page (null for the first page)
+  Future<TransactionPage> getTransactionsByRelationship(
+    int relationshipId, {
+    String? after,
+  }) async {
     final response = await get(
       'transaction/transactions/by_relationship/',
-      queryParameters: {'relationship_id': relationshipId.toString()},
+      queryParameters: {
+        'relationship_id': relationshipId.toString(),
+        if (after != null) 'after': after,
+      },
     );
 
-    final List<dynamic> data = response as List<dynamic>;
-    return data
-        .map((json) => TransactionModel.fromJson(json as Map<String, dynamic>))
-        .toList();
+    final page = response as Map<String, dynamic>;
+    final List<dynamic> data = page['transactions'] as List<dynamic>;
+    return TransactionPage(
+      transactions: data
+          .map(
+            (json) => TransactionModel.fromJson(json as Map<String, dynamic>),
+          )
+          .toList(),
+      nextCursor: page['has_more'] == true
+          ? page['next_cursor'] as String?
+          : null,
+    );
   }
 
   /// Create a new transaction
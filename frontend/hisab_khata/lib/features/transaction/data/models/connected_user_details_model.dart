@@ -19,6 +19,7 @@ class ConnectedUserDetailsModel extends ConnectedUserDetails {
     required super.totalPaid,
     super.isFavorite = false,
     super.transactions = const [],
+    super.transactionsNextCursor,
   });
 
   factory ConnectedUserDetailsModel.fromJson(Map<String, dynamic> json) {
@@ -45,6 +46,7 @@ class ConnectedUserDetailsModel extends ConnectedUserDetails {
       totalPaid: double.parse(json['total_paid'].toString()),
       isFavorite: json['is_favorite'] as bool? ?? false,
       transactions: transactionsList,
+      transactionsNextCursor: json['transactions_next_cursor'] as String?,
     );
   }
 
@@ -67,6 +69,7 @@ class ConnectedUserDetailsModel extends ConnectedUserDetails {
       'transactions': transactions
           .map((t) => TransactionModel.fromEntity(t).toJson())
           .toList(),
+      'transactions_next_cursor': transactionsNextCursor,
     };
   }
 
@@ -88,6 +91,7 @@ class ConnectedUserDetailsModel extends ConnectedUserDetails {
       totalPaid: entity.totalPaid,
       isFavorite: entity.isFavorite,
       transactions: entity.transactions,
+      transactionsNextCursor: entity.transactionsNextCursor,
     );
   }
 }
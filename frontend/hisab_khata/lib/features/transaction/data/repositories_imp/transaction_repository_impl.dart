@@ -1,5 +1,6 @@
 import '../../domain/entities/connected_user_details.dart';
 import '../../domain/entities/transaction.dart';
+import '../../domain/entities/transaction_page.dart';
 import '../../domain/repositories/transaction_repository.dart';
 import '../datasources/transaction_remote_data_source.dart';
 
@@ -17,8 +18,14 @@ class TransactionRepositoryImpl implements TransactionRepository {
   }
 
   @override
-  Future<List<Transaction>> getTransactionsByRelationship(int relationshipId) async {
-    return await _remoteDataSource.getTransactionsByRelationship(relationshipId);
+  Future<TransactionPage> getTransactionsByRelationship(
+    int relationshipId, {
+    String? after,
+  }) async {
+    return await _remoteDataSource.getTransactionsByRelationship(
+      relationshipId,
+      after: after,
+    );
   }
 
   @override
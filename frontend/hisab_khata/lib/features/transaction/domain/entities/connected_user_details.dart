@@ -1,5 +1,6 @@
 import 'package:equatable/equatable.dart';
 import 'transaction.dart';
+import 'transaction_page.dart';
 
 class ConnectedUserDetails extends Equatable {
   final int userId;
@@ -27,8 +28,9 @@ class ConnectedUserDetails extends Equatable {
   // Favorite (only for customers viewing businesses)
   final bool isFavorite;
 
-  // Transaction history
+  // Transaction history (loaded page by page, newest first)
   final List<Transaction> transactions;
+  final String? transactionsNextCursor;
 
   const ConnectedUserDetails({
     required this.userId,
@@ -46,6 +48,7 @@ class ConnectedUserDetails extends Equatable {
     required this.totalPaid,
     this.isFavorite = false,
     this.transactions = const [],
+    this.transactionsNextCursor,
   });
 
   /// Display name - business name for businesses, full name for customers
@@ -72,6 +75,31 @@ class ConnectedUserDetails extends Equatable {
   /// Number of transactions
   int get transactionCount => transactions.length;
 
+  /// Whether older transactions are left to load
+  bool get hasMoreTransactions => transactionsNextCursor != null;
+
+  /// Append the next (older) page of transactions
+  ConnectedUserDetails withNextPage(TransactionPage page) {
+    return ConnectedUserDetails(
+      userId: userId,
+      email: email,
+      phoneNumber: phoneNumber,
+      fullName: fullName,
+      profilePicture: profilePicture,
+      isBusiness: isBusiness,
+      businessId: businessId,
+      businessName: businessName,
+      customerId: customerId,
+      relationshipId: relationshipId,
+      connectedAt: connectedAt,
+      toPay: toPay,
+      totalPaid: totalPaid,
+      isFavorite: isFavorite,
+      transactions: [...transactions, ...page.transactions],
+      transactionsNextCursor: page.nextCursor,
+    );
+  }
+
   /// Copy with updated favorite status
   ConnectedUserDetails copyWith({
     bool? isFavorite,
@@ -95,6 +123,7 @@ class ConnectedUserDetails extends Equatable {
       totalPaid: totalPaid ?? this.totalPaid,
       isFavorite: isFavorite ?? this.isFavorite,
       transactions: transactions ?? this.transactions,
+      transactionsNextCursor: transactionsNextCursor,
     );
   }
 
@@ -115,5 +144,6 @@ class ConnectedUserDetails extends Equatable {
     totalPaid,
     isFavorite,
     transactions,
+    transactionsNextCursor,
   ];
 }
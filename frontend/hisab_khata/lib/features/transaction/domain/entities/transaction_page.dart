@@ -0,0 +1,17 @@
+import 'package:equatable/equatable.dart';
+import 'transaction.dart';
+
+/// One page of a relationship's transaction history, newest first
+class TransactionPage extends Equatable {
+  final List<Transaction> transactions;
+
+  /// Cursor for the next (older) page, null on the last page
+  final String? nextCursor;
+
+  const TransactionPage({required this.transactions, this.nextCursor});
+
+  bool get hasMore => nextCursor != null;
+
+  @override
+  List<Object?> get props => [transactions, nextCursor];
+}
@@ -1,15 +1,20 @@
 import '../entities/connected_user_details.dart';
 import '../entities/transaction.dart';
+import '../entities/transaction_page.dart';
 
 /// Repository interface for transaction-related operations
 abstract class TransactionRepository {
-  /// Get connected user details with transactions
+  /// Get connected user details with the first page of transactions
   /// [relationshipId] - The ID of the customer-business relationship
   Future<ConnectedUserDetails> getConnectedUserDetails(int relationshipId);
 
-  /// Get all transactions for a relationship
+  /// Get one page of transactions for a relationship, newest first
   /// [relationshipId] - The ID of the customer-business relationship
-  Future<List<Transaction>> getTransactionsByRelationship(int relationshipId);
+  /// [after] - Cursor of the previous page (null for the first page)
+  Future<TransactionPage> getTransactionsByRelationship(
+    int relationshipId, {
+    String? after,
+  });
 
   /// Create a new transaction
   /// [relationshipId] - The ID of the relationship
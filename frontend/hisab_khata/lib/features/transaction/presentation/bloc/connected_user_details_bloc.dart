@@ -6,12 +6,14 @@ import 'connected_user_details_state.dart';
 class ConnectedUserDetailsBloc
     extends Bloc<ConnectedUserDetailsEvent, ConnectedUserDetailsState> {
   final TransactionRepository _repository;
+  bool _isLoadingMore = false;
 
   ConnectedUserDetailsBloc({required TransactionRepository repository})
     : _repository = repository,
       super(const ConnectedUserDetailsInitial()) {
     on<LoadConnectedUserDetails>(_onLoadConnectedUserDetails);
     on<RefreshConnectedUserDetails>(_onRefreshConnectedUserDetails);
+    on<LoadMoreTransactions>(_onLoadMoreTransactions);
     on<ToggleFavorite>(_onToggleFavorite);
     on<CreateTransaction>(_onCreateTransaction);
   }
@@ -45,6 +47,35 @@ class ConnectedUserDetailsBloc
     }
   }
 
+  Future<void> _onLoadMoreTransactions(
+    LoadMoreTransactions event,
+    Emitter<ConnectedUserDetailsState> emit,
+  ) async {
+    final currentState = state;
+    if (currentState is! ConnectedUserDetailsLoaded ||
+        !currentState.userDetails.hasMoreTransactions ||
+        _isLoadingMore) {
+      return;
+    }
+
+    _isLoadingMore = true;
+    try {
+      final userDetails = currentState.userDetails;
+      final page = await _repository.getTransactionsByRelationship(
+        userDetails.relationshipId,
+        after: userDetails.transactionsNextCursor,
+      );
+      // Drop the page if the details were reloaded meanwhile
+      if (state == currentState) {
+        emit(ConnectedUserDetailsLoaded(userDetails.withNextPage(page)));
+      }
+    } catch (e) {
+      // Keep what is loaded; scrolling again retries
+    } finally {
+      _isLoadingMore = false;
+    }
+  }
+
   Future<void> _onToggleFavorite(
     ToggleFavorite event,
     Emitter<ConnectedUserDetailsState> emit,
@@ -29,6 +29,11 @@ class RefreshConnectedUserDetails extends ConnectedUserDetailsEvent {
   List<Object?> get props => [relationshipId];
 }
 
+/// Load the next (older) page of transactions
+class LoadMoreTransactions extends ConnectedUserDetailsEvent {
+  const LoadMoreTransactions();
+}
+
 /// Toggle favorite status (for customers only)
 class ToggleFavorite extends ConnectedUserDetailsEvent {
   final int businessId;
@@ -164,40 +164,59 @@ class ConnectedUserDetailsPage extends StatelessWidget {
       return const Center(child: CircularProgressIndicator());
     }
 
+    final hasMoreTransactions = userDetails.hasMoreTransactions;
+
     return RefreshIndicator(
       onRefresh: () async {
         context.read<ConnectedUserDetailsBloc>().add(
           RefreshConnectedUserDetails(relationshipId),
         );
       },
-      child: SingleChildScrollView(
-        physics: const AlwaysScrollableScrollPhysics(),
-        child: Column(
-          children: [
-            // Header section with gradient background
-            _buildHeaderSection(context, userDetails, isFavoriteToggling),
-            // Content section
-            Padding(
-              padding: const EdgeInsets.all(20),
-              child: Column(
-                crossAxisAlignment: CrossAxisAlignment.start,
-                children: [
-                  // Payment ratio bar
-                  PaymentRatioBar(
-                    toPay: userDetails.toPay,
-                    totalPaid: userDetails.totalPaid,
-                    isCustomerView: isCustomerView,
-                  ),
-                  const SizedBox(height: 24),
-                  // Transactions list
-                  TransactionsList(
-                    transactions: userDetails.transactions,
-                    isCustomerView: isCustomerView,
-                  ),
-                ],
+      child: NotificationListener<ScrollNotification>(
+        // Fetch the next page of transactions near the bottom
+        onNotification: (notification) {
+          if (hasMoreTransactions &&
+              notification.metrics.extentAfter < 300) {
+            context.read<ConnectedUserDetailsBloc>().add(
+              const LoadMoreTransactions(),
+            );
+          }
+          return false;
+        },
+        child: SingleChildScrollView(
+          physics: const AlwaysScrollableScrollPhysics(),
+          child: Column(
+            children: [
+              // Header section with gradient background
+              _buildHeaderSection(context, userDetails, isFavoriteToggling),
+              // Content section
+              Padding(
+                padding: const EdgeInsets.all(20),
+                child: Column(
+                  crossAxisAlignment: CrossAxisAlignment.start,
+                  children: [
+                    // Payment ratio bar
+                    PaymentRatioBar(
+                      toPay: userDetails.toPay,
+                      totalPaid: userDetails.totalPaid,
+                      isCustomerView: isCustomerView,
+                    ),
+                    const SizedBox(height: 24),
+                    // Transactions list
+                    TransactionsList(
+                      transactions: userDetails.transactions,
+                      isCustomerView: isCustomerView,
+                    ),
+                    if (hasMoreTransactions)
+                      const Padding(
+                        padding: EdgeInsets.symmetric(vertical: 16),
+                        child: Center(child: CircularProgressIndicator()),
+                      ),
+                  ],
+                ),
               ),
-            ),
-          ],
+            ],
+          ),
         ),
       ),
     );
@@ -2,6 +2,7 @@ import 'package:firebase_messaging/firebase_messaging.dart';
 import 'package:flutter_local_notifications/flutter_local_notifications.dart';
 import 'package:http/http.dart' as http;
 import 'dart:convert';
+import 'package:flutter/foundation.dart';
 import 'package:flutter/material.dart';
 import 'package:hisab_khata/core/constants/api_base_url.dart';
 import 'package:hisab_khata/core/constants/routes.dart';
@@ -154,7 +155,7 @@ class FCMService {
           'Content-Type': 'application/json',
           'Authorization': 'Bearer $_authToken',
         },
-        body: json.encode({'fcm_token': token}),
+        body: json.encode({'fcm_token': token, 'platform': _platformName()}),
       );
 
       if (response.statusCode == 200) {
@@ -169,14 +170,32 @@ class FCMService {
     }
   }
 
+  /// Platform name the backend stores with the device token
+  static String _platformName() {
+    if (kIsWeb) return 'web';
+    switch (defaultTargetPlatform) {
+      case TargetPlatform.iOS:
+        return 'ios';
+      case TargetPlatform.android:
+        return 'android';
+      default:
+        return '';
+    }
+  }
+
   /// Clear FCM token on logout — removes from server and resets local state
   static Future<void> clearTokenOnLogout() async {
     // Try to clear from server if we have credentials
     if (_authToken != null && _baseUrl != null) {
       try {
+        // Only this device's token - the user's other devices stay registered
         final response = await http.delete(
           Uri.parse('${_baseUrl}auth/fcm-token/'),
-          headers: {'Authorization': 'Bearer $_authToken'},
+          headers: {
+            'Content-Type': 'application/json',
+            'Authorization': 'Bearer $_authToken',
+          },
+          body: json.encode({'fcm_token': _fcmToken}),
         );
 
         if (response.statusCode == 200) {